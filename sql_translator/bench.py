@@ -0,0 +1,328 @@
+"""
+基准测试：用可复现的合成数据测量各类语句的吞吐量、延迟和内存占用，结果输出为JSON
+
+用法: python -m sql_translator.bench [--rows 10000 100000] [--storage row|columnar]
+                                   [--workloads point_select join ...] [-o 结果.json]
+                                   [--parallel-workers N]
+
+每个负载先建表并装入数据（不计时），再逐个执行并计时若干次操作。默认每个负载
+在单独的子进程中运行，peak_rss_mb 为该负载进程的内存峰值；--in-process 时所有负载
+在当前进程中依次运行，内存峰值是累计的。相同的 --seed 生成相同的数据和语句，
+不同版本的结果文件可以逐项比较。
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from sql_translator import __version__
+from sql_translator.core.executor import SQLExecutor
+from sql_translator.core.storage import STORAGE_TYPES
+
+# 装入数据时每批 executemany 的行数
+LOAD_BATCH = 10000
+# bulk_insert 负载每次 executemany 的行数
+INSERT_BATCH = 1000
+
+BENCH_SQL = "CREATE TABLE bench (id INT, name VARCHAR(50), category INT, score DECIMAL(10,2))"
+
+
+def bench_rows(rng, start, count):
+    return [(i, f"user{i}", rng.randrange(100), round(rng.uniform(0, 1000), 2))
+            for i in range(start, start + count)]
+
+
+def load(executor, sql, table, rows):
+    """建表并分批装入数据"""
+    executor.execute_sql(sql)
+    width = len(rows[0]) if rows else 0
+    insert = f"INSERT INTO {table} VALUES ({', '.join('?' * width)})"
+    for start in range(0, len(rows), LOAD_BATCH):
+        executor.executemany(insert, rows[start:start + LOAD_BATCH])
+
+
+def load_bench(executor, args, rng, index=True):
+    load(executor, BENCH_SQL, 'bench', bench_rows(rng, 0, args.rows))
+    if index:
+        executor.execute_sql("CREATE INDEX idx_bench_id ON bench (id)")
+
+
+def statements(executor, sqls):
+    return [lambda sql=sql: executor.execute_sql(sql) for sql in sqls]
+
+
+def bulk_insert(executor, args, rng):
+    executor.execute_sql(BENCH_SQL)
+    rows = bench_rows(rng, 0, args.rows)
+    insert = "INSERT INTO bench VALUES (?, ?, ?, ?)"
+    batches = [rows[start:start + INSERT_BATCH] for start in range(0, len(rows), INSERT_BATCH)]
+    return [lambda batch=batch: executor.executemany(insert, batch) for batch in batches], INSERT_BATCH
+
+
+def point_select(executor, args, rng):
+    load_bench(executor, args, rng)
+    return statements(executor, [f"SELECT * FROM bench WHERE id = {rng.randrange(args.rows)}"
+                                 for _ in range(args.queries * 10)]), None
+
+
+def range_select(executor, args, rng):
+    load_bench(executor, args, rng)
+    span = max(args.rows // 100, 1)
+    sqls = []
+    for _ in range(args.queries):
+        low = rng.randrange(max(args.rows - span, 1))
+        sqls.append(f"SELECT id, score FROM bench WHERE id >= {low} AND id < {low + span}")
+    return statements(executor, sqls), None
+
+
+def join(executor, args, rng):
+    regions = 10
+    customers = max(args.rows // 10, 1)
+    load(executor, "CREATE TABLE regions (id INT, name VARCHAR(20))", 'regions',
+         [(i, f"region{i}") for i in range(regions)])
+    load(executor, "CREATE TABLE customers (id INT, name VARCHAR(50), region_id INT)", 'customers',
+         [(i, f"customer{i}", rng.randrange(regions)) for i in range(customers)])
+    load(executor, "CREATE TABLE orders (id INT, customer_id INT, amount DECIMAL(10,2))", 'orders',
+         [(i, rng.randrange(customers), round(rng.uniform(1, 500), 2)) for i in range(args.rows)])
+    sqls = [
+        "SELECT customers.name, orders.amount, regions.name FROM orders "
+        "JOIN customers ON orders.customer_id = customers.id "
+        "JOIN regions ON customers.region_id = regions.id "
+        f"WHERE regions.id = {rng.randrange(regions)} AND orders.amount > {rng.randrange(400)}"
+        for _ in range(args.queries)
+    ]
+    return statements(executor, sqls), None
+
+
+def order_by(executor, args, rng):
+    load_bench(executor, args, rng, index=False)
+    sqls = []
+    for n in range(args.queries):
+        if n % 2:
+            # 有界堆选出前 LIMIT 行
+            sqls.append(f"SELECT id, name, score FROM bench ORDER BY score DESC, id "
+                        f"LIMIT {rng.randrange(10, 100)}")
+        else:
+            # 过滤后对约1%的行完整排序
+            sqls.append(f"SELECT id, score FROM bench WHERE category = {rng.randrange(100)} "
+                        f"ORDER BY score, id")
+    return statements(executor, sqls), None
+
+
+def full_scan(executor, args, rng):
+    load_bench(executor, args, rng, index=False)
+    sqls = []
+    for n in range(args.queries):
+        # 字符串条件不能向量化，--parallel-workers 大于1时在进程池中分段扫描
+        if n % 2:
+            sqls.append(f"SELECT category, COUNT(*), AVG(score) FROM bench "
+                        f"WHERE name LIKE 'user{rng.randrange(10)}%' GROUP BY category")
+        else:
+            sqls.append(f"SELECT id, score FROM bench WHERE name LIKE '%{rng.randrange(1000)}'")
+    return statements(executor, sqls), args.rows
+
+
+def update(executor, args, rng):
+    load_bench(executor, args, rng)
+    span = max(args.rows // 1000, 1)
+    sqls = []
+    for _ in range(args.queries):
+        low = rng.randrange(max(args.rows - span, 1))
+        sqls.append(f"UPDATE bench SET score = {rng.randrange(1000)} "
+                    f"WHERE id >= {low} AND id < {low + span}")
+    return statements(executor, sqls), span
+
+
+def delete(executor, args, rng):
+    load_bench(executor, args, rng)
+    # 互不重叠的行号区间，每次都删除 span 行
+    span = max(args.rows // (args.queries * 10), 1)
+    blocks = rng.sample(range(args.rows // span), min(args.queries, args.rows // span))
+    sqls = [f"DELETE FROM bench WHERE id >= {block * span} AND id < {(block + 1) * span}"
+            for block in blocks]
+    return statements(executor, sqls), span
+
+
+def alter(executor, args, rng):
+    load_bench(executor, args, rng)
+    count = 5
+    sqls = [f"ALTER TABLE bench ADD extra{i} VARCHAR(20)" for i in range(count)]
+    sqls += [f"ALTER TABLE bench DROP COLUMN extra{i}" for i in range(count)]
+    return statements(executor, sqls), None
+
+
+def batch_script(executor, args, rng):
+    load_bench(executor, args, rng)
+    lines = []
+    next_id = args.rows
+    for n in range(args.queries * 10):
+        kind = n % 3
+        if kind == 0:
+            lines.append(f"INSERT INTO bench VALUES ({next_id}, 'user{next_id}', "
+                         f"{rng.randrange(100)}, {rng.randrange(1000)})")
+            next_id += 1
+        elif kind == 1:
+            lines.append(f"UPDATE bench SET category = {rng.randrange(100)} "
+                         f"WHERE id = {rng.randrange(args.rows)}")
+        else:
+            lines.append(f"SELECT name, score FROM bench WHERE id = {rng.randrange(args.rows)}")
+    # 每次操作执行脚本中的下一条语句
+    results = executor.execute_batch_iter(";\n".join(lines) + ";\n")
+    return [lambda: next(results)] * len(lines), None
+
+
+# 负载名 -> (说明, 函数)；函数建表装入数据后返回 (操作列表, 每次操作处理的行数或None)
+WORKLOADS = {
+    'bulk_insert': ("executemany 批量插入，每批 1000 行", bulk_insert),
+    'point_select': ("按索引列等值查询单行", point_select),
+    'range_select': ("按索引列范围查询约1%的行", range_select),
+    'join': ("三表等值连接并过滤", join),
+    'order_by': ("ORDER BY：完整排序和 LIMIT 前若干行", order_by),
+    'full_scan': ("字符串条件的全表扫描和分组聚合（可并行）", full_scan),
+    'update': ("按索引列范围 UPDATE 约0.1%的行", update),
+    'delete': ("按索引列范围 DELETE，区间互不重叠", delete),
+    'alter': ("大表上 ALTER TABLE ADD / DROP 列", alter),
+    'batch_script': ("execute_batch_iter 执行 INSERT/UPDATE/SELECT 混合脚本", batch_script),
+}
+
+
+def is_error(result):
+    """语句返回的错误信息（成功时为结果行列表或包含“成功”的信息）"""
+    return isinstance(result, str) and '成功' not in result
+
+
+def percentile(sorted_values, fraction):
+    """最近秩法的百分位数"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def peak_rss_mb():
+    """当前进程的内存峰值（MB），不支持的平台返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_workload(name, rows, args):
+    """在当前进程中运行一个负载，返回结果字典"""
+    args = argparse.Namespace(**{**vars(args), 'rows': rows})
+    rng = random.Random(args.seed)
+    executor = SQLExecutor(storage=args.storage, parallel_workers=args.parallel_workers)
+    operations, rows_per_operation = WORKLOADS[name][1](executor, args, rng)
+
+    latencies = []
+    errors = 0
+    start = time.perf_counter()
+    for operation in operations:
+        began = time.perf_counter()
+        result = operation()
+        latencies.append(time.perf_counter() - began)
+        if is_error(result):
+            errors += 1
+    elapsed = time.perf_counter() - start
+    executor.close()
+
+    latencies.sort()
+    return {
+        'workload': name,
+        'rows': rows,
+        'operations': len(operations),
+        'errors': errors,
+        'total_s': elapsed,
+        'ops_per_s': len(operations) / elapsed if elapsed else None,
+        'rows_per_s': (len(operations) * rows_per_operation / elapsed
+                       if rows_per_operation and elapsed else None),
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': (latencies[-1] if latencies else 0.0) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_isolated(name, rows, args):
+    """在子进程中运行一个负载，内存峰值只包含该负载"""
+    command = [sys.executable, '-m', 'sql_translator.bench', '--in-process',
+               '--workloads', name, '--rows', str(rows), '--storage', args.storage,
+               '--queries', str(args.queries), '--seed', str(args.seed),
+               '--parallel-workers', str(args.parallel_workers)]
+    # 子进程从同一位置导入 sql_translator
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [root, env.get('PYTHONPATH')]))
+    completed = subprocess.run(command, capture_output=True, text=True, env=env)
+    if completed.returncode != 0:
+        raise RuntimeError(f"负载 {name} 运行失败:\n{completed.stderr}")
+    return json.loads(completed.stdout)['results'][0]
+
+
+def create_parser():
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description='SQL翻译器基准测试，结果输出为JSON')
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000],
+                        help='每个负载的表行数，可以指定多个（默认 100000）')
+    parser.add_argument('--storage', choices=STORAGE_TYPES, default='row', help='存储方式')
+    parser.add_argument('--workloads', nargs='+', choices=list(WORKLOADS), default=list(WORKLOADS),
+                        metavar='负载', help=f"要运行的负载（默认全部）：{', '.join(WORKLOADS)}")
+    parser.add_argument('--queries', type=int, default=100,
+                        help='每个查询/修改类负载的操作次数（point_select 和 batch_script 为10倍）')
+    parser.add_argument('--seed', type=int, default=0, help='生成数据和语句的随机种子')
+    parser.add_argument('--parallel-workers', type=int, default=0,
+                        help='SQLExecutor 的 parallel_workers，大于1时大表的全表扫描并行执行（默认 0）')
+    parser.add_argument('--in-process', action='store_true',
+                        help='在当前进程中依次运行所有负载（内存峰值是累计的）')
+    parser.add_argument('-o', '--output', help='结果写入该文件，默认输出到标准输出')
+    parser.add_argument('--list', action='store_true', help='列出所有负载后退出')
+    return parser
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    if args.list:
+        for name, (description, _) in WORKLOADS.items():
+            print(f"{name:<14} {description}")
+        return
+
+    run = run_workload if args.in_process else run_isolated
+    results = []
+    for rows in args.rows:
+        for name in args.workloads:
+            if not args.in_process:
+                print(f"运行 {name}（{rows} 行）...", file=sys.stderr, flush=True)
+            results.append(run(name, rows, args))
+
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'storage': args.storage,
+        'queries': args.queries,
+        'seed': args.seed,
+        'parallel_workers': args.parallel_workers,
+        'results': results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
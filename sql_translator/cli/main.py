@@ -8,17 +8,24 @@ def create_parser():
     parser = argparse.ArgumentParser(description='SQL翻译器命令行工具')
     parser.add_argument('-f', '--file', help='从文件读取SQL语句')
     parser.add_argument('-i', '--interactive', action='store_true', help='交互模式')
+    parser.add_argument('-q', '--quiet', action='store_true', help='执行文件时不输出每条语句的结果')
     parser.add_argument('sql', nargs='?', help='SQL语句')
     return parser
 
-def read_sql_from_file(file_path):
-    """从文件读取SQL语句"""
+def execute_sql_file(executor, file_path, display, quiet=False):
+    """流式执行SQL文件：边读边执行，每条语句的结果执行完立即输出"""
+    count = 0
     try:
         with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    except Exception as e:
+            for result in executor.execute_batch_iter(f):
+                count += 1
+                if not quiet:
+                    print(display.format_operation_result(result), flush=True)
+    except (OSError, UnicodeDecodeError) as e:
         print(f"读取文件失败: {e}")
         sys.exit(1)
+    if quiet:
+        print(f"共执行 {count} 条语句")
 
 def interactive_mode():
     """交互模式"""
@@ -67,10 +74,7 @@ def main():
     if args.interactive:
         interactive_mode()
     elif args.file:
-        sql = read_sql_from_file(args.file)
-        results = executor.execute_batch(sql)
-        for result in results:
-            print(display.format_operation_result(result))
+        execute_sql_file(executor, args.file, display, args.quiet)
     elif args.sql:
         result = executor.execute_sql(args.sql)
         print(display.format_operation_result(result))
@@ -1,4 +1,6 @@
 from sql_translator.core.executor import SQLExecutor
 from sql_translator.core.parser import SQLParser
+from sql_translator.core.prepared import PreparedStatement
+from sql_translator.core.tokenizer import SQLSyntaxError
  
-__all__ = ['SQLExecutor', 'SQLParser'] 
\ No newline at end of file
+__all__ = ['SQLExecutor', 'SQLParser', 'PreparedStatement', 'SQLSyntaxError'] 
\ No newline at end of file
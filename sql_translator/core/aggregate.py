@@ -0,0 +1,247 @@
+"""分组聚合：单遍哈希聚合，每个分组只保存一组累加器，不保存分组中的行
+
+没有 NULL 的概念：COUNT(列) 与 COUNT(*) 相同；SUM/AVG/MIN/MAX 忽略无法转换为
+列类型的值（例如 ALTER TABLE ADD 产生的空字符串），没有可用的值时结果为None。
+累加器可以合并（merge），并行扫描中各段分别累加后再合并，见 parallel.py。
+"""
+
+from functools import partial
+
+from sql_translator.core.ast_nodes import Aggregate, BoolOp, ColumnRef, Comparison, Not
+from sql_translator.core.storage import column_kind
+
+
+class CountAccumulator:
+    __slots__ = ('count',)
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+
+    def merge(self, other):
+        self.count += other.count
+
+    def result(self):
+        return self.count
+
+    # 并行扫描中各段的累加器序列化后传回主进程，只保存必要的状态
+    def __getstate__(self):
+        return self.count
+
+    def __setstate__(self, state):
+        self.count = state
+
+
+class SumAccumulator:
+    __slots__ = ('convert', 'total', 'count')
+
+    def __init__(self, convert):
+        self.convert = convert
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        try:
+            self.total += self.convert(value)
+        except (ValueError, TypeError):
+            return
+        self.count += 1
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+    def result(self):
+        return self.total if self.count else None
+
+    def __getstate__(self):
+        return self.convert, self.total, self.count
+
+    def __setstate__(self, state):
+        self.convert, self.total, self.count = state
+
+
+class AvgAccumulator(SumAccumulator):
+    __slots__ = ()
+
+    def result(self):
+        return self.total / self.count if self.count else None
+
+
+class MinAccumulator:
+    __slots__ = ('convert', 'value')
+
+    def __init__(self, convert):
+        self.convert = convert
+        self.value = None
+
+    def add(self, value):
+        try:
+            value = self.convert(value)
+        except (ValueError, TypeError):
+            return
+        if self.value is None or value < self.value:
+            self.value = value
+
+    def merge(self, other):
+        if other.value is not None:
+            self.add(other.value)
+
+    def result(self):
+        return self.value
+
+    def __getstate__(self):
+        return self.convert, self.value
+
+    def __setstate__(self, state):
+        self.convert, self.value = state
+
+
+class MaxAccumulator(MinAccumulator):
+    __slots__ = ()
+
+    def add(self, value):
+        try:
+            value = self.convert(value)
+        except (ValueError, TypeError):
+            return
+        if self.value is None or value > self.value:
+            self.value = value
+
+
+ACCUMULATORS = {
+    'SUM': SumAccumulator,
+    'AVG': AvgAccumulator,
+    'MIN': MinAccumulator,
+    'MAX': MaxAccumulator,
+}
+
+_CONVERTERS = {'int': int, 'float': float, 'str': str}
+
+
+def _numeric(value):
+    """字符串列上的 SUM/AVG：整数保持整数，否则按浮点数"""
+    if isinstance(value, (int, float)):
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def aggregate_type(aggregate, arg_type):
+    """聚合结果的列类型，用于格式化输出"""
+    if aggregate.func == 'COUNT':
+        return 'INT'
+    if aggregate.func == 'AVG':
+        return 'DECIMAL'
+    if aggregate.func == 'SUM':
+        return 'INT' if column_kind(arg_type) == 'int' else 'DECIMAL'
+    return arg_type
+
+
+def accumulator_factory(aggregate, arg_type):
+    """返回创建该聚合函数累加器的无参函数（可以序列化，并行扫描中传给工作进程）"""
+    if aggregate.func == 'COUNT':
+        return CountAccumulator
+    kind = column_kind(arg_type)
+    if aggregate.func in ('SUM', 'AVG'):
+        convert = _numeric if kind == 'str' else _CONVERTERS[kind]
+    else:
+        convert = _CONVERTERS[kind]
+    accumulator = ACCUMULATORS[aggregate.func]
+    return partial(accumulator, convert)
+
+
+def hash_aggregate(rows, key_indices, arg_indices, factories):
+    """单遍哈希聚合
+
+    rows 可以是任意可迭代对象，逐行读取；key_indices 为分组列的下标，
+    arg_indices / factories 与各聚合函数一一对应（COUNT(*) 的下标为0）。
+    返回 [分组列值..., 聚合结果...] 的列表，分组按第一次出现的顺序；
+    没有分组列时整个输入为一组（即使输入为空）。
+    """
+    return group_results(accumulate_groups(rows, key_indices, arg_indices, factories), key_indices)
+
+
+def accumulate_groups(rows, key_indices, arg_indices, factories):
+    """分组累加，返回 {分组键: 累加器列表}，分组按第一次出现的顺序"""
+    groups = {}
+    if key_indices:
+        if len(key_indices) == 1:
+            key_index = key_indices[0]
+            key_of = lambda row: row[key_index]
+        else:
+            key_of = lambda row: tuple([row[i] for i in key_indices])
+    else:
+        key_of = lambda row: ()
+        groups[()] = [factory() for factory in factories]
+
+    pairs = list(zip(arg_indices, range(len(factories))))
+    for row in rows:
+        key = key_of(row)
+        accumulators = groups.get(key)
+        if accumulators is None:
+            accumulators = groups[key] = [factory() for factory in factories]
+        for arg_index, slot in pairs:
+            accumulators[slot].add(row[arg_index])
+    return groups
+
+
+def merge_groups(groups, other):
+    """把另一部分输入的分组累加结果合并到 groups 中，新出现的分组排在最后"""
+    for key, accumulators in other.items():
+        mine = groups.get(key)
+        if mine is None:
+            groups[key] = accumulators
+            continue
+        for accumulator, partial in zip(mine, accumulators):
+            accumulator.merge(partial)
+    return groups
+
+
+def group_results(groups, key_indices):
+    """把分组累加结果转换为 [分组列值..., 聚合结果...] 的列表"""
+    result = []
+    for key, accumulators in groups.items():
+        if not key_indices:
+            values = []
+        elif len(key_indices) == 1:
+            values = [key]
+        else:
+            values = list(key)
+        values.extend(accumulator.result() for accumulator in accumulators)
+        result.append(values)
+    return result
+
+
+def collect_aggregates(node, found):
+    """按出现顺序收集条件或表达式中的聚合函数（去重）"""
+    if isinstance(node, Aggregate):
+        if node not in found:
+            found.append(node)
+    elif isinstance(node, Comparison):
+        collect_aggregates(node.left, found)
+        collect_aggregates(node.right, found)
+    elif isinstance(node, BoolOp):
+        for operand in node.operands:
+            collect_aggregates(operand, found)
+    elif isinstance(node, Not):
+        collect_aggregates(node.operand, found)
+    return found
+
+
+def replace_aggregates(node, names):
+    """把条件中的聚合函数替换为聚合结果列的列引用，names 为 {聚合函数: 列名}"""
+    if isinstance(node, Aggregate):
+        return ColumnRef(names[node])
+    if isinstance(node, Comparison):
+        return Comparison(replace_aggregates(node.left, names), node.op,
+                          replace_aggregates(node.right, names))
+    if isinstance(node, BoolOp):
+        return BoolOp(node.op, tuple(replace_aggregates(operand, names) for operand in node.operands))
+    if isinstance(node, Not):
+        return Not(replace_aggregates(node.operand, names))
+    return node
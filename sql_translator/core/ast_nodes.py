@@ -0,0 +1,241 @@
+"""SQL语句的抽象语法树节点
+
+所有节点都是不可变的（frozen）并使用 __slots__，解析一次后可以安全地缓存和复用，
+也可以作为编译缓存的键。
+"""
+
+from dataclasses import dataclass
+from typing import ClassVar, Optional, Tuple
+
+
+# ---------- 表达式 ----------
+
+@dataclass(frozen=True, slots=True)
+class Literal:
+    """常量。value 为去掉引号后的原文，quoted 表示书写时是否带引号"""
+    value: str
+    quoted: bool = False
+
+    def sql(self):
+        """返回书写形式"""
+        return f"'{self.value}'" if self.quoted else self.value
+
+
+@dataclass(frozen=True, slots=True)
+class Parameter:
+    """预编译语句中的参数占位符。key 为位置参数的序号（从0开始）或命名参数的名称"""
+    key: object
+
+    def sql(self):
+        return f":{self.key}" if isinstance(self.key, str) else '?'
+
+
+@dataclass(frozen=True, slots=True)
+class ColumnRef:
+    """列引用，table 为可选的表名前缀"""
+    name: str
+    table: Optional[str] = None
+
+    def sql(self):
+        """返回书写形式"""
+        return f"{self.table}.{self.name}" if self.table else self.name
+
+
+@dataclass(frozen=True, slots=True)
+class Aggregate:
+    """聚合函数 COUNT/SUM/AVG/MIN/MAX，argument 为None表示 COUNT(*)"""
+    func: str
+    argument: Optional[ColumnRef] = None
+
+    def sql(self):
+        return f"{self.func}({self.argument.sql() if self.argument else '*'})"
+
+
+@dataclass(frozen=True, slots=True)
+class Comparison:
+    """比较条件：left op right，op 为比较运算符、'LIKE' 或 'NOT LIKE'"""
+    left: object
+    op: str
+    right: object
+
+    def sql(self):
+        return f"{self.left.sql()} {self.op} {self.right.sql()}"
+
+
+@dataclass(frozen=True, slots=True)
+class BoolOp:
+    """AND / OR 组合条件"""
+    op: str
+    operands: Tuple[object, ...]
+
+    def sql(self):
+        return f" {self.op} ".join(f"({operand.sql()})" for operand in self.operands)
+
+
+@dataclass(frozen=True, slots=True)
+class Not:
+    """NOT 条件"""
+    operand: object
+
+    def sql(self):
+        return f"NOT ({self.operand.sql()})"
+
+
+# ---------- 语句组成部分 ----------
+
+@dataclass(frozen=True, slots=True)
+class ColumnDef:
+    """CREATE TABLE / ALTER TABLE ADD 中的列定义，col_type 保留书写原文"""
+    name: str
+    col_type: str
+
+
+@dataclass(frozen=True, slots=True)
+class Join:
+    """FROM子句中的一个JOIN，kind 为 INNER/LEFT/RIGHT/FULL/CROSS，CROSS 没有条件"""
+    table: str
+    kind: str = 'INNER'
+    condition: object = None
+
+
+@dataclass(frozen=True, slots=True)
+class OrderItem:
+    """ORDER BY中的一项，column 为列引用或聚合函数"""
+    column: object
+    desc: bool = False
+
+
+# ---------- 语句 ----------
+
+@dataclass(frozen=True, slots=True)
+class CreateTable:
+    type: ClassVar[str] = 'CREATE_TABLE'
+    table: str
+    columns: Tuple[ColumnDef, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Insert:
+    """INSERT语句，rows 中每个元素是一行的值；columns 为列清单，None表示按表的列顺序"""
+    type: ClassVar[str] = 'INSERT'
+    table: str
+    rows: Tuple[Tuple[Literal, ...], ...]
+    columns: Optional[Tuple[str, ...]] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Delete:
+    type: ClassVar[str] = 'DELETE'
+    table: str
+    where: object = None
+
+
+@dataclass(frozen=True, slots=True)
+class Select:
+    """SELECT语句。columns 为空元组表示 SELECT *，其中每项为列引用或聚合函数；
+    table 为None表示缺少FROM子句"""
+    type: ClassVar[str] = 'SELECT'
+    columns: Tuple[object, ...]
+    table: Optional[str]
+    joins: Tuple[Join, ...] = ()
+    where: object = None
+    order_by: Tuple[OrderItem, ...] = ()
+    group_by: Tuple[ColumnRef, ...] = ()
+    having: object = None
+    limit: object = None    # 常量或参数节点，None表示不限制
+    offset: object = None
+
+    @property
+    def is_aggregate(self):
+        """是否需要分组聚合：有 GROUP BY / HAVING，或选择列、排序中使用了聚合函数"""
+        return bool(
+            self.group_by or self.having is not None
+            or any(isinstance(column, Aggregate) for column in self.columns)
+            or any(isinstance(item.column, Aggregate) for item in self.order_by)
+        )
+
+    @property
+    def tables(self):
+        """FROM子句中按书写顺序出现的所有表"""
+        if self.table is None:
+            return []
+        return [self.table] + [join.table for join in self.joins]
+
+
+@dataclass(frozen=True, slots=True)
+class Explain:
+    """EXPLAIN [ANALYZE] SELECT ...：显示查询的执行计划；ANALYZE 时执行查询并报告各阶段的耗时"""
+    type: ClassVar[str] = 'EXPLAIN'
+    statement: Select
+    analyze: bool = False
+
+
+@dataclass(frozen=True, slots=True)
+class Update:
+    type: ClassVar[str] = 'UPDATE'
+    table: str
+    assignments: Tuple[Tuple[str, Literal], ...]
+    where: object = None
+
+
+@dataclass(frozen=True, slots=True)
+class AlterTable:
+    """ALTER TABLE，action 为 'ADD'（带 column_def）或 'DROP'（带 column）"""
+    type: ClassVar[str] = 'ALTER_TABLE'
+    table: str
+    action: str
+    column: str
+    column_def: Optional[ColumnDef] = None
+
+
+@dataclass(frozen=True, slots=True)
+class DropTable:
+    type: ClassVar[str] = 'DROP_TABLE'
+    table: str
+
+
+@dataclass(frozen=True, slots=True)
+class CreateIndex:
+    """CREATE INDEX 索引名 ON 表(列)"""
+    type: ClassVar[str] = 'CREATE_INDEX'
+    name: str
+    table: str
+    column: str
+
+
+@dataclass(frozen=True, slots=True)
+class DropIndex:
+    """DROP INDEX 索引名 [ON 表]"""
+    type: ClassVar[str] = 'DROP_INDEX'
+    name: str
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class Analyze:
+    """ANALYZE [表]，table 为None表示所有表"""
+    type: ClassVar[str] = 'ANALYZE'
+    table: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ShowTables:
+    type: ClassVar[str] = 'SHOW_TABLES'
+
+
+@dataclass(frozen=True, slots=True)
+class Begin:
+    """BEGIN [TRANSACTION]：开始事务"""
+    type: ClassVar[str] = 'BEGIN'
+
+
+@dataclass(frozen=True, slots=True)
+class Commit:
+    """COMMIT [TRANSACTION]：提交事务"""
+    type: ClassVar[str] = 'COMMIT'
+
+
+@dataclass(frozen=True, slots=True)
+class Rollback:
+    """ROLLBACK [TRANSACTION]：回滚事务"""
+    type: ClassVar[str] = 'ROLLBACK'
@@ -0,0 +1,98 @@
+"""后台整理：真正删除 DELETE 标记删除的行，把 ALTER TABLE 之后仍是旧布局的行改写为当前布局
+
+DELETE 只把删除的行标记为墓碑（见 storage.IndexedTable），已删除的行占表中行数（含已删除
+的行）的比例达到 dead_fraction 时才一次真正删除，频繁删除少量行时每次的代价与表的大小
+无关。行式存储的 ALTER TABLE ADD/DROP 只记录布局的变化，不改写已有的行，读取旧布局的行时
+转换（见 storage.RowTable）。
+
+执行器在 DELETE、ALTER TABLE 和提交事务之后把需要整理的表交给 Compactor，后台线程每次
+对该表加写锁整理一批（真正删除一次完成，旧布局每批 batch_rows 行），批次之间释放锁，其他
+语句可以穿插执行。没有需要整理的表时线程退出，下次需要时再启动。
+"""
+
+import threading
+
+# 每批整理的行数
+COMPACT_BATCH_ROWS = 1 << 16
+# 已删除的行达到该比例时真正删除
+DEFAULT_DEAD_FRACTION = 0.25
+
+
+class Compactor:
+    """在后台线程中依次整理 schedule 提交的表"""
+
+    def __init__(self, locks, data, dead_fraction=DEFAULT_DEAD_FRACTION,
+                 batch_rows=COMPACT_BATCH_ROWS, commit=None, sync=None):
+        self.locks = locks
+        self.data = data               # 表名 -> 表数据；每批按表名重新查找，表可能已被替换
+        self.dead_fraction = dead_fraction
+        self.batch_rows = batch_rows
+        # 持久化模式下每批之后把整理的记录写入预写日志（返回LSN），释放锁之后 sync(lsn) 提交
+        self.commit = commit
+        self.sync = sync
+        self.condition = threading.Condition()
+        self.pending = []              # 等待整理的表名
+        self.thread = None
+        self.closed = False
+        self.batches = 0
+
+    def needs_compaction(self, table):
+        return table.needs_compaction(self.dead_fraction)
+
+    def schedule(self, name):
+        """登记需要整理的表，必要时启动后台线程"""
+        with self.condition:
+            if self.closed:
+                return
+            if name not in self.pending:
+                self.pending.append(name)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='sql-compactor', daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.closed or not self.pending:
+                    self.thread = None
+                    self.condition.notify_all()
+                    return
+                name = self.pending.pop(0)
+            more = self.compact_batch(name)
+            with self.condition:
+                self.batches += 1
+                # 整理期间再次登记的表已重新放入 pending
+                if more and name not in self.pending:
+                    self.pending.insert(0, name)
+
+    def compact_batch(self, name):
+        """整理表 name 的一批行，返回是否还有需要整理的行"""
+        lsn = None
+        with self.locks.holding('read', {name: 'write'}, write=True):
+            table = self.data.get(name)
+            if table is None:
+                return False
+            more = table.compact(self.batch_rows, self.dead_fraction)
+            if self.commit is not None:
+                lsn = self.commit()
+        if lsn is not None:
+            self.sync(lsn)
+        return more
+
+    def wait(self):
+        """等待所有登记的表整理完成"""
+        with self.condition:
+            while self.thread is not None:
+                self.condition.wait()
+
+    def close(self):
+        """停止后台整理（未整理的行仍在读取时转换）"""
+        with self.condition:
+            self.closed = True
+            while self.thread is not None:
+                self.condition.wait()
+
+    def stats(self):
+        """等待整理的表和已整理的批次数"""
+        with self.condition:
+            return {'pending_tables': list(self.pending), 'batches': self.batches}
@@ -1,84 +1,398 @@
-from sql_translator.core.parser import SQLParser
+import io
+import threading
+import time
+
+from sql_translator.core.compaction import DEFAULT_DEAD_FRACTION, Compactor
+from sql_translator.core.locks import READ_ONLY_TYPES, LockConflict, LockManager
+from sql_translator.core.parallel import ParallelScanner
+from sql_translator.core.parser import SCRIPT_CHUNK_SIZE, SQLParser, iter_sql_statements
+from sql_translator.core.persistence import DEFAULT_CHECKPOINT_BYTES, Database
+from sql_translator.core.prepared import PreparedStatement
+from sql_translator.core.tokenizer import SQLSyntaxError
+from sql_translator.core.statement_cache import StatementCache
+from sql_translator.core.storage import STORAGE_TYPES, column_kind
+from sql_translator.core.tracing import StatementTrace, tracing
+from sql_translator.core.transaction import Transaction
 from sql_translator.core.operations import (
     CreateTableOperation, InsertOperation, DeleteOperation,
     SelectOperation, UpdateOperation, AlterTableOperation,
-    DropTableOperation, ShowTablesOperation
+    DropTableOperation, ShowTablesOperation, CreateIndexOperation,
+    DropIndexOperation, ExplainOperation, AnalyzeOperation
 )
 
+# 会改变表结构或索引的语句类型
+DDL_TYPES = {'CREATE_TABLE', 'ALTER_TABLE', 'DROP_TABLE', 'CREATE_INDEX', 'DROP_INDEX'}
+# 事务控制语句
+TRANSACTION_TYPES = {'BEGIN', 'COMMIT', 'ROLLBACK'}
+
+
 class SQLExecutor:
-    """SQL执行器，负责执行SQL操作并返回结果"""
+    """SQL执行器，负责执行SQL操作并返回结果
+
+    多个线程可以共享同一个执行器：查询对涉及的表加读锁，可以同时执行；
+    INSERT/UPDATE/DELETE 对目标表加写锁，CREATE/ALTER/DROP 独占整个数据库，见 locks.py。
+    BEGIN 开始当前线程的事务，之后的语句在事务的快照上执行，直到 COMMIT 或 ROLLBACK，
+    见 transaction.py。
+    tracer 不为None时，每条语句执行结束后调用 tracer(event) 报告各阶段耗时和行数，见 tracing.py。
+    DELETE 只把行标记为已删除，ALTER TABLE ADD/DROP 不复制已有的数据，之后由后台线程整理，
+    见 compaction.py。
+    """
     
-    def __init__(self):
+    def __init__(self, storage=None, statement_cache_size=256, path=None,
+                 sync_mode='full', sync_interval_ms=10, checkpoint_bytes=DEFAULT_CHECKPOINT_BYTES,
+                 vectorized=True, parallel_workers=0, tracer=None,
+                 compact_threshold=DEFAULT_DEAD_FRACTION):
+        """创建执行器
+
+        storage: 表数据的存储方式。'row' 为默认的行式存储（字符串列表）；
+        'columnar' 为列式存储，按CREATE TABLE中的列类型在插入时转换并存入类型化数组。
+        statement_cache_size: 已解析语句缓存的最大条目数，0 表示不缓存。
+        path: 持久化数据库目录。指定后表结构和数据保存在该目录中，启动时以内存映射方式打开，
+        只支持列式存储（storage 默认为 'columnar'）。
+        sync_mode: 持久化模式下预写日志的同步方式：'full'（每条语句 fsync）、
+        'interval'（每 sync_interval_ms 毫秒 fsync 一次）或 'off'（不主动 fsync）。
+        checkpoint_bytes: 日志超过该大小时自动执行检查点。
+        vectorized: 安装了 NumPy 时，列式存储中只涉及数值列的单表查询（过滤、排序、聚合）
+        自动使用向量化执行，其他查询按行执行；False 表示总是按行执行。
+        parallel_workers: 大于1时，大表（不少于 parallel.PARALLEL_MIN_ROWS 行）不使用索引的
+        单表扫描（SELECT，以及 DELETE/UPDATE 的 WHERE）分段在这么多个工作进程中并行执行。
+        进程池在第一次并行扫描时创建，close 时关闭。
+        tracer: 语句跟踪回调，每条语句执行结束后以事件字典调用，见 tracing.py；
+        None（默认）表示不跟踪。
+        compact_threshold: DELETE 只标记删除的行，表中（含已删除的行）已删除的行达到这个比例时
+        由后台线程真正删除并压缩存储，0 表示每次删除后都压缩。
+        """
+        if storage is None:
+            storage = 'columnar' if path is not None else 'row'
+        if storage not in STORAGE_TYPES:
+            raise ValueError(f"不支持的存储方式: {storage}")
+        if path is not None and storage != 'columnar':
+            raise ValueError("持久化存储只支持列式存储")
+        self.storage = storage
         self.parser = SQLParser()
+        self.statement_cache = StatementCache(statement_cache_size)
         self.tables = {}  # 存储表结构
         self.data = {}    # 存储表数据
-        self.operations = {
-            'CREATE_TABLE': CreateTableOperation(self.tables, self.data),
-            'INSERT': InsertOperation(self.tables, self.data),
-            'DELETE': DeleteOperation(self.tables, self.data),
-            'SELECT': SelectOperation(self.tables, self.data),
-            'UPDATE': UpdateOperation(self.tables, self.data),
-            'ALTER_TABLE': AlterTableOperation(self.tables, self.data),
-            'DROP_TABLE': DropTableOperation(self.tables, self.data),
-            'SHOW_TABLES': ShowTablesOperation(self.tables, self.data)
-        }
+        self.schema_version = 0  # 每次执行CREATE/ALTER/DROP或提交事务（替换了表）后加1
+        self.vectorized = vectorized
+        self.parallel = ParallelScanner(parallel_workers) if parallel_workers > 1 else None
+        self.tracer = tracer
+        # 持久化模式下写语句共用预写日志缓冲，需要依次执行
+        self.locks = LockManager(serialize_writes=path is not None)
+        self.local = threading.local()  # 各线程当前的事务和最近一次查询的JOIN策略
+        self.operations = self.create_operations(self.tables, self.data)
+        self.database = None
+        if path is not None:
+            self.database = Database(path, sync_mode, sync_interval_ms, checkpoint_bytes)
+            self.database.load(self.tables, self.data)
+        self.compactor = Compactor(
+            self.locks, self.data, compact_threshold,
+            commit=self.database.commit_pending if self.database is not None else None,
+            sync=self.sync)
+        # 重放日志后可能有已删除的行
+        self.schedule_compaction(list(self.data))
     
+    def create_operations(self, tables, data):
+        """创建在给定的表结构和表数据上执行各类语句的操作对象"""
+        select = SelectOperation(tables, data, vectorized=self.vectorized, parallel=self.parallel,
+                                 local=self.local)
+        return {
+            'CREATE_TABLE': CreateTableOperation(tables, data, storage=self.storage),
+            'INSERT': InsertOperation(tables, data),
+            'DELETE': DeleteOperation(tables, data, parallel=self.parallel),
+            'SELECT': select,
+            'UPDATE': UpdateOperation(tables, data, parallel=self.parallel),
+            'ALTER_TABLE': AlterTableOperation(tables, data),
+            'DROP_TABLE': DropTableOperation(tables, data),
+            'SHOW_TABLES': ShowTablesOperation(tables, data),
+            'CREATE_INDEX': CreateIndexOperation(tables, data),
+            'DROP_INDEX': DropIndexOperation(tables, data),
+            'EXPLAIN': ExplainOperation(tables, data, select=select),
+            'ANALYZE': AnalyzeOperation(tables, data),
+        }
+
     def execute_sql(self, sql):
         """执行单条SQL语句"""
-        # 处理SQL语句末尾的分号
-        if sql.strip().endswith(';'):
-            sql = sql.strip()[:-1]  # 去掉末尾的分号
-            
-        parsed = self.parser.parse_sql(sql)
-        print(parsed)
+        if self.tracer is None:
+            return self.execute_parsed(sql, self.parse(sql))
+        start = time.perf_counter()
+        parsed = self.parse(sql)
+        parse_ms = (time.perf_counter() - start) * 1000
+        return self.traced(sql, parsed['type'], lambda: self.execute_parsed(sql, parsed), parse_ms)
+
+    def execute_parsed(self, sql, parsed):
+        """执行已解析（parse 的结果）的单条SQL语句"""
         operation_type = parsed['type']
         
         if operation_type == 'COMMENT':
             # 对于纯注释语句，直接返回注释内容但不执行
-            return f"注释: {parsed['original']}"
-        elif operation_type in self.operations:
-            return self.operations[operation_type].execute(parsed['content'])
+            return f"注释: {sql}"
+        elif operation_type == 'ERROR':
+            return f"SQL语法错误: {parsed['error']}"
+        elif operation_type in self.operations or operation_type in TRANSACTION_TYPES:
+            if parsed['parameters']:
+                return "错误：语句中包含参数占位符，请使用 prepare() 执行"
+            return self.execute_statement(parsed['statement'])
         else:
-            return f"不支持的SQL语句: {parsed['original']}"
+            return f"不支持的SQL语句: {sql}"
+
+    def execute_iter(self, sql):
+        """执行单条SQL语句，逐行产出结果
+
+        SELECT 语句的结果行在执行管道中逐行生成，没有排序和分组的查询不会把结果
+        全部放入内存；其他语句的执行结果和错误信息作为唯一的一项产出。
+        查询在开始时对涉及的表取快照，迭代期间不持有锁：结果不受之后的修改影响，
+        迭代也不会阻塞对这些表的修改。事务中在事务的快照上执行。
+        """
+        start = time.perf_counter()
+        parsed = self.parse(sql)
+        parse_ms = (time.perf_counter() - start) * 1000
+        if parsed['type'] != 'SELECT' or parsed['parameters']:
+            yield self.execute_sql(sql)
+            return
+        if self.tracer is None:
+            yield from self.iter_select(parsed['statement'])
+        else:
+            yield from self.iter_traced(sql, parsed['statement'], parse_ms)
+
+    def iter_select(self, statement):
+        """在涉及的表的快照上逐行产出查询结果"""
+        snapshot = self.transaction
+        if snapshot is None:
+            with self.locks.statement(statement):
+                snapshot = Transaction(self.tables, self.data, self.create_operations,
+                                       names=statement.tables)
+        rows = snapshot.operations['SELECT'].iter_rows(statement)
+        if isinstance(rows, str):
+            yield rows
+            return
+        yield from rows
+
+    def iter_traced(self, sql, statement, parse_ms):
+        """跟踪中逐行产出查询结果；只计入生成结果行的时间，迭代结束或关闭时报告"""
+        trace = StatementTrace('SELECT', sql, parse_ms)
+        rows = self.iter_select(statement)
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                with tracing(trace):
+                    row = next(rows, None)
+                elapsed += time.perf_counter() - start
+                if row is None:
+                    break
+                if not isinstance(row, str):
+                    trace.rows_returned += 1
+                yield row
+        finally:
+            rows.close()
+            trace.execute_ms = elapsed * 1000 - trace.plan_ms
+            self.tracer(trace.event())
+
+    def traced(self, sql, statement_type, action, parse_ms=0.0):
+        """执行 action() 并返回其结果；设置了 tracer 时跟踪执行过程并报告"""
+        if self.tracer is None:
+            return action()
+        trace = StatementTrace(statement_type, sql, parse_ms)
+        start = time.perf_counter()
+        with tracing(trace):
+            result = action()
+        trace.execute_ms = (time.perf_counter() - start) * 1000 - trace.plan_ms
+        if statement_type == 'SELECT' and isinstance(result, list):
+            trace.rows_returned = len(result)
+        self.tracer(trace.event())
+        return result
+
+    def execute_statement(self, statement):
+        """执行已解析的语句"""
+        if statement.type in TRANSACTION_TYPES:
+            return self.execute_transaction(statement)
+        transaction = self.transaction
+        if transaction is not None:
+            return transaction.execute(statement)
+        return self.execute_locked(statement, lambda: self.operations[statement.type].execute(statement))
+
+    def execute_locked(self, statement, action):
+        """持有语句需要的锁执行 action()，然后把修改写入磁盘，返回 action 的结果
+
+        当前线程在事务中时在事务的快照上执行，不加锁。当前线程持有的读锁与语句需要的
+        写锁冲突时不执行，返回错误信息。
+        """
+        transaction = self.transaction
+        if transaction is not None:
+            return transaction.run(statement, action)
+        lsn = None
+        try:
+            with self.locks.statement(statement):
+                result = action()
+                if statement.type in DDL_TYPES:
+                    self.schema_version += 1
+                if statement.type in ('DELETE', 'ALTER_TABLE'):
+                    self.schedule_compaction([statement.table])
+                if statement.type not in READ_ONLY_TYPES:
+                    lsn = self.persist(statement)
+        except LockConflict as e:
+            return f"错误：{e}"
+        # 释放写互斥锁之后再等待 fsync，其他线程的提交可以合并到同一次 fsync
+        self.sync(lsn)
+        self.checkpoint_if_due()
+        return result
+
+    @property
+    def transaction(self):
+        """当前线程进行中的事务，没有时为None"""
+        return getattr(self.local, 'transaction', None)
+
+    def catalog(self):
+        """当前线程看到的 (表结构, 表数据, 版本)：事务中为事务的快照，版本为事务对象"""
+        transaction = self.transaction
+        if transaction is not None:
+            return transaction.tables, transaction.data, transaction
+        return self.tables, self.data, self.schema_version
+
+    def execute_transaction(self, statement):
+        """执行 BEGIN / COMMIT / ROLLBACK"""
+        transaction = self.transaction
+        if statement.type == 'BEGIN':
+            if transaction is not None:
+                return "错误：事务已经开始，请先 COMMIT 或 ROLLBACK"
+            with self.locks.holding('read'):
+                names = list(self.data)
+                with self.locks.holding('read', dict.fromkeys(names, 'read')):
+                    self.local.transaction = Transaction(
+                        self.tables, self.data, self.create_operations,
+                        journaled=self.database is not None)
+            return "开始事务"
+
+        if transaction is None:
+            return "错误：当前没有进行中的事务"
+        self.local.transaction = None
+        if statement.type == 'ROLLBACK':
+            return "回滚事务成功"
+
+        written = transaction.written()
+        if written:
+            lsn = None
+            with self.locks.holding('read', dict.fromkeys(written, 'write'), write=True):
+                name = transaction.conflict(self.data)
+                if name is not None:
+                    return f"提交失败：表 {name} 在事务开始后被修改，事务已回滚"
+                ops = transaction.journal_ops(self.data) if self.database is not None else None
+                for name, table in written.items():
+                    table.journal = None
+                    self.data[name] = table
+                # 已预编译的 INSERT 引用了被替换的表，需要重新解析
+                self.schema_version += 1
+                if self.database is not None:
+                    lsn = self.database.commit_transaction(written, ops)
+                # 事务中删除了行，或者表是 ALTER TABLE 之前取的快照，还有未整理的行
+                self.schedule_compaction(written)
+            self.sync(lsn)
+            self.checkpoint_if_due()
+        return "提交事务成功"
+
+    def schedule_compaction(self, names):
+        """把需要整理的表（已删除的行足够多，或者有旧布局的数据）交给后台整理"""
+        for name in names:
+            table = self.data.get(name)
+            if table is not None and self.compactor.needs_compaction(table):
+                self.compactor.schedule(name)
+
+    def persist(self, statement):
+        """持久化模式下把语句造成的修改写入预写日志，返回记录的LSN（没有写入时为None）"""
+        if self.database is not None:
+            return self.database.persist(statement)
+        return None
+
+    def sync(self, lsn):
+        """释放锁之后按同步方式提交 persist 写入的记录"""
+        if lsn is not None:
+            self.database.sync(lsn)
+
+    def checkpoint(self):
+        """持久化模式下把修改写入表文件并清空预写日志"""
+        if self.database is not None:
+            with self.locks.exclusive():
+                self.database.checkpoint()
+
+    def checkpoint_if_due(self):
+        """预写日志超过 checkpoint_bytes 时执行检查点"""
+        if self.database is None or not self.database.checkpoint_due():
+            return
+        try:
+            self.checkpoint()
+        except LockConflict:
+            # 当前线程持有读锁，下一条写语句之后再执行
+            pass
+
+    def get_wal_stats(self):
+        """获取预写日志的提交次数、fsync次数和提交延迟，非持久化模式返回None"""
+        if self.database is None:
+            return None
+        return self.database.wal.stats()
+
+    def close(self):
+        """停止后台整理，关闭并行扫描的进程池；关闭持久化数据库：执行检查点并释放内存映射"""
+        self.compactor.close()
+        if self.parallel is not None:
+            self.parallel.close()
+        if self.database is not None:
+            with self.locks.exclusive():
+                self.database.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def prepare(self, sql):
+        """预编译SQL语句，返回可重复执行的 PreparedStatement
+
+        语句中可以使用 ? 或 :名称 作为参数占位符。语法错误或不支持的语句
+        会抛出 SQLSyntaxError。
+        """
+        parsed = self.parse(sql)
+        if parsed['type'] == 'ERROR':
+            raise SQLSyntaxError(parsed['error'])
+        if parsed['type'] not in self.operations and parsed['type'] not in TRANSACTION_TYPES:
+            raise SQLSyntaxError(f"不支持的SQL语句: {sql}")
+        return PreparedStatement(self, sql, parsed)
+
+    def executemany(self, sql, rows):
+        """用多组参数执行同一条语句
+
+        INSERT会按列批量检查类型并一次性追加所有行，返回一条汇总信息；
+        其他语句返回每组参数的执行结果列表。
+        """
+        return self.prepare(sql).executemany(rows)
+
+    def parse(self, sql):
+        """解析SQL语句，相同的语句只解析一次
+
+        结果按规范化后的语句文本缓存，见 StatementCache。
+        """
+        key = StatementCache.normalize(sql)
+        parsed = self.statement_cache.get(key)
+        if parsed is None:
+            parsed = self.parser.parse_sql(sql)
+            self.statement_cache.put(key, parsed)
+        return parsed
     
     def execute_batch(self, sql_batch):
         """执行批量SQL语句"""
-        results = []
-        # 按分号分割SQL语句，并过滤掉空语句
-        statements = []
-        current_stmt = ""
-        in_string = False
-        string_quote = None
-        
-        # 更智能地分割SQL语句，考虑字符串中的分号和注释
-        for i, char in enumerate(sql_batch):
-            if char in ["'", '"'] and (i == 0 or sql_batch[i-1] != '\\'):
-                if not in_string:
-                    in_string = True
-                    string_quote = char
-                elif char == string_quote:
-                    in_string = False
-                current_stmt += char
-            elif char == ';' and not in_string:
-                # 遇到分号时，添加当前语句（除非是空的）
-                if current_stmt.strip():
-                    statements.append(current_stmt.strip())
-                current_stmt = ""
-            else:
-                current_stmt += char
-        
-        # 添加最后一个语句（如果不为空）
-        if current_stmt.strip():
-            statements.append(current_stmt.strip())
-        
-        for sql in statements:
-            # 确保语句不为空
-            if sql.strip():
-                result = self.execute_sql(sql)
-                results.append(result)
-        
-        return results
-    
+        return list(self.execute_batch_iter(sql_batch))
+
+    def execute_batch_iter(self, sql_batch, chunk_size=SCRIPT_CHUNK_SIZE):
+        """逐条执行批量SQL语句，每执行完一条就产出其结果
+
+        sql_batch 可以是字符串，也可以是文本文件等带 read 方法的对象；
+        后者按块读取，不会把整个脚本读入内存。
+        """
+        stream = io.StringIO(sql_batch) if isinstance(sql_batch, str) else sql_batch
+        for sql in iter_sql_statements(stream, chunk_size):
+            yield self.execute_sql(sql)
+
     def get_tables(self):
         """获取所有表名"""
         return list(self.tables.keys())
@@ -89,8 +403,82 @@ class SQLExecutor:
             return self.tables[table_name]
         return None
     
+    def get_indexes(self, table_name=None):
+        """获取索引列表，每项为 {'name', 'table', 'column'}；可以只列出指定表的索引"""
+        result = []
+        with self.locks.holding('read'):
+            for name, table in self.data.items():
+                if table_name is not None and name != table_name:
+                    continue
+                for index in table.indexes.values():
+                    result.append({'name': index.name, 'table': name, 'column': index.column})
+        return result
+
+    def get_table_stats(self, table_name):
+        """获取表的统计信息，表不存在时返回None
+
+        rows 为当前行数；执行过 ANALYZE 后还包括每列的不同值个数估计、最小值、最大值
+        和数值的等高直方图（columns），以及之后 UPDATE/DELETE 影响的行数（modified_rows）。
+        """
+        with self.locks.holding('read', {table_name: 'read'}):
+            if table_name not in self.data:
+                return None
+            table = self.data[table_name]
+            result = {'rows': len(table), 'analyzed': table.stats is not None}
+            if table.stats is not None:
+                result['analyzed_rows'] = table.stats.analyzed_rows
+                result['modified_rows'] = table.stats.modified_rows
+                result['columns'] = {
+                    col: column.to_dict(column_kind(col_type) == 'int')
+                    for (col, col_type), column in zip(self.tables[table_name].items(),
+                                                       table.stats.columns)
+                }
+            return result
+
+    def get_lock_stats(self):
+        """获取读锁/写锁的获取次数、需要等待的次数，以及等待时间的总和、平均值和最大值（毫秒）"""
+        return self.locks.stats()
+
+    def get_statement_cache_stats(self):
+        """获取语句缓存的命中/未命中/淘汰次数"""
+        return self.statement_cache.stats()
+
+    def profile(self, sql, memory=False):
+        """执行一条SELECT语句（结果丢弃），返回执行管道各阶段的耗时和行数，见 profiler.py
+
+        返回字典：parse_ms、build_ms（构建管道，含选择执行计划）、execute_ms、total_ms、
+        rows_returned，以及 stages（按数据流顺序，每个阶段的 stage、detail、inputs、
+        time_ms、rows_in、rows_out）。memory 为真时用 tracemalloc 统计内存，各阶段还有
+        alloc_peak_bytes，整体有 peak_alloc_bytes。不是SELECT语句或执行出错时返回错误信息。
+        """
+        start = time.perf_counter()
+        parsed = self.parse(sql)
+        parse_ms = (time.perf_counter() - start) * 1000
+        if parsed['type'] == 'ERROR':
+            return f"SQL语法错误: {parsed['error']}"
+        if parsed['type'] != 'SELECT':
+            return "错误：只能剖析 SELECT 语句"
+        if parsed['parameters']:
+            return "错误：语句中包含参数占位符，请使用 prepare() 执行"
+        statement = parsed['statement']
+        transaction = self.transaction
+        operations = transaction.operations if transaction is not None else self.operations
+        outcome = self.execute_locked(
+            statement, lambda: operations['SELECT'].analyze(statement, memory, sql, parse_ms))
+        if isinstance(outcome, str):
+            return outcome
+        profile, result = outcome
+        if isinstance(result, str):
+            return result
+        return profile.report()
+
+    def get_join_strategies(self):
+        """获取当前线程最近一次SELECT（包括事务中和 execute_iter 的查询）中每个JOIN使用的执行策略"""
+        return list(self.operations['SELECT'].last_join_strategies)
+
     def get_table_data(self, table_name):
         """获取指定表的数据"""
-        if table_name in self.data:
-            return self.data[table_name]
-        return None 
\ No newline at end of file
+        with self.locks.holding('read', {table_name: 'read'}):
+            if table_name in self.data:
+                return list(self.data[table_name])
+            return None 
\ No newline at end of file
@@ -0,0 +1,319 @@
+"""表上的单列二级索引
+
+索引与 WHERE 条件使用同一套比较规则（见 predicate.compare_values）：
+能转换为数字的值按数值比较，其他值按字符串比较。因此每个值在索引中的键是
+float(值)（可以转换时）或 str(值)。
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import compress
+
+from sql_translator.core.ast_nodes import BoolOp, ColumnRef, Comparison, Literal
+from sql_translator.core.predicate import MIRRORED_OPERATORS, find_column
+
+# 可以使用索引的比较运算符
+INDEXABLE_OPERATORS = {'=', '<', '>', '<=', '>='}
+
+
+def index_key(value):
+    """返回值在索引中的键，NaN 返回None（任何比较都不成立，不进入索引）"""
+    try:
+        key = float(value)
+    except (ValueError, TypeError):
+        return str(value)
+    return key if key == key else None
+
+
+def _key_range(keys, op, key):
+    """有序键数组中满足 "键 op key" 的下标范围"""
+    if op == '<':
+        return 0, bisect_left(keys, key)
+    if op == '<=':
+        return 0, bisect_right(keys, key)
+    if op == '>':
+        return bisect_right(keys, key), len(keys)
+    return bisect_left(keys, key), len(keys)
+
+
+class TableIndex:
+    """单列索引：哈希表用于等值查找，有序数组用于范围查找
+
+    行号指向表中的位置。数值键和字符串键分两个有序数组保存，
+    二者之间不可比较；字符串常量的范围查询只在列中没有数值时使用索引。
+    新建的索引在 load 之前处于未构建状态，此时修改数据不需要维护索引。
+    """
+
+    def __init__(self, name, column, col_index):
+        self.name = name
+        self.column = column
+        self.col_index = col_index
+        self._reset()
+        self.built = False
+
+    def _reset(self):
+        self.buckets = {}        # 键 -> 行号列表
+        self.shared_buckets = False  # 行号列表与其他副本共享，修改前先复制
+        self.owned_keys = set()      # 共享期间已复制过行号列表的键
+        self.numbers = []        # 有序的数值键
+        self.number_rows = []    # 与 numbers 对应的行号
+        self.texts = []          # 有序的字符串键
+        self.text_rows = []      # 与 texts 对应的行号
+
+    def copy(self):
+        """返回独立的副本，表的快照修改数据前用它复制共享的索引
+
+        各键的行号列表由两个副本共享，任何一方修改某个键时才复制该键的列表。
+        """
+        other = TableIndex(self.name, self.column, self.col_index)
+        other.buckets = self.buckets.copy()
+        self.shared_buckets = other.shared_buckets = True
+        self.owned_keys = set()
+        other.numbers = self.numbers.copy()
+        other.number_rows = self.number_rows.copy()
+        other.texts = self.texts.copy()
+        other.text_rows = self.text_rows.copy()
+        other.built = self.built
+        return other
+
+    def clear(self):
+        """清空索引（表已清空）"""
+        self._reset()
+        self.built = True
+
+    def load(self, values, live=None):
+        """用一列的全部值（下标为行号）构建索引；live 不为None时跳过 live[行号] 为0的已删除的行"""
+        self._reset()
+        pairs = enumerate(values)
+        if live is not None:
+            pairs = compress(pairs, live)
+        self._merge_pairs(pairs)
+        self.built = True
+
+    def _merge(self, values, start=0):
+        """从第 start 行开始批量加入一列值，加入后整体重新排序"""
+        self._merge_pairs(enumerate(values, start))
+
+    def _merge_pairs(self, pairs):
+        """批量加入 (行号, 值)，加入后整体重新排序"""
+        buckets = self.buckets
+        numbers = list(zip(self.numbers, self.number_rows))
+        texts = list(zip(self.texts, self.text_rows))
+        for row, value in pairs:
+            key = index_key(value)
+            if key is None:
+                continue
+            if self.shared_buckets:
+                self._bucket(key).append(row)
+            else:
+                buckets.setdefault(key, []).append(row)
+            (texts if type(key) is str else numbers).append((key, row))
+        numbers.sort()
+        texts.sort()
+        self.numbers = [key for key, _ in numbers]
+        self.number_rows = [row for _, row in numbers]
+        self.texts = [key for key, _ in texts]
+        self.text_rows = [row for _, row in texts]
+
+    def _bucket(self, key):
+        """返回该键可以修改的行号列表（不存在时创建），与其他副本共享时先复制"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+        elif self.shared_buckets and key not in self.owned_keys:
+            bucket = self.buckets[key] = bucket.copy()
+        if self.shared_buckets:
+            self.owned_keys.add(key)
+        return bucket
+
+    def _sorted_arrays(self, key):
+        if type(key) is str:
+            return self.texts, self.text_rows
+        return self.numbers, self.number_rows
+
+    def add(self, row, value):
+        """加入一行的值"""
+        if not self.built:
+            return
+        key = index_key(value)
+        if key is None:
+            return
+        self._bucket(key).append(row)
+        keys, rows = self._sorted_arrays(key)
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        rows.insert(i, row)
+
+    def add_many(self, start, values):
+        """加入从第 start 行开始的连续多行；数量较多时合并后重新排序，比逐个插入更快"""
+        if not self.built:
+            return
+        if len(values) > 16 and len(values) * 8 > len(self.numbers) + len(self.texts):
+            self._merge(values, start)
+            return
+        for row, value in enumerate(values, start):
+            self.add(row, value)
+
+    def remove(self, row, value):
+        """删除一行的值"""
+        if not self.built:
+            return
+        key = index_key(value)
+        if key is None:
+            return
+        if key not in self.buckets:
+            return
+        bucket = self._bucket(key)
+        bucket.remove(row)
+        if not bucket:
+            del self.buckets[key]
+        keys, rows = self._sorted_arrays(key)
+        i = bisect_left(keys, key)
+        i += rows[i:bisect_right(keys, key)].index(row)
+        del keys[i]
+        del rows[i]
+
+    def remove_rows(self, rows, values):
+        """删除多行（行号和各行的值），其他行的行号不变；删除的行较多时比逐行 remove 更快"""
+        if not self.built:
+            return
+        removed = set(rows)
+        keys = {index_key(value) for value in values}
+        keys.discard(None)
+        for key in keys:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                continue
+            bucket = [row for row in bucket if row not in removed]
+            if bucket:
+                # 新的列表不与其他副本共享
+                self.buckets[key] = bucket
+                if self.shared_buckets:
+                    self.owned_keys.add(key)
+            else:
+                del self.buckets[key]
+        self.numbers, self.number_rows = self._remove_sorted(self.numbers, self.number_rows, removed)
+        self.texts, self.text_rows = self._remove_sorted(self.texts, self.text_rows, removed)
+
+    @staticmethod
+    def _remove_sorted(keys, rows, removed):
+        kept = [(key, row) for key, row in zip(keys, rows) if row not in removed]
+        return [key for key, _ in kept], [row for _, row in kept]
+
+    def remap(self, mapping):
+        """删除行之后更新行号。mapping[旧行号] 为新行号，-1 表示该行已删除"""
+        if not self.built:
+            return
+        buckets = {}
+        for key, rows in self.buckets.items():
+            rows = [mapping[row] for row in rows if mapping[row] != -1]
+            if rows:
+                buckets[key] = rows
+        self.buckets = buckets
+        self.shared_buckets = False
+        self.owned_keys = set()
+        self.numbers, self.number_rows = self._remap_sorted(self.numbers, self.number_rows, mapping)
+        self.texts, self.text_rows = self._remap_sorted(self.texts, self.text_rows, mapping)
+
+    @staticmethod
+    def _remap_sorted(keys, rows, mapping):
+        kept = [(key, mapping[row]) for key, row in zip(keys, rows) if mapping[row] != -1]
+        return [key for key, _ in kept], [row for _, row in kept]
+
+    def _matching_slices(self, op, value):
+        """返回满足 "列 op value" 的行号所在的 (行号数组, 起, 止) 列表；索引无法回答时返回None"""
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        if number is not None and number != number:
+            return []
+
+        if op == '=':
+            rows = self.buckets.get(value if number is None else number, [])
+            return [(rows, 0, len(rows))]
+
+        if number is None:
+            # 字符串常量与数值按字符串比较，数值键的顺序不适用
+            if self.numbers:
+                return None
+            return [(self.text_rows, *_key_range(self.texts, op, value))]
+
+        return [(self.number_rows, *_key_range(self.numbers, op, number)),
+                (self.text_rows, *_key_range(self.texts, op, value))]
+
+    def estimate(self, op, value):
+        """满足 "列 op value" 的行数，只做二分查找不取出行号；索引无法回答时返回None"""
+        slices = self._matching_slices(op, value)
+        if slices is None:
+            return None
+        return sum(hi - lo for _, lo, hi in slices)
+
+    def lookup(self, op, value):
+        """返回满足 "列 op value" 的行号（升序）；索引无法回答时返回None"""
+        slices = self._matching_slices(op, value)
+        if slices is None:
+            return None
+        rows = []
+        for row_array, lo, hi in slices:
+            rows.extend(row_array[lo:hi])
+        rows.sort()
+        return rows
+
+
+def _indexable_comparisons(condition):
+    """WHERE条件中必须成立的比较（顶层AND的各项）"""
+    if isinstance(condition, Comparison):
+        return [condition]
+    if isinstance(condition, BoolOp) and condition.op == 'AND':
+        result = []
+        for operand in condition.operands:
+            result.extend(_indexable_comparisons(operand))
+        return result
+    return []
+
+
+def choose_index(table, condition, col_names):
+    """选择WHERE条件可以使用的索引，返回 (索引, 运算符, 常量)；没有可用的索引时返回None
+
+    只使用 "列 op 常量" 形式、且属于顶层AND的比较；优先使用等值比较，
+    其次按二分查找估计的行数选择结果最少的范围比较。
+    """
+    if not getattr(table, 'indexes', None) or condition is None:
+        return None
+    by_column = {index.col_index: index for index in table.active_indexes()}
+
+    candidates = []
+    for comparison in _indexable_comparisons(condition):
+        left, op, right = comparison.left, comparison.op, comparison.right
+        if op not in INDEXABLE_OPERATORS:
+            continue
+        if isinstance(left, Literal) and isinstance(right, ColumnRef):
+            left, right, op = right, left, MIRRORED_OPERATORS[op]
+        if not isinstance(left, ColumnRef) or not isinstance(right, Literal):
+            continue
+        index = by_column.get(find_column(col_names, left))
+        if index is not None:
+            candidates.append((op != '=', index, op, right.value))
+
+    best = None
+    for is_range, index, op, value in sorted(candidates, key=lambda c: c[0]):
+        if not is_range:
+            return index, op, value
+        count = index.estimate(op, value)
+        if count is not None and (best is None or count < best[0]):
+            best = (count, index, op, value)
+    if best is None:
+        return None
+    return best[1:]
+
+
+def index_lookup(table, condition, col_names):
+    """用表上的索引查找可能满足WHERE条件的行号（升序）
+
+    索引的选择见 choose_index，返回的行仍需用完整条件过滤。没有可用的索引时返回None。
+    """
+    choice = choose_index(table, condition, col_names)
+    if choice is None:
+        return None
+    index, op, value = choice
+    return index.lookup(op, value)
@@ -0,0 +1,204 @@
+"""表级读写锁：多个线程共享一个 SQLExecutor 时，保证每条语句看到一致的数据
+
+每条语句执行前按 statement_locks 的结果加锁，执行结束后释放：
+
+    SELECT / EXPLAIN / ANALYZE 表    数据库读锁 + 涉及的表的读锁，多个查询可以同时执行
+    INSERT / UPDATE / DELETE         数据库读锁 + 目标表的写锁
+    CREATE/ALTER/DROP、ANALYZE 全部表等其他语句   数据库写锁（独占整个数据库）
+    SHOW TABLES                      数据库读锁
+
+表锁按表名的顺序获取，写语句只锁一个表，因此不会出现死锁。持久化模式下写语句共用同一个
+预写日志缓冲，还要依次获取同一个互斥锁；检查点需要数据库写锁。
+
+同一线程可以重复获取读锁；已持有读锁的线程再请求同一把锁的写锁时抛出 LockConflict，
+而不是永远等待。事务中的语句和 execute_iter 的迭代在快照上执行，不持有锁（见 transaction.py）。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+# 只读取数据的语句
+READ_ONLY_TYPES = {'SELECT', 'EXPLAIN', 'ANALYZE', 'SHOW_TABLES'}
+# 只修改一个表中数据的语句
+DML_TYPES = {'INSERT', 'UPDATE', 'DELETE'}
+
+
+class LockConflict(Exception):
+    """当前线程已持有读锁，又请求同一把锁的写锁"""
+
+
+class ReadWriteLock:
+    """写者优先的读写锁：有写者等待时，新的读者排在写者之后（已持有读锁的线程除外）"""
+
+    def __init__(self, name):
+        self.name = name
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = {}          # 线程 id -> 持有读锁的次数
+        self.writer = None         # 持有写锁的线程 id
+        self.writer_depth = 0
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        """获取读锁，返回等待的秒数"""
+        me = threading.get_ident()
+        with self.condition:
+            if me in self.readers or self.writer == me:
+                self.readers[me] = self.readers.get(me, 0) + 1
+                return 0.0
+            waited = 0.0
+            if self.writer is not None or self.waiting_writers:
+                start = time.perf_counter()
+                while self.writer is not None or self.waiting_writers:
+                    self.condition.wait()
+                waited = time.perf_counter() - start
+            self.readers[me] = 1
+            return waited
+
+    def release_read(self):
+        me = threading.get_ident()
+        with self.condition:
+            count = self.readers[me] - 1
+            if count:
+                self.readers[me] = count
+                return
+            del self.readers[me]
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        """获取写锁，返回等待的秒数；当前线程持有读锁时抛出 LockConflict"""
+        me = threading.get_ident()
+        with self.condition:
+            if self.writer == me:
+                self.writer_depth += 1
+                return 0.0
+            if me in self.readers:
+                raise LockConflict(f"当前线程持有{self.name}的读锁，不能同时修改")
+            waited = 0.0
+            if self.writer is not None or self.readers:
+                start = time.perf_counter()
+                self.waiting_writers += 1
+                try:
+                    while self.writer is not None or self.readers:
+                        self.condition.wait()
+                finally:
+                    self.waiting_writers -= 1
+                waited = time.perf_counter() - start
+            self.writer = me
+            self.writer_depth = 1
+            return waited
+
+    def release_write(self):
+        with self.condition:
+            self.writer_depth -= 1
+            if not self.writer_depth:
+                self.writer = None
+                self.condition.notify_all()
+
+
+def statement_locks(statement):
+    """语句需要的锁：返回 (数据库锁模式, {表名: 锁模式})，模式为 'read' 或 'write'"""
+    if statement.type in DML_TYPES:
+        return 'read', {statement.table: 'write'}
+    if statement.type == 'SELECT':
+        return 'read', dict.fromkeys(statement.tables, 'read')
+    if statement.type == 'EXPLAIN':
+        return 'read', dict.fromkeys(statement.statement.tables, 'read')
+    if statement.type == 'ANALYZE' and statement.table is not None:
+        return 'read', {statement.table: 'read'}
+    if statement.type == 'SHOW_TABLES':
+        return 'read', {}
+    return 'write', {}
+
+
+class LockManager:
+    """数据库和各表的读写锁，并统计获取锁的次数和等待时间"""
+
+    def __init__(self, serialize_writes=False):
+        self.database = ReadWriteLock('数据库')
+        self.tables = {}                   # 表名 -> ReadWriteLock，第一次使用时创建
+        self.guard = threading.Lock()      # 保护 tables 和统计
+        # 持久化模式下写语句依次执行，直到修改写入预写日志；fsync 在释放锁之后（组提交）
+        self.write_mutex = threading.RLock() if serialize_writes else None
+        self.acquisitions = {'read': 0, 'write': 0}
+        self.waits = {'read': 0, 'write': 0}
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def table_lock(self, name):
+        with self.guard:
+            lock = self.tables.get(name)
+            if lock is None:
+                lock = self.tables[name] = ReadWriteLock(f"表 {name}")
+            return lock
+
+    def _acquire(self, lock, mode):
+        waited = lock.acquire_read() if mode == 'read' else lock.acquire_write()
+        self._record(mode, waited)
+
+    def _record(self, mode, waited):
+        with self.guard:
+            self.acquisitions[mode] += 1
+            if waited:
+                self.waits[mode] += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    @staticmethod
+    def _release(lock, mode):
+        if mode == 'read':
+            lock.release_read()
+        else:
+            lock.release_write()
+
+    @contextmanager
+    def holding(self, database_mode, table_modes=None, write=False):
+        """持有数据库锁和各表的锁；write 为真且需要依次写入时还持有写互斥锁"""
+        held = []
+        try:
+            self._acquire(self.database, database_mode)
+            held.append((self.database, database_mode))
+            if database_mode == 'read' and table_modes:
+                for name in sorted(table_modes):
+                    lock = self.table_lock(name)
+                    self._acquire(lock, table_modes[name])
+                    held.append((lock, table_modes[name]))
+            if write and self.write_mutex is not None:
+                waited = 0.0
+                if not self.write_mutex.acquire(blocking=False):
+                    start = time.perf_counter()
+                    self.write_mutex.acquire()
+                    waited = time.perf_counter() - start
+                self._record('write', waited)
+                held.append((self.write_mutex, None))
+            yield
+        finally:
+            for lock, mode in reversed(held):
+                if mode is None:
+                    lock.release()
+                else:
+                    self._release(lock, mode)
+
+    def statement(self, statement):
+        """执行语句期间持有它需要的锁"""
+        database_mode, table_modes = statement_locks(statement)
+        return self.holding(database_mode, table_modes, statement.type not in READ_ONLY_TYPES)
+
+    def exclusive(self):
+        """独占整个数据库（检查点等）"""
+        return self.holding('write')
+
+    def stats(self):
+        """获取锁的次数、需要等待的次数和等待时间"""
+        with self.guard:
+            waits = self.waits['read'] + self.waits['write']
+            return {
+                'read_acquisitions': self.acquisitions['read'],
+                'write_acquisitions': self.acquisitions['write'],
+                'read_waits': self.waits['read'],
+                'write_waits': self.waits['write'],
+                'total_wait_ms': self.wait_seconds * 1000,
+                'avg_wait_ms': self.wait_seconds / waits * 1000 if waits else 0.0,
+                'max_wait_ms': self.max_wait_seconds * 1000,
+            }
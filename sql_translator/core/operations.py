@@ -1,20 +1,48 @@
+import heapq
+import threading
+from itertools import islice
+
+from sql_translator.core.aggregate import (
+    accumulator_factory, aggregate_type, collect_aggregates, group_results,
+    hash_aggregate, merge_groups, replace_aggregates
+)
+from sql_translator.core.ast_nodes import Aggregate, OrderItem
+from sql_translator.core.index import index_key, index_lookup
+from sql_translator.core.planner import plan_select
+from sql_translator.core.predicate import compile_condition, find_column
+from sql_translator.core.profiler import QueryProfile, current_profile
+from sql_translator.core.storage import column_kind, create_table_storage
+from sql_translator.core.tracing import current_trace
+from sql_translator.core.vectorized import available as vectorized_available, vector_scan
+
+
 class BaseOperation:
     """SQL操作的基类"""
 
-    def __init__(self, tables, data):
+    def __init__(self, tables, data, parallel=None):
         self.tables = tables
         self.data = data
-
-    def parse_condition(self, condition):
-        """解析WHERE条件"""
-        operators = ['=', '>', '<', '>=', '<=', '!=']
-        for op in operators:
-            if op in condition:
-                col, value = condition.split(op, 1)  # 只分割第一个
-                col = col.strip()
-                value = value.strip().strip("'")
-                return col, op, value
-        return None, None, None
+        # 大表扫描使用的 ParallelScanner，None表示总是串行扫描
+        self.parallel = parallel
+
+    def parallel_enabled(self, table):
+        """该表的扫描是否在进程池中并行执行"""
+        return self.parallel is not None and self.parallel.enabled(table)
+
+    def plan_select(self, statement):
+        """选择SELECT语句的执行计划，跟踪中时记录耗时（见 tracing.py）"""
+        trace = current_trace()
+        if trace is None:
+            return plan_select(statement, self.tables, self.data)
+        with trace.planning():
+            return plan_select(statement, self.tables, self.data)
+
+    @staticmethod
+    def count_scanned(count):
+        """跟踪中时计入从表中读取的行数"""
+        trace = current_trace()
+        if trace is not None:
+            trace.rows_scanned += count
 
     def get_column_index(self, col_names, target_col):
         """获取列索引，不区分大小写"""
@@ -24,108 +52,88 @@ class BaseOperation:
                 return i
         return -1
 
+    def compile_condition(self, condition, col_names):
+        """把WHERE条件编译为 predicate(row) -> bool，结果带缓存"""
+        return compile_condition(condition, col_names)
+
     def evaluate_condition(self, row, col_names, condition):
         """评估条件是否满足"""
-        if not condition:
-            return True
-
-        col, op, value = self.parse_condition(condition)
-        if not col or not op:
-            return True
-
-        # 处理带表名的列（table.column）
-        if '.' in col:
-            table_name, col_name = col.split('.', 1)
-            # 在多表查询中，需要特殊处理
-            col_index = self.get_column_index(col_names, col_name)
-        else:
-            col_index = self.get_column_index(col_names, col)
+        return compile_condition(condition, col_names)(row)
 
-        if col_index == -1:
-            return True
-
-        row_value = row[col_index]
-
-        # 尝试将值转换为数字进行比较
-        try:
-            row_value = float(row_value)
-            value = float(value)
-        except ValueError:
-            pass
-
-        if op == '=':
-            return row_value == value
-        elif op == '>':
-            return row_value > value
-        elif op == '<':
-            return row_value < value
-        elif op == '>=':
-            return row_value >= value
-        elif op == '<=':
-            return row_value <= value
-        elif op == '!=':
-            return row_value != value
-        return True
+    def match_rows(self, table, condition, col_names):
+        """返回满足条件的行号列表（升序）
+
+        表上有可用的索引时只检查索引找到的候选行，否则全表扫描（大表可以并行扫描）。
+        """
+        predicate = self.compile_condition(condition, col_names)
+        candidates = index_lookup(table, condition, col_names)
+        if candidates is None:
+            self.count_scanned(len(table))
+            if self.parallel_enabled(table):
+                return self.parallel.match_rows(table, condition, col_names)
+            return [i for i, row in zip(table.row_ids(), table) if predicate(row)]
+        self.count_scanned(len(candidates))
+        return [i for i in candidates if predicate(table[i])]
 
 
 class CreateTableOperation(BaseOperation):
     """CREATE TABLE操作实现"""
 
-    def execute(self, sql):
-        """解析CREATE TABLE语句"""
-        # 首先找到表名
-        table_name = sql.split('(')[0].split()[-1].strip()
-
-        # 提取列定义部分
-        columns_str = sql[sql.find('(') + 1:sql.rfind(')')]
-
-        # 分割列定义，但要注意括号内的内容
-        columns = []
-        current_col = ""
-        bracket_count = 0
-
-        for char in columns_str:
-            if char == '(':
-                bracket_count += 1
-                current_col += char
-            elif char == ')':
-                bracket_count -= 1
-                current_col += char
-            elif char == ',' and bracket_count == 0:
-                columns.append(current_col.strip())
-                current_col = ""
-            else:
-                current_col += char
+    def __init__(self, tables, data, storage='row'):
+        super().__init__(tables, data)
+        # 新建表使用的存储方式：'row'（行式）或 'columnar'（列式）
+        self.storage = storage
 
-        if current_col.strip():
-            columns.append(current_col.strip())
-
-        table_structure = {}
-        for col in columns:
-            col = col.strip()
-            # 找到第一个空格的位置，用于分割列名和类型
-            first_space = col.find(' ')
-            if first_space != -1:
-                col_name = col[:first_space].strip()
-                col_type = col[first_space:].strip()
-                table_structure[col_name] = col_type
+    def execute(self, statement):
+        """执行CREATE TABLE语句"""
+        table_name = statement.table
+        table_structure = {col.name: col.col_type for col in statement.columns}
 
         self.tables[table_name] = table_structure
-        self.data[table_name] = []
+        self.data[table_name] = create_table_storage(list(table_structure.values()), self.storage)
         return f"创建表 {table_name} 成功"
 
 
+def _check_int_value(value):
+    if value.quoted:
+        return f"'{value.sql()}' 不应该使用引号，因为它是INT类型"
+    try:
+        int(value.value)
+    except ValueError:
+        return f"'{value.sql()}' 不是有效的整数"
+    return None
+
+
+def _check_char_value(value):
+    if not value.quoted:
+        return f"{value.sql()} 应该使用引号，因为它是字符串类型"
+    return None
+
+
+def _check_decimal_value(value):
+    if value.quoted:
+        return f"'{value.sql()}' 不应该使用引号，因为它是数值类型"
+    try:
+        float(value.value)
+    except ValueError:
+        return f"'{value.sql()}' 不是有效的数值"
+    return None
+
+
+# INSERT 列清单中没有的列的值，与 ALTER TABLE ADD 新增列的默认值相同
+MISSING_VALUE = ''
+
+
 class InsertOperation(BaseOperation):
     """INSERT操作实现"""
 
-    def execute(self, sql):
-        """解析INSERT语句"""
-        parts = sql.split('VALUES')
-        table_name = parts[0].split()[2].strip()
-        # 先去除所有空格，再去除括号，最后分割
-        values = parts[1].strip().strip('()').split(',')
-        # 只去除空格，保留引号
-        values = [v.strip() for v in values]
+    def execute(self, statement):
+        """执行INSERT语句，支持 VALUES (...), (...) 一次插入多行
+
+        所有行先按列批量检查类型，全部通过后一次性追加；任何一行有错误时不插入任何数据。
+        """
+        table_name = statement.table
+        rows = statement.rows
 
         if table_name not in self.data:
             return f"表 {table_name} 不存在"
@@ -133,95 +141,168 @@ class InsertOperation(BaseOperation):
         # 获取表结构
         table_structure = self.tables[table_name]
         col_types = list(table_structure.values())
+        positions = self.column_positions(statement, list(table_structure.keys()))
+        if isinstance(positions, str):
+            return positions
 
         # 检查值的数量是否匹配列数
-        if len(values) != len(col_types):
-            return f"错误：值的数量({len(values)})与列数({len(col_types)})不匹配"
-
-        # 检查每个值的类型
-        for i, (value, type_str) in enumerate(zip(values, col_types)):
-            # 检查是否带有引号
-            has_quotes = value.startswith("'") and value.endswith("'")
-            # 去除引号用于类型检查
-            value_without_quotes = value.strip("'")
-
-            if 'INT' in type_str.upper():
-                if has_quotes:
-                    return f"错误：第{i + 1}列的值 '{value}' 不应该使用引号，因为它是INT类型"
-                try:
-                    int(value_without_quotes)
-                except ValueError:
-                    return f"错误：第{i + 1}列的值 '{value}' 不是有效的整数"
-            elif 'VARCHAR' in type_str.upper() or 'CHAR' in type_str.upper():
-                if not has_quotes:
-                    return f"错误：第{i + 1}列的值 {value} 应该使用引号，因为它是字符串类型"
-            elif 'DECIMAL' in type_str.upper() or 'FLOAT' in type_str.upper() or 'DOUBLE' in type_str.upper():
-                if has_quotes:
-                    return f"错误：第{i + 1}列的值 '{value}' 不应该使用引号，因为它是数值类型"
-                try:
-                    float(value_without_quotes)
-                except ValueError:
-                    return f"错误：第{i + 1}列的值 '{value}' 不是有效的数值"
-
-        # 存储时去除引号
-        values = [v.strip("'") for v in values]
-        self.data[table_name].append(values)
-        return f"向表 {table_name} 插入数据成功"
+        for r, values in enumerate(rows):
+            if len(values) != len(positions):
+                return (f"错误：{self.row_label(r, len(rows))}值的数量({len(values)})"
+                        f"与列数({len(positions)})不匹配")
+
+        # 按列检查每个值的类型
+        for j, i in enumerate(positions):
+            check = self.value_checker(col_types[i])
+            if check is None:
+                continue
+            for r, values in enumerate(rows):
+                error = check(values[j])
+                if error:
+                    return f"错误：{self.row_label(r, len(rows))}第{i + 1}列的值 {error}"
+
+        # 存储去除引号后的值
+        if statement.columns is None:
+            new_rows = [[value.value for value in values] for values in rows]
+        else:
+            new_rows = []
+            for values in rows:
+                row = [MISSING_VALUE] * len(col_types)
+                for i, value in zip(positions, values):
+                    row[i] = value.value
+                new_rows.append(row)
+        self.data[table_name].extend(new_rows)
+        if len(rows) == 1:
+            return f"向表 {table_name} 插入数据成功"
+        return f"向表 {table_name} 插入 {len(rows)} 行数据成功"
+
+    @staticmethod
+    def column_positions(statement, col_names):
+        """INSERT 中各个值对应的列号列表；没有列清单时为表的所有列，列不存在或重复时返回错误信息
+
+        列清单中没有的列取 MISSING_VALUE。
+        """
+        if statement.columns is None:
+            return list(range(len(col_names)))
+        lookup = {name.upper(): i for i, name in enumerate(col_names)}
+        positions = []
+        for name in statement.columns:
+            i = lookup.get(name.upper())
+            if i is None:
+                return f"错误：表 {statement.table} 中没有列 {name}"
+            if i in positions:
+                return f"错误：列 {name} 在列清单中重复"
+            positions.append(i)
+        return positions
+
+    @staticmethod
+    def row_label(r, row_count):
+        """多行插入时错误信息中的行号"""
+        return f"第{r + 1}行" if row_count > 1 else ''
+
+    @staticmethod
+    def value_checker(type_str):
+        """返回列类型对应的常量检查函数，没有限制的类型返回None"""
+        type_upper = type_str.upper()
+        if 'INT' in type_upper:
+            return _check_int_value
+        if 'CHAR' in type_upper:
+            return _check_char_value
+        if 'DECIMAL' in type_upper or 'FLOAT' in type_upper or 'DOUBLE' in type_upper:
+            return _check_decimal_value
+        return None
+
+    def check_value(self, i, value, type_str):
+        """检查第i列的常量是否符合列类型，返回错误信息，符合时返回None"""
+        check = self.value_checker(type_str)
+        error = check(value) if check else None
+        if error:
+            return f"错误：第{i + 1}列的值 {error}"
+        return None
+
+    def convert_parameter(self, i, value, kind):
+        """把绑定到第i列的Python值转换为列类型，返回 (转换后的值, 错误信息)
+
+        kind 为 column_kind 的结果。INT列接受整数或整数字符串，数值列接受数字或数字字符串，
+        字符串列只接受字符串。
+        """
+        if kind == 'int':
+            if isinstance(value, bool) or not isinstance(value, (int, str)):
+                return None, f"错误：第{i + 1}列的参数 {value!r} 不是有效的整数"
+            try:
+                return int(value), None
+            except ValueError:
+                return None, f"错误：第{i + 1}列的参数 {value!r} 不是有效的整数"
+        if kind == 'float':
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                return None, f"错误：第{i + 1}列的参数 {value!r} 不是有效的数值"
+            try:
+                return float(value) if isinstance(value, str) else value, None
+            except ValueError:
+                return None, f"错误：第{i + 1}列的参数 {value!r} 不是有效的数值"
+        if not isinstance(value, str):
+            return None, f"错误：第{i + 1}列的参数 {value!r} 应该是字符串"
+        return value, None
 
 
 class DeleteOperation(BaseOperation):
     """DELETE操作实现"""
 
-    def execute(self, sql):
-        """解析DELETE语句"""
-        parts = sql.split('WHERE')
-        table_name = parts[0].split()[2].strip()
+    def execute(self, statement):
+        """执行DELETE语句"""
+        table_name = statement.table
 
         if table_name not in self.data:
             return f"表 {table_name} 不存在"
 
-        if 'WHERE' in sql:
-            condition = parts[1].strip()
+        if statement.where is not None:
             col_names = list(self.tables[table_name].keys())
-            # 过滤掉不满足条件的数据
-            self.data[table_name] = [
-                row for row in self.data[table_name]
-                if not self.evaluate_condition(row, col_names, condition)
-            ]
+            table = self.data[table_name]
+            if (index_lookup(table, statement.where, col_names) is not None
+                    or self.parallel_enabled(table)):
+                # 通过索引或并行扫描找到要删除的行
+                table.delete_rows(self.match_rows(table, statement.where, col_names))
+            else:
+                predicate = self.compile_condition(statement.where, col_names)
+                self.count_scanned(len(table))
+                # 过滤掉不满足条件的数据
+                table.retain(lambda row: not predicate(row))
             return f"从表 {table_name} 删除数据成功"
         else:
-            self.data[table_name] = []
+            self.data[table_name].clear()
             return f"清空表 {table_name} 成功"
 
 
 class SelectOperation(BaseOperation):
     """SELECT操作实现"""
 
-    def execute(self, sql):
-        """解析SELECT语句"""
-        sql = sql.strip()
-
-        # 使用更精确的方式分割SQL语句
-        parts = self.split_sql_parts(sql)
-
-        # 解析SELECT子句
-        select_part = parts.get('SELECT', '')
-        columns = select_part.strip()
-
-        # 解析FROM子句
-        from_part = parts.get('FROM', '')
-        if not from_part:
+    def __init__(self, tables, data, vectorized=True, parallel=None, local=None):
+        super().__init__(tables, data, parallel)
+        # 各线程最近一次查询中每个JOIN选择的执行策略（join_strategies 属性）；
+        # 执行器传入自己的线程局部对象，事务和 execute_iter 的快照中的查询也记在同一处
+        self.local = local if local is not None else threading.local()
+        # 是否在列式存储的数值列上使用 NumPy 向量化执行（见 vectorized.py）
+        self.vectorized = vectorized and vectorized_available()
+
+    def execute(self, statement):
+        """执行SELECT语句"""
+        rows = self.iter_rows(statement)
+        if isinstance(rows, str):
+            return rows
+        return list(rows)
+
+    def iter_rows(self, statement):
+        """构建SELECT语句的执行管道，返回逐行产出结果的迭代器
+
+        管道由生成器串联：扫描 -> 过滤 -> 投影 -> 排序/LIMIT -> 格式化，每一行读出后
+        依次经过各个阶段，中间不生成完整的列表；只有排序、分组聚合和在左侧建表的
+        哈希连接需要先读完输入。表、列、LIMIT 等错误在构建时检查并返回错误信息。
+        迭代结束前修改查询中的表，结果未定义。
+        """
+        tables = statement.tables
+        if not tables:
             return "错误：缺少FROM子句"
 
-        # 解析WHERE子句
-        where_part = parts.get('WHERE', '')
-
-        # 解析ORDER BY子句
-        order_by_part = parts.get('ORDER BY', '')
-
-        # 解析表和JOIN
-        tables, join_conditions = self.parse_from_clause(from_part)
-
         # 检查所有表是否存在
         for table in tables:
             if table not in self.data:
@@ -238,299 +319,489 @@ class SelectOperation(BaseOperation):
             table_types = list(self.tables[table].values())
             all_col_names[table] = table_cols
             all_col_types[table] = table_types
-            combined_col_names.extend(table_cols)
             combined_col_types.extend(table_types)
+            if len(tables) == 1:
+                combined_col_names.extend(table_cols)
+            else:
+                # 多表查询时使用 "表.列"，以便区分不同表中的同名列
+                combined_col_names.extend(f"{table}.{col}" for col in table_cols)
 
-        # 执行JOIN操作
-        if len(tables) == 1:
-            # 单表查询
-            result = self.data[tables[0]].copy()
-        else:
-            # 多表JOIN
-            result = self.execute_joins(tables, join_conditions, all_col_names)
+        # 扫描和连接：单表条件下推到扫描，多表查询由执行计划决定连接顺序
+        plan = self.plan(statement)
+        rows = self.execute_plan(plan, combined_col_names)
+        vector = self.vector_scan(plan)
+        parallel = self.parallel_scan(plan)
+
+        limits = self.resolve_limit(statement)
+        if isinstance(limits, str):
+            return limits
+        limit, offset = limits
 
-        # 处理WHERE条件
-        if where_part:
-            result = [
-                row for row in result
-                if self.evaluate_condition(row, combined_col_names, where_part)
-            ]
+        # 分组聚合直接消费行，不生成中间结果
+        if statement.is_aggregate:
+            return self.execute_aggregate(statement, rows, combined_col_names, combined_col_types,
+                                          limit, offset, vector, parallel)
 
         # 处理列选择
-        if columns == '*':
-            selected_result = result
+        if not statement.columns:
+            selected_indices = None
             selected_col_names = combined_col_names
             selected_col_types = combined_col_types
         else:
-            selected_result, selected_col_names, selected_col_types = self.select_columns(
-                result, columns, tables, all_col_names, all_col_types
-            )
+            selected = self.resolve_columns(statement.columns, tables, all_col_names, all_col_types)
+            if isinstance(selected, str):
+                return selected
+            selected_indices, selected_col_names, selected_col_types = selected
+
+        if vector is not None:
+            vector_rows = self.vector_rows(vector, statement.order_by, selected_indices,
+                                           selected_col_names, limit, offset)
+            if vector_rows is not None:
+                # 列式存储中的值已经是列的类型，不需要格式化
+                return self.stage(vector_rows, 'vectorized', plan.scans[0].table)
+
+        if parallel is not None:
+            rows = self.stage(
+                self.parallel_rows(parallel, statement.order_by, selected_indices,
+                                   selected_col_names, selected_col_types, limit, offset),
+                'parallel_scan', parallel.table)
+        else:
+            if not statement.order_by:
+                # 没有排序时取够 OFFSET + LIMIT 行就停止扫描
+                rows = self.limit_stage(rows, limit, offset)
+            if selected_indices is not None:
+                rows = self.stage(([row[i] for i in selected_indices] for row in rows),
+                                  'project', ', '.join(selected_col_names))
 
         # 处理ORDER BY
-        if order_by_part:
-            selected_result = self.apply_order_by(
-                selected_result, order_by_part, selected_col_names, selected_col_types
-            )
+        if statement.order_by:
+            rows = self.stage(
+                self.sort_rows(rows, statement.order_by, selected_col_names, selected_col_types,
+                               None if limit is None else offset + limit),
+                'sort', order_by_sql(statement.order_by))
+            rows = self.limit_stage(rows, limit, offset)
 
         # 格式化结果
-        formatted_result = self.format_result(selected_result, selected_col_types)
-
-        return formatted_result
-
-    def split_sql_parts(self, sql):
-        """将SQL语句分割为各个子句"""
-        parts = {}
-        keywords = ['SELECT', 'FROM', 'WHERE', 'ORDER BY', 'GROUP BY', 'HAVING']
-
-        sql_upper = sql.upper()
-        positions = {}
-
-        # 找到所有关键字的位置
-        for keyword in keywords:
-            pos = sql_upper.find(keyword)
-            if pos != -1:
-                positions[keyword] = pos
-
-        # 按位置排序
-        sorted_positions = sorted(positions.items(), key=lambda x: x[1])
-
-        # 提取各部分
-        for i, (keyword, pos) in enumerate(sorted_positions):
-            start = pos + len(keyword)
-            if i + 1 < len(sorted_positions):
-                end = sorted_positions[i + 1][1]
+        return self.stage(self.format_rows(rows, selected_col_types), 'format')
+
+    def execute_aggregate(self, statement, rows, col_names, col_types, limit=None, offset=0,
+                          vector=None, parallel=None):
+        """GROUP BY / HAVING / 聚合函数查询，返回逐行产出结果的迭代器
+
+        rows 只遍历一次，每个分组只保存一组累加器。聚合结果的中间行为
+        [分组列..., 聚合结果...]，HAVING、ORDER BY 和 LIMIT 作用于中间行，最后按选择列投影。
+        vector 不为None时先尝试向量化聚合，不支持时再按行聚合；parallel 不为None时
+        在进程池中分段聚合。
+        """
+        if not statement.columns:
+            return "错误：分组查询不能使用 SELECT *"
+
+        key_indices = []
+        for column in statement.group_by:
+            idx = find_column(col_names, column)
+            if idx == -1:
+                return f"列 {column.sql()} 不存在"
+            key_indices.append(idx)
+
+        # 选择列、HAVING、ORDER BY 中用到的所有聚合函数
+        aggregates = []
+        for column in statement.columns:
+            collect_aggregates(column, aggregates)
+        collect_aggregates(statement.having, aggregates)
+        for item in statement.order_by:
+            collect_aggregates(item.column, aggregates)
+
+        arg_indices = []
+        factories = []
+        agg_types = []
+        for aggregate in aggregates:
+            if aggregate.argument is None:
+                idx, arg_type = 0, 'INT'
             else:
-                end = len(sql)
-
-            parts[keyword] = sql[start:end].strip()
-
-        return parts
-
-    def parse_from_clause(self, from_clause):
-        """解析FROM子句，提取表和JOIN条件"""
-        tables = []
-        join_conditions = []
-
-        # 简单的JOIN解析
-        parts = from_clause.split()
-        i = 0
-
-        while i < len(parts):
-            if parts[i].upper() not in ['JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL', 'ON']:
-                # 这是一个表名
-                tables.append(parts[i])
-            elif parts[i].upper() == 'JOIN':
-                # 下一个应该是表名
-                if i + 1 < len(parts):
-                    tables.append(parts[i + 1])
-                    i += 1
-            elif parts[i].upper() == 'ON':
-                # 收集ON条件
-                condition_parts = []
-                i += 1
-                while i < len(parts) and parts[i].upper() not in ['JOIN', 'INNER', 'LEFT', 'RIGHT', 'FULL']:
-                    condition_parts.append(parts[i])
-                    i += 1
-                join_conditions.append(' '.join(condition_parts))
-                i -= 1  # 回退一步，因为外层循环会增加
-            i += 1
-
-        return tables, join_conditions
-
-    def execute_joins(self, tables, join_conditions, all_col_names):
-        """执行JOIN操作"""
-        result = self.data[tables[0]].copy()
-
-        for i, table in enumerate(tables[1:], 1):
-            new_result = []
-            for row1 in result:
-                for row2 in self.data[table]:
-                    # 检查JOIN条件
-                    if i - 1 < len(join_conditions):
-                        condition = join_conditions[i - 1]
-                        if self.evaluate_join_condition(row1, row2, tables[:i], [table], condition, all_col_names):
-                            new_result.append(row1 + row2)
-                    else:
-                        # 没有JOIN条件，执行笛卡尔积
-                        new_result.append(row1 + row2)
-            result = new_result
-
-        return result
-
-    def evaluate_join_condition(self, row1, row2, tables1, tables2, condition, all_col_names):
-        """评估JOIN条件"""
-        # 解析JOIN条件（例如：table1.column = table2.column）
-        parts = condition.split('=')
-        if len(parts) != 2:
-            return False
-
-        col1_spec = parts[0].strip()
-        col2_spec = parts[1].strip()
-
-        # 解析列规格（table.column）
-        table1_name, col1_name = self.parse_column_spec(col1_spec, tables1)
-        table2_name, col2_name = self.parse_column_spec(col2_spec, tables2)
-
-        if not table1_name or not table2_name:
-            return False
-
-        # 获取列索引
-        idx1 = self.get_column_index(all_col_names[table1_name], col1_name)
-        idx2 = self.get_column_index(all_col_names[table2_name], col2_name)
-
-        if idx1 == -1 or idx2 == -1:
-            return False
-
-        # 计算在合并行中的实际索引
-        offset1 = sum(len(all_col_names[t]) for t in tables1 if t != table1_name)
-        actual_idx1 = offset1 + idx1
-
-        # row2的索引就是idx2
-        actual_idx2 = idx2
-
-        # 比较值
-        return row1[actual_idx1] == row2[actual_idx2]
-
-    def parse_column_spec(self, col_spec, available_tables):
-        """解析列规格，返回表名和列名"""
-        if '.' in col_spec:
-            table_name, col_name = col_spec.split('.', 1)
-            if table_name in available_tables:
-                return table_name, col_name
+                idx = find_column(col_names, aggregate.argument)
+                if idx == -1:
+                    return f"列 {aggregate.argument.sql()} 不存在"
+                arg_type = col_types[idx]
+            arg_indices.append(idx)
+            factories.append(accumulator_factory(aggregate, arg_type))
+            agg_types.append(aggregate_type(aggregate, arg_type))
+
+        # 中间行的列名：分组列沿用原列名，聚合结果使用不会与列名冲突的内部名称
+        agg_names = {aggregate: f"#{i}" for i, aggregate in enumerate(aggregates)}
+        group_names = [col_names[i] for i in key_indices]
+        inter_names = group_names + list(agg_names.values())
+        inter_types = [col_types[i] for i in key_indices] + agg_types
+
+        projection = []
+        for column in statement.columns:
+            if isinstance(column, Aggregate):
+                projection.append(len(key_indices) + aggregates.index(column))
+                continue
+            idx = find_column(group_names, column)
+            if idx == -1:
+                if find_column(col_names, column) == -1:
+                    return f"列 {column.sql()} 不存在"
+                return f"列 {column.sql()} 必须出现在 GROUP BY 子句中或用于聚合函数"
+            projection.append(idx)
+
+        having = None
+        if statement.having is not None:
+            having = self.compile_condition(replace_aggregates(statement.having, agg_names),
+                                            inter_names)
+        order_by = [OrderItem(replace_aggregates(item.column, agg_names), item.desc)
+                    for item in statement.order_by]
+
+        def grouped():
+            groups = None
+            if vector is not None:
+                groups = vector.aggregate(key_indices, arg_indices,
+                                          [aggregate.func for aggregate in aggregates])
+            if groups is None and parallel is not None:
+                groups = self.parallel_aggregate(parallel, key_indices, arg_indices, factories)
+            if groups is None:
+                groups = hash_aggregate(rows, key_indices, arg_indices, factories)
+            yield from groups
+
+        group_by = ', '.join(column.sql() for column in statement.group_by)
+        result = self.stage(grouped(), 'aggregate', f"GROUP BY {group_by}" if group_by else '')
+        if having is not None:
+            result = self.stage(filter(having, result), 'filter', f"HAVING {statement.having.sql()}")
+        if order_by:
+            result = self.stage(
+                self.sort_rows(result, order_by, inter_names, inter_types,
+                               None if limit is None else offset + limit),
+                'sort', order_by_sql(statement.order_by))
+        result = self.limit_stage(result, limit, offset)
+        result = self.stage(([row[i] for i in projection] for row in result),
+                            'project', ', '.join(column.sql() for column in statement.columns))
+        return self.stage(self.format_rows(result, [inter_types[i] for i in projection]), 'format')
+
+    @staticmethod
+    def stage(rows, name, detail=''):
+        """剖析中时把 rows 包装为执行管道的一个阶段，见 profiler.py"""
+        profile = current_profile()
+        if profile is None:
+            return rows
+        return profile.stage(name, detail, rows)
+
+    def limit_stage(self, rows, limit, offset):
+        """LIMIT/OFFSET 阶段，没有 LIMIT 和 OFFSET 时直接返回 rows"""
+        if limit is None and not offset:
+            return rows
+        detail = f"{limit} OFFSET {offset}" if limit is not None else f"OFFSET {offset}"
+        return self.stage(self.slice_rows(rows, limit, offset), 'limit', detail)
+
+    def analyze(self, statement, memory=None, sql=None, parse_ms=0.0):
+        """在剖析中执行查询并读完结果，返回 (QueryProfile, 结果行列表或错误信息)"""
+        profile = QueryProfile(sql, memory, parse_ms)
+        return profile, profile.run(lambda: self.iter_rows(statement))
+
+    @property
+    def last_join_strategies(self):
+        """当前线程最近一次查询中每个JOIN选择的执行策略"""
+        return getattr(self.local, 'join_strategies', [])
+
+    def plan(self, statement):
+        """选择SELECT语句的扫描和连接计划，为当前线程记录每个JOIN的执行策略"""
+        plan = self.plan_select(statement)
+        self.local.join_strategies = plan.strategies
+        return plan
+
+    def vector_scan(self, plan):
+        """单表查询的扫描能向量化执行时返回 VectorScan，否则返回None"""
+        if not self.vectorized or plan.steps or plan.residual is not None:
+            return None
+        scan = plan.scans[0]
+        return vector_scan(self.data[scan.table], scan)
+
+    def vector_rows(self, vector, order_by, selected_indices, selected_col_names, limit, offset):
+        """向量化执行过滤、排序、LIMIT 和投影，返回逐行产出结果的迭代器
+
+        排序列不能向量化排序（不是数值列或含有 NaN）时返回None。
+        """
+        if selected_indices is None:
+            selected_indices = list(range(len(selected_col_names)))
+        order_keys = []
+        for item in order_by:
+            idx = find_column(selected_col_names, item.column)
+            if idx != -1:
+                order_keys.append((selected_indices[idx], item.desc))
+        if not all(vector.sortable(col_index) for col_index, _ in order_keys):
+            return None
+        return vector.select(selected_indices, order_keys, limit, offset)
+
+    def parallel_scan(self, plan):
+        """单表查询的全表扫描能并行执行时返回该扫描的 ScanPlan，否则返回None"""
+        if self.parallel is None or plan.steps or plan.residual is not None:
+            return None
+        scan = plan.scans[0]
+        if scan.index is not None or not self.parallel_enabled(self.data[scan.table]):
+            return None
+        return scan
+
+    def parallel_rows(self, scan, order_by, selected_indices, col_names, col_types, limit, offset):
+        """在工作进程中分段过滤和投影，逐行产出结果
+
+        没有 ORDER BY 时每段只取前 OFFSET + LIMIT 行，合并后再截取；有 ORDER BY 时
+        结果由之后的排序阶段排序，有 LIMIT 时每段先选出排在最前面的 OFFSET + LIMIT 行。
+        """
+        wanted = None if limit is None else offset + limit
+        table = self.data[scan.table]
+        self.count_scanned(len(table))
+        rows = self.parallel.select(table, scan.condition, scan.col_names, _project_partition,
+                                    (selected_indices, order_by, col_names, col_types, wanted))
+        if not order_by:
+            rows = self.slice_rows(iter(rows), limit, offset)
+        yield from rows
+
+    def parallel_aggregate(self, scan, key_indices, arg_indices, factories):
+        """在工作进程中分段分组累加，按段的顺序合并，结果与 hash_aggregate 相同"""
+        table = self.data[scan.table]
+        self.count_scanned(len(table))
+        groups = self.parallel.aggregate(table, scan.condition, scan.col_names,
+                                         key_indices, arg_indices, factories, merge_groups)
+        return group_results(groups, key_indices)
+
+    def scan_rows(self, scan):
+        """扫描一个表，只产出满足下推条件的行；有可用的索引时只读取索引找到的行"""
+        table = self.data[scan.table]
+        if scan.index is None:
+            rows = iter(table)
         else:
-            # 没有指定表名，在可用表中查找
-            for table in available_tables:
-                if col_spec in self.tables[table]:
-                    return table, col_spec
-
-        return None, None
-
-    def select_columns(self, result, columns, tables, all_col_names, all_col_types):
-        """选择指定的列"""
+            index, op, value = scan.index
+            rows = (table[i] for i in index.lookup(op, value))
+        trace = current_trace()
+        if trace is not None:
+            rows = trace.scanned(rows)
+        if current_profile() is not None:
+            detail = scan.table
+            if scan.index is not None:
+                index, op, value = scan.index
+                detail += f" 索引 {index.name} ({index.column} {op} {value})"
+            rows = self.stage(rows, 'scan', detail)
+        condition = scan.condition
+        if condition is not None:
+            rows = self.stage(filter(self.compile_condition(condition, scan.col_names), rows),
+                              'filter', condition.sql())
+        return rows
+
+    def execute_plan(self, plan, col_names):
+        """按执行计划扫描和连接各表，返回逐行产出合并行的迭代器
+
+        合并行的列按书写顺序排列，与 col_names 对应。连接顺序与书写顺序不同且需要还原
+        行的顺序时（plan.restore_order），每个表的行带上它在该表扫描结果中的序号（附加在
+        该表的列之后），连接之后按书写顺序的各表序号排序，结果行的顺序与按书写顺序连接相同。
+        """
+        reordered = plan.restore_order
+        layout = []
+        positions = []   # 计划中合并行的列 -> 实际合并行（含序号）中的列
+        owners = []      # 计划中合并行的列属于第几个扫描
+        tags = []        # 各扫描的序号在实际合并行中的位置
+        rows = None
+        for n, scan in enumerate(plan.scans):
+            right_rows = self.scan_rows(scan)
+            if reordered:
+                right_rows = _tag_rows(right_rows)
+            positions.extend(range(len(layout), len(layout) + len(scan.col_names)))
+            owners.extend([n] * len(scan.col_names))
+            layout = layout + scan.col_names
+            if reordered:
+                tags.append(len(layout))
+                layout = layout + [f"{scan.table}.#"]
+            if n == 0:
+                rows = right_rows
+                continue
+            step = plan.steps[n - 1]
+            condition = step.condition
+            if step.strategy == 'hash_join':
+                left_idx, right_idx = step.keys
+                rows = self.stage(self.hash_join(rows, right_rows, positions[left_idx], right_idx,
+                                                 step.build_side),
+                                  step.strategy, step.scan.table)
+                if condition is not None:
+                    rows = self.stage(filter(self.compile_condition(condition, layout), rows),
+                                      'filter', condition.sql())
+            elif step.strategy == 'nested_loop':
+                predicate = self.compile_condition(condition, layout)
+                rows = self.stage(self.nested_loop_join(rows, right_rows, predicate),
+                                  step.strategy, step.scan.table)
+            else:
+                rows = self.stage(self.cross_join(rows, right_rows),
+                                  step.strategy, step.scan.table)
+
+        if plan.output_map is not None:
+            output_map = [positions[i] for i in plan.output_map]
+            if reordered:
+                written = list(dict.fromkeys(owners[i] for i in plan.output_map))
+                key_indices = [tags[n] for n in written]
+                rows = self.stage(self.written_order(rows, key_indices), 'written_order')
+            rows = ([row[i] for i in output_map] for row in rows)
+        if plan.residual is not None:
+            rows = self.stage(filter(self.compile_condition(plan.residual, col_names), rows),
+                              'filter', plan.residual.sql())
+        return rows
+
+    @staticmethod
+    def written_order(rows, key_indices):
+        """按各表的序号（书写顺序）排序连接结果；第一次取值时读完输入"""
+        yield from sorted(rows, key=lambda row: [row[i] for i in key_indices])
+
+    def hash_join(self, left_rows, right_rows, left_idx, right_idx, build_side='right'):
+        """等值哈希连接，逐行产出合并行
+
+        输出顺序与嵌套循环一致：先按左侧行的顺序，再按右侧行的顺序。
+        在右侧建表时逐行探测左侧输入；在左侧建表时需要先读完右侧。
+        连接键与WHERE条件的 = 使用相同的比较规则（见 index_key），'1' 与 1.0 相等。
+        """
+        if build_side == 'right':
+            # 在右侧建立哈希表，按左侧顺序探测
+            buckets = {}
+            for row2 in right_rows:
+                key = index_key(row2[right_idx])
+                if key is not None:
+                    buckets.setdefault(key, []).append(row2)
+            for row1 in left_rows:
+                matches = buckets.get(index_key(row1[left_idx]))
+                if matches:
+                    for row2 in matches:
+                        yield row1 + row2
+            return
+
+        # 在左侧建立哈希表，按右侧顺序探测，再按左侧顺序输出
+        left_rows = list(left_rows)
+        buckets = {}
+        for pos, row1 in enumerate(left_rows):
+            key = index_key(row1[left_idx])
+            if key is not None:
+                buckets.setdefault(key, []).append(pos)
+        matched = [None] * len(left_rows)
+        for row2 in right_rows:
+            for pos in buckets.get(index_key(row2[right_idx]), ()):
+                if matched[pos] is None:
+                    matched[pos] = []
+                matched[pos].append(row2)
+        for row1, matches in zip(left_rows, matched):
+            if matches:
+                for row2 in matches:
+                    yield row1 + row2
+
+    def cross_join(self, left_rows, right_rows):
+        """笛卡尔积，逐行产出合并行；第一次取值时读完右侧"""
+        right_rows = list(right_rows)
+        for row1 in left_rows:
+            for row2 in right_rows:
+                yield row1 + row2
+
+    def nested_loop_join(self, left_rows, right_rows, predicate):
+        """非等值条件的嵌套循环连接，predicate 作用于合并后的行；第一次取值时读完右侧"""
+        right_rows = list(right_rows)
+        for row1 in left_rows:
+            for row2 in right_rows:
+                row = row1 + row2
+                if predicate(row):
+                    yield row
+
+    def parse_column_spec(self, column, available_tables):
+        """在可用表中查找列引用，返回 (表名, 列在该表中的索引)，找不到返回 (None, -1)"""
+        if column.table:
+            candidates = [column.table] if column.table in available_tables else []
+        else:
+            candidates = available_tables
+        for table in candidates:
+            idx = self.get_column_index(list(self.tables[table].keys()), column.name)
+            if idx != -1:
+                return table, idx
+        return None, -1
+
+    def resolve_columns(self, columns, tables, all_col_names, all_col_types):
+        """解析选择列，返回 (合并行中的索引, 列名, 列类型)，列不存在时返回错误信息"""
         selected_col_indices = []
         selected_col_names = []
         selected_col_types = []
 
-        selected_cols = [col.strip() for col in columns.split(',')]
-
-        for col in selected_cols:
-            if '.' in col:
-                # 带表名的列
-                table_name, col_name = col.split('.', 1)
-                if table_name in tables:
-                    idx = self.get_column_index(all_col_names[table_name], col_name)
-                    if idx != -1:
-                        # 计算在合并结果中的索引
-                        table_idx = tables.index(table_name)
-                        offset = sum(len(all_col_names[t]) for t in tables[:table_idx])
-                        selected_col_indices.append(offset + idx)
-                        selected_col_names.append(col)
-                        selected_col_types.append(all_col_types[table_name][idx])
-            else:
-                # 不带表名的列
-                found = False
-                for table in tables:
-                    idx = self.get_column_index(all_col_names[table], col)
-                    if idx != -1:
-                        table_idx = tables.index(table)
-                        offset = sum(len(all_col_names[t]) for t in tables[:table_idx])
-                        selected_col_indices.append(offset + idx)
-                        selected_col_names.append(col)
-                        selected_col_types.append(all_col_types[table][idx])
-                        found = True
-                        break
-                if not found:
-                    return [], [], [f"列 {col} 不存在"]
-
-        # 选择指定的列
-        selected_result = [[row[i] for i in selected_col_indices] for row in result]
-
-        return selected_result, selected_col_names, selected_col_types
-
-    def apply_order_by(self, result, order_by_part, col_names, col_types):
-        """应用ORDER BY排序"""
-        order_specs = []
-
-        # 解析ORDER BY子句
-        for col_spec in order_by_part.split(','):
-            col_spec = col_spec.strip()
-            if ' DESC' in col_spec.upper():
-                col_name = col_spec.upper().replace(' DESC', '').strip()
-                desc = True
-            else:
-                col_name = col_spec.upper().replace(' ASC', '').strip()
-                desc = False
-
-            # 找到列索引
-            col_idx = self.get_column_index(col_names, col_name)
-            if col_idx != -1:
-                order_specs.append((col_idx, desc))
-
-        # 执行排序
-        if order_specs:
-            for col_idx, is_desc in reversed(order_specs):
-                col_type = col_types[col_idx] if col_idx < len(col_types) else ''
-
-                if col_type and ('INT' in col_type.upper() or 'DECIMAL' in col_type.upper() or
-                                 'FLOAT' in col_type.upper() or 'DOUBLE' in col_type.upper()):
-                    def get_numeric_value(value):
-                        try:
-                            return float(value)
-                        except (ValueError, TypeError):
-                            return 0
-
-                    result.sort(key=lambda row: get_numeric_value(row[col_idx]), reverse=is_desc)
-                else:
-                    result.sort(key=lambda row: str(row[col_idx]).lower(), reverse=is_desc)
-
-        return result
+        for column in columns:
+            table_name, idx = self.parse_column_spec(column, tables)
+            if table_name is None:
+                return f"列 {column.sql()} 不存在"
+            # 计算在合并结果中的索引
+            table_idx = tables.index(table_name)
+            offset = sum(len(all_col_names[t]) for t in tables[:table_idx])
+            selected_col_indices.append(offset + idx)
+            selected_col_names.append(column.sql())
+            selected_col_types.append(all_col_types[table_name][idx])
+
+        return selected_col_indices, selected_col_names, selected_col_types
+
+    def resolve_limit(self, statement):
+        """返回 (limit, offset)，limit 为None表示不限制；值不是非负整数时返回错误信息"""
+        values = []
+        for node in (statement.limit, statement.offset):
+            if node is None:
+                values.append(None)
+                continue
+            try:
+                value = int(node.value)
+            except (ValueError, TypeError):
+                value = -1
+            if value < 0:
+                return f"错误：LIMIT/OFFSET 必须是非负整数，实际为 {node.sql()}"
+            values.append(value)
+        return values[0], values[1] or 0
+
+    @staticmethod
+    def slice_rows(rows, limit, offset):
+        """跳过前 offset 行，最多产出 limit 行；取够之后不再读取输入"""
+        if limit is not None:
+            return islice(rows, offset, offset + limit)
+        return islice(rows, offset, None) if offset else rows
+
+    def sort_rows(self, rows, order_by, col_names, col_types, limit=None):
+        """排序阶段：第一次取值时读完输入并排序，之后逐行产出"""
+        yield from self.apply_order_by(rows, order_by, col_names, col_types, limit)
+
+    def apply_order_by(self, result, order_by, col_names, col_types, limit=None):
+        """应用ORDER BY排序，result 可以是任意可迭代对象，返回列表（见 order_rows）"""
+        return order_rows(result, order_by, col_names, col_types, limit)
 
     def format_result(self, result, col_types):
         """格式化结果，根据列类型转换数据"""
-        formatted_result = []
+        return list(self.format_rows(result, col_types))
 
-        for row in result:
+    def format_rows(self, rows, col_types):
+        """格式化阶段：逐行按列类型转换数据
+
+        每列的转换函数只计算一次；列式存储中的值已经是对应类型，直接保留。
+        """
+        converters = []
+        for type_str in col_types:
+            kind = column_kind(type_str)
+            converters.append(int if kind == 'int' else float if kind == 'float' else None)
+
+        for row in rows:
             formatted_row = []
             for i, value in enumerate(row):
-                if i < len(col_types):
-                    type_str = col_types[i]
-                    if 'INT' in type_str.upper():
-                        try:
-                            formatted_row.append(int(value))
-                        except (ValueError, TypeError):
-                            formatted_row.append(value)
-                    elif 'DECIMAL' in type_str.upper() or 'FLOAT' in type_str.upper() or 'DOUBLE' in type_str.upper():
-                        try:
-                            formatted_row.append(float(value))
-                        except (ValueError, TypeError):
-                            formatted_row.append(value)
-                    else:
-                        formatted_row.append(value)
-                else:
+                convert = converters[i] if i < len(converters) else None
+                if convert is None or type(value) is convert:
                     formatted_row.append(value)
-            formatted_result.append(formatted_row)
-
-        return formatted_result
+                    continue
+                try:
+                    formatted_row.append(convert(value))
+                except (ValueError, TypeError):
+                    formatted_row.append(value)
+            yield formatted_row
 
 
 class UpdateOperation(BaseOperation):
     """UPDATE操作实现"""
 
-    def execute(self, sql):
-        """解析UPDATE语句"""
-        parts = sql.split('SET')
-        table_name = parts[0].split()[1].strip()
+    def execute(self, statement):
+        """执行UPDATE语句"""
+        table_name = statement.table
 
         if table_name not in self.data:
             return f"表 {table_name} 不存在"
 
-        set_part = parts[1].split('WHERE')[0].strip()
-        updates = {}
-        for update in set_part.split(','):
-            col, value = update.split('=', 1)  # 只分割第一个=
-            col = col.strip()
-            value = value.strip().strip("'")
-            updates[col] = value
+        updates = {col: value.value for col, value in statement.assignments}
 
         col_names = list(self.tables[table_name].keys())
 
@@ -539,25 +810,26 @@ class UpdateOperation(BaseOperation):
             if col not in col_names:
                 return f"更新失败：列 '{col}' 不存在于表 {table_name} 中"
 
-        # 记录是否有行被更新
-        rows_updated = 0
-
-        if 'WHERE' in sql:
-            condition = parts[1].split('WHERE')[1].strip()
-            for i, row in enumerate(self.data[table_name]):
-                if self.evaluate_condition(row, col_names, condition):
-                    for col, value in updates.items():
-                        col_index = self.get_column_index(col_names, col)
-                        if col_index != -1:
-                            self.data[table_name][i][col_index] = value
-                    rows_updated += 1
+        table = self.data[table_name]
+
+        # 先找出需要更新的行，再统一写入
+        if statement.where is not None:
+            matched = self.match_rows(table, statement.where, col_names)
         else:
-            for i, row in enumerate(self.data[table_name]):
-                for col, value in updates.items():
-                    col_index = self.get_column_index(col_names, col)
-                    if col_index != -1:
-                        self.data[table_name][i][col_index] = value
-                rows_updated += 1
+            matched = table.row_ids()
+            self.count_scanned(len(table))
+
+        col_updates = [
+            (self.get_column_index(col_names, col), value)
+            for col, value in updates.items()
+        ]
+        for i in matched:
+            for col_index, value in col_updates:
+                if col_index != -1:
+                    table.set_value(i, col_index, value)
+
+        # 记录是否有行被更新
+        rows_updated = len(matched)
 
         if rows_updated == 0:
             return f"更新失败：没有找到匹配的记录"
@@ -567,42 +839,78 @@ class UpdateOperation(BaseOperation):
 class AlterTableOperation(BaseOperation):
     """ALTER TABLE操作实现"""
 
-    def execute(self, sql):
-        """解析ALTER TABLE语句"""
-        parts = sql.split()
-        table_name = parts[2].strip()
+    def execute(self, statement):
+        """执行ALTER TABLE语句"""
+        table_name = statement.table
 
         if table_name not in self.tables:
             return f"表 {table_name} 不存在"
 
-        if 'ADD' in sql:
-            col_def = ' '.join(parts[4:])
-            col_name = col_def.split()[0]
-            col_type = col_def.split()[1]
+        if statement.action == 'ADD':
+            col_name = statement.column
+            col_type = statement.column_def.col_type
+            if col_name in self.tables[table_name]:
+                return f"列 {col_name} 已存在"
             self.tables[table_name][col_name] = col_type
-            # 为现有数据添加新列，默认值为空字符串
-            for row in self.data[table_name]:
-                row.append('')
+            # 为现有数据添加新列，默认值为空字符串（只记录默认值，不复制已有的数据）
+            self.data[table_name].add_column(col_type, '')
             return f"向表 {table_name} 添加列 {col_name} 成功"
-        elif 'DROP' in sql:
-            col_name = parts[4].strip()
+        else:
+            col_name = statement.column
             if col_name in self.tables[table_name]:
                 col_index = self.get_column_index(list(self.tables[table_name].keys()), col_name)
                 del self.tables[table_name][col_name]
                 # 从现有数据中删除该列
-                for row in self.data[table_name]:
-                    if col_index < len(row):
-                        del row[col_index]
+                self.data[table_name].drop_column(col_index)
                 return f"从表 {table_name} 删除列 {col_name} 成功"
             return f"列 {col_name} 不存在"
 
 
+class CreateIndexOperation(BaseOperation):
+    """CREATE INDEX操作实现"""
+
+    def execute(self, statement):
+        """执行CREATE INDEX语句"""
+        table_name = statement.table
+        if table_name not in self.data:
+            return f"表 {table_name} 不存在"
+
+        # 索引名在所有表中唯一
+        for table in self.data.values():
+            if statement.name in table.indexes:
+                return f"索引 {statement.name} 已存在"
+
+        col_names = list(self.tables[table_name].keys())
+        col_index = self.get_column_index(col_names, statement.column)
+        if col_index == -1:
+            return f"列 {statement.column} 不存在于表 {table_name} 中"
+
+        self.data[table_name].create_index(statement.name, col_names[col_index], col_index)
+        return f"创建索引 {statement.name} 成功"
+
+
+class DropIndexOperation(BaseOperation):
+    """DROP INDEX操作实现"""
+
+    def execute(self, statement):
+        """执行DROP INDEX语句"""
+        if statement.table is not None and statement.table not in self.data:
+            return f"表 {statement.table} 不存在"
+        table_names = [statement.table] if statement.table else list(self.data.keys())
+        for table_name in table_names:
+            table = self.data[table_name]
+            if statement.name in table.indexes:
+                table.drop_index(statement.name)
+                return f"删除索引 {statement.name} 成功"
+        return f"索引 {statement.name} 不存在"
+
+
 class DropTableOperation(BaseOperation):
     """DROP TABLE操作实现"""
 
-    def execute(self, sql):
-        """解析DROP TABLE语句"""
-        table_name = sql.split()[2].strip()
+    def execute(self, statement):
+        """执行DROP TABLE语句"""
+        table_name = statement.table
         if table_name in self.tables:
             del self.tables[table_name]
             del self.data[table_name]
@@ -610,10 +918,169 @@ class DropTableOperation(BaseOperation):
         return f"表 {table_name} 不存在"
 
 
+class ExplainOperation(BaseOperation):
+    """EXPLAIN操作实现，EXPLAIN ANALYZE 用 select（SelectOperation）执行查询"""
+
+    def __init__(self, tables, data, select=None):
+        super().__init__(tables, data)
+        self.select = select
+
+    def execute(self, statement):
+        """返回SELECT语句的执行计划，每个步骤一行
+
+        EXPLAIN ANALYZE 还会执行查询（结果丢弃），在计划之后列出各阶段实际的耗时和行数，
+        见 profiler.py。
+        """
+        select = statement.statement
+        if not select.tables:
+            return "错误：缺少FROM子句"
+        for table in select.tables:
+            if table not in self.data:
+                return f"表 {table} 不存在"
+
+        lines = self.plan_select(select).explain()
+        if select.is_aggregate:
+            group_by = ', '.join(column.sql() for column in select.group_by)
+            lines.append(f"分组聚合：GROUP BY {group_by}" if group_by else "聚合：整个结果为一组")
+            if select.having is not None:
+                lines.append(f"过滤分组 {select.having.sql()}")
+        if select.order_by:
+            line = f"排序：ORDER BY {order_by_sql(select.order_by)}"
+            if select.limit is not None:
+                line += "，用有界堆只保留前 OFFSET + LIMIT 行"
+            lines.append(line)
+        if select.limit is not None:
+            line = f"LIMIT {select.limit.sql()}"
+            if select.offset is not None:
+                line += f" OFFSET {select.offset.sql()}"
+            if not select.order_by and not select.is_aggregate:
+                line += "，取够行数后停止扫描"
+            lines.append(line)
+        if select.columns:
+            lines.append("投影：" + ', '.join(column.sql() for column in select.columns))
+        if statement.analyze:
+            profile, result = self.select.analyze(select)
+            if isinstance(result, str):
+                return result
+            lines.append("实际执行（各阶段的耗时不含上游阶段）：")
+            lines.extend(profile.lines())
+        return [[line] for line in lines]
+
+
+class AnalyzeOperation(BaseOperation):
+    """ANALYZE操作实现"""
+
+    def execute(self, statement):
+        """收集指定表（或所有表）的统计信息"""
+        table_name = statement.table
+        if table_name is not None and table_name not in self.data:
+            return f"表 {table_name} 不存在"
+        table_names = [table_name] if table_name is not None else list(self.data.keys())
+        for name in table_names:
+            self.data[name].analyze(len(self.tables[name]))
+        if table_name is not None:
+            return f"分析表 {table_name} 成功，共 {len(self.data[table_name])} 行"
+        return f"分析 {len(table_names)} 个表成功"
+
+
 class ShowTablesOperation(BaseOperation):
     """SHOW TABLES操作实现"""
 
-    def execute(self, sql):
-        """解析SHOW TABLES语句"""
+    def execute(self, statement):
+        """执行SHOW TABLES语句"""
         # 返回列表的列表格式，每个表名作为一个单独的行
-        return [[table_name] for table_name in self.tables.keys()]
\ No newline at end of file
+        return [[table_name] for table_name in self.tables.keys()]
+
+
+def order_by_sql(order_by):
+    """ORDER BY 列表的SQL文本（不含 ORDER BY）"""
+    return ', '.join(item.column.sql() + (' DESC' if item.desc else '') for item in order_by)
+
+
+def _numeric_sort_value(value):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return 0
+
+
+class _Descending:
+    """反转字符串排序键的比较顺序，用于与整体排序方向相反的列"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def order_rows(result, order_by, col_names, col_types, limit=None):
+    """应用ORDER BY排序，result 可以是任意可迭代对象，返回列表
+
+    所有排序列合成一个复合键，只排序一次。limit 不为None时只需要排在最前面的
+    limit 行，用有界堆选出，复杂度为 O(n log k)，结果与完整排序后截取相同。
+    """
+    order_specs = []
+
+    # 找到每个排序列的索引
+    for item in order_by:
+        col_idx = find_column(col_names, item.column)
+        if col_idx != -1:
+            order_specs.append((col_idx, item.desc))
+
+    if not order_specs:
+        return result if isinstance(result, list) else list(result)
+
+    # 整体按第一列的方向排序，方向与之相反的列把键取反
+    reverse = order_specs[0][1]
+    key_parts = []
+    for col_idx, is_desc in order_specs:
+        col_type = col_types[col_idx] if col_idx < len(col_types) else ''
+        numeric = bool(col_type) and column_kind(col_type) != 'str'
+        key_parts.append(_order_key_part(col_idx, numeric, is_desc != reverse))
+
+    if len(key_parts) == 1:
+        key = key_parts[0]
+    else:
+        key = lambda row: tuple([part(row) for part in key_parts])
+
+    if limit is None:
+        if not isinstance(result, list):
+            result = list(result)
+        result.sort(key=key, reverse=reverse)
+        return result
+    select = heapq.nlargest if reverse else heapq.nsmallest
+    return select(limit, result, key=key)
+
+
+def _project_partition(rows, selected_indices, order_by, col_names, col_types, wanted):
+    """并行扫描中一段满足条件的行的投影，在工作进程中执行（见 SelectOperation.parallel_rows）
+
+    没有 ORDER BY 时只取前 wanted 行；有 ORDER BY 和 LIMIT 时选出排在最前面的 wanted 行。
+    """
+    if selected_indices is not None:
+        rows = ([row[i] for i in selected_indices] for row in rows)
+    if order_by and wanted is not None:
+        return order_rows(rows, order_by, col_names, col_types, wanted)
+    return list(islice(rows, None if order_by else wanted))
+
+
+def _tag_rows(rows):
+    """在每行末尾加上该行在 rows 中的序号"""
+    for position, row in enumerate(rows):
+        yield row + [position]
+
+
+def _order_key_part(col_idx, numeric, inverted):
+    """单个排序列的键函数：数值列按数值（无法转换的值视为0），其他列按不区分大小写的字符串"""
+    if numeric:
+        if inverted:
+            return lambda row: -_numeric_sort_value(row[col_idx])
+        return lambda row: _numeric_sort_value(row[col_idx])
+    if inverted:
+        return lambda row: _Descending(str(row[col_idx]).lower())
+    return lambda row: str(row[col_idx]).lower()
@@ -0,0 +1,198 @@
+"""并行扫描：把大表按行号分成若干段，在进程池中分段过滤、投影和部分聚合，再按段的顺序合并
+
+通过 SQLExecutor(parallel_workers=N) 开启。只用于不使用索引的单表扫描（SELECT，以及
+DELETE/UPDATE 的 WHERE），并且表的行数不少于 min_rows；其他情况按原来的方式串行执行。
+
+进程池在第一次并行扫描时创建，由执行器持有，SQLExecutor.close 时关闭。工作进程用
+forkserver（没有时用 spawn）方式创建，不继承执行器进程中的线程和锁（预写日志的同步线程、
+后台整理线程等）。每一段作为一次调用提交：段中的数据、WHERE 条件的语法树和模块级的任务函数
+序列化后传给工作进程，工作进程还原该段的行、编译条件（按条件缓存）后处理该段，只把结果传回。
+列式存储的段按列传递（见 table_partition）：数值列（包括内存映射的表文件中的列）是类型化
+数组的字节切片，内存映射的字符串列是文件中原始的偏移量和 UTF-8 文本，本进程既不逐行构造
+列表也不逐个序列化值，只复制字节，解码和构造行都在工作进程中进行。行式存储传递行列表的切片。
+已删除的行由工作进程按 live 的切片跳过。各次扫描
+互不依赖，多个线程可以同时进行并行扫描。与 multiprocessing 的要求相同，开启并行扫描的
+脚本需要用 if __name__ == '__main__' 保护入口。
+
+各段的结果按行号顺序合并，结果与串行执行相同，只有浮点数的 SUM/AVG 是分段求和后再相加，
+最后几位可能与串行执行不同。
+"""
+
+import multiprocessing
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import compress
+
+from sql_translator.core.aggregate import accumulate_groups
+from sql_translator.core.persistence import MappedStrings
+from sql_translator.core.predicate import compile_condition
+from sql_translator.core.storage import ColumnarTable, RowTable
+
+# 行数少于该值的表串行扫描，创建进程和传回结果的开销不值得
+PARALLEL_MIN_ROWS = 100000
+# 每个工作进程分到的段数，段数多于进程数时负载更均匀
+PARTITIONS_PER_WORKER = 4
+# 每个工作进程最多排队的段数：段中的数据在提交时复制，排队的段越多占用的内存越多
+QUEUED_PER_WORKER = 2
+
+
+def start_method():
+    """工作进程的创建方式：有 forkserver 时使用 forkserver，否则使用 spawn"""
+    methods = multiprocessing.get_all_start_methods()
+    return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+
+def _column_slice(column, start, stop):
+    """列中行号在 [start, stop) 中的部分，序列化时只复制字节（见 _column_values）"""
+    if isinstance(column, array):
+        return column[start:stop]
+    if isinstance(column, memoryview):
+        part = array(column.format)
+        part.frombytes(column[start:stop].cast('B'))
+        return part
+    if isinstance(column, MappedStrings):
+        offsets = column.offsets[start:stop + 1]
+        if not isinstance(offsets, array):
+            offsets = array('q', offsets.tobytes())
+        return offsets, bytes(column.blob[offsets[0]:offsets[-1]])
+    return column[start:stop]
+
+
+def table_partition(table, start, stop):
+    """取出表中行号在 [start, stop) 中的一段，返回可以序列化的 (各列, 行列表, live 切片)
+
+    列式存储取出各列的切片（见 _column_slice），行列表为None；行式存储取出行列表的切片
+    （有 ALTER TABLE 留下的旧布局的行时为转换后的未删除的行），各列为None。
+    live 为None表示该段没有需要跳过的已删除的行。
+    """
+    live = None if table.live is None else bytes(table.live[start:stop])
+    if isinstance(table, ColumnarTable):
+        return [_column_slice(column, start, stop) for column in table.columns], None, live
+    if isinstance(table, RowTable) and not table.layouts:
+        return None, table.rows[start:stop], live
+    return None, list(table.scan_range(start, stop)), None
+
+
+# 以下在工作进程中执行的函数都是模块级的，按名称序列化
+
+def _column_values(part):
+    """还原 _column_slice 取出的列：字符串列按块解码"""
+    if not isinstance(part, tuple):
+        return part
+    offsets, blob = part
+    base = offsets[0]
+    if base:
+        offsets = [offset - base for offset in offsets]
+    return list(MappedStrings(offsets, memoryview(blob)))
+
+
+def _partition_rows(partition):
+    """还原 table_partition 取出的一段中未删除的行"""
+    columns, rows, live = partition
+    if columns is not None:
+        rows = map(list, zip(*map(_column_values, columns)))
+    if live is not None:
+        rows = compress(rows, live)
+    return rows
+
+
+def _match_partition(partition, condition, col_names):
+    predicate = compile_condition(condition, col_names)
+    return [position for position, row in enumerate(_partition_rows(partition)) if predicate(row)]
+
+
+def _select_partition(partition, condition, col_names, project, project_args):
+    rows = _partition_rows(partition)
+    return project(filter(compile_condition(condition, col_names), rows), *project_args)
+
+
+def _aggregate_partition(partition, condition, col_names, key_indices, arg_indices, factories):
+    rows = _partition_rows(partition)
+    return accumulate_groups(filter(compile_condition(condition, col_names), rows),
+                             key_indices, arg_indices, factories)
+
+
+class ParallelScanner:
+    """在进程池中分段扫描一个表"""
+
+    def __init__(self, workers, min_rows=PARALLEL_MIN_ROWS):
+        self.workers = workers
+        self.min_rows = min_rows
+        self.pool = None
+        self.pool_lock = threading.Lock()   # 只保护进程池的创建和关闭
+
+    def enabled(self, table):
+        """该表的扫描是否并行执行"""
+        return self.workers > 1 and len(table) >= max(self.min_rows, 1)
+
+    def executor(self):
+        """返回进程池，第一次调用时创建"""
+        with self.pool_lock:
+            if self.pool is None:
+                context = multiprocessing.get_context(start_method())
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self.pool
+
+    def close(self):
+        """关闭进程池，之后的并行扫描会重新创建"""
+        with self.pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def partitions(self, length, per_worker=PARTITIONS_PER_WORKER):
+        """把行号 [0, length) 分成若干段，返回 (start, stop) 列表"""
+        size = max(1, -(-length // (self.workers * per_worker)))
+        return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+    def map(self, table, task, args, per_worker=PARTITIONS_PER_WORKER):
+        """对表的每一段在工作进程中执行 task(partition, *args)，按段的顺序返回 [(段, 结果)]
+
+        partition 为 table_partition 取出的该段的数据，task 用 _partition_rows 还原其中
+        未删除的行；task 和 args 需要能够序列化。per_worker 为每个工作进程分到的段数。
+        调用方持有表的读锁，各段的数据在提交时取出。
+        """
+        pool = self.executor()
+        window = self.workers * QUEUED_PER_WORKER
+        pending = deque()
+        results = []
+        for bounds in self.partitions(table.stored_rows(), per_worker):
+            partition = table_partition(table, *bounds)
+            pending.append((bounds, pool.submit(task, partition, *args)))
+            if len(pending) >= window:
+                bounds, future = pending.popleft()
+                results.append((bounds, future.result()))
+        results.extend((bounds, future.result()) for bounds, future in pending)
+        return results
+
+    def match_rows(self, table, condition, col_names):
+        """返回满足条件的行号列表（升序）"""
+        parts = self.map(table, _match_partition, (condition, col_names))
+        matched = []
+        for (start, stop), positions in parts:
+            ids = table.row_ids(start, stop)
+            matched.extend(ids[position] for position in positions)
+        return matched
+
+    def select(self, table, condition, col_names, project, project_args=()):
+        """过滤并投影，按行号顺序返回结果行的列表
+
+        project(rows, *project_args) 把一段中满足条件的行转换为该段的结果行列表，例如投影、
+        截取前 OFFSET + LIMIT 行或选出排序后的前 OFFSET + LIMIT 行；project 需要是模块级的函数。
+        """
+        parts = self.map(table, _select_partition, (condition, col_names, project, project_args))
+        return [row for _, part in parts for row in part]
+
+    def aggregate(self, table, condition, col_names, key_indices, arg_indices, factories, merge):
+        """分段分组累加（见 aggregate.accumulate_groups），按段的顺序用 merge 合并
+
+        每个工作进程只分一段：分组较多时，传回和合并累加结果的开销与段数成正比。
+        """
+        parts = self.map(table, _aggregate_partition,
+                         (condition, col_names, key_indices, arg_indices, factories), per_worker=1)
+        result = parts[0][1]
+        for _, part in parts[1:]:
+            result = merge(result, part)
+        return result
@@ -1,3 +1,116 @@
+import re
+
+from sql_translator.core.ast_nodes import (
+    Aggregate, AlterTable, Analyze, Begin, BoolOp, ColumnDef, ColumnRef, Commit, Comparison,
+    CreateIndex, CreateTable, Delete, DropIndex, DropTable, Explain, Insert, Join, Literal, Not,
+    OrderItem, Parameter, Rollback, Select, ShowTables, Update
+)
+from sql_translator.core.tokenizer import SQLSyntaxError, strip_comments, tokenize
+
+# 不能用作表名或列名的关键字：只保留出现在名称位置时有歧义的子句关键字，
+# 其他关键字（ADD、INDEX、TABLES、ASC、DESC、OFFSET、LIKE 等）仍可以用作名称
+RESERVED_WORDS = {
+    'SELECT', 'FROM', 'WHERE', 'ORDER', 'GROUP', 'BY', 'HAVING', 'JOIN', 'INNER',
+    'LEFT', 'RIGHT', 'FULL', 'OUTER', 'CROSS', 'ON', 'AND', 'OR', 'NOT',
+    'INTO', 'VALUES', 'SET', 'LIMIT',
+}
+
+JOIN_KINDS = ('INNER', 'LEFT', 'RIGHT', 'FULL', 'CROSS')
+
+# 聚合函数名（不是保留字，后面紧跟 '(' 时才作为函数）
+AGGREGATE_FUNCTIONS = ('COUNT', 'SUM', 'AVG', 'MIN', 'MAX')
+
+# 语句分割时关心的字符：语句结束符、字符串开始、注释开始；
+# 末尾单独的 '-' 或 '/' 需要等下一块数据才能判断是否为注释
+_SPLIT_NORMAL_RE = re.compile(r"""[;'"]|--|/\*|[-/]\Z""")
+_SPLIT_STRING_RE = {
+    "'": re.compile(r"\\.|''|'|\\\Z", re.DOTALL),
+    '"': re.compile(r'\\.|""|"|\\\Z', re.DOTALL),
+}
+
+# 流式读取SQL脚本时每次读取的字符数
+SCRIPT_CHUNK_SIZE = 1 << 16
+
+
+def iter_sql_statements(stream, chunk_size=SCRIPT_CHUNK_SIZE):
+    """从文本流中逐条读取以分号分隔的SQL语句
+
+    按块读取，不会把整个脚本读入内存；字符串和注释中的分号不会被当作语句结束。
+    语句中的注释原样保留，由解析器处理。空语句被跳过。
+    """
+    parts = []      # 当前语句已经扫描过的文本片段
+    state = None    # None、引号字符、'--' 或 '/*'
+    carry = ''      # 需要与下一块一起判断的末尾文本
+    while True:
+        chunk = stream.read(chunk_size)
+        at_eof = not chunk
+        text = carry + chunk
+        carry = ''
+        length = len(text)
+        start = pos = 0
+        while pos < length:
+            if state is None:
+                m = _SPLIT_NORMAL_RE.search(text, pos)
+                if m is None:
+                    pos = length
+                    break
+                token = m.group()
+                if token == ';':
+                    parts.append(text[start:m.start()])
+                    statement = ''.join(parts).strip()
+                    if statement:
+                        yield statement
+                    parts = []
+                    start = pos = m.end()
+                elif len(token) == 1 and token in '-/':
+                    # 块末尾的单个字符，等下一块数据
+                    if at_eof:
+                        pos = length
+                    else:
+                        carry = text[m.start():]
+                        length = pos = m.start()
+                else:
+                    state = token
+                    pos = m.end()
+            elif state in _SPLIT_STRING_RE:
+                m = _SPLIT_STRING_RE[state].search(text, pos)
+                if m is None:
+                    pos = length
+                elif not at_eof and m.end() == length and m.group() in (state, '\\'):
+                    # 末尾的引号可能是转义的 ''，末尾的反斜杠需要和下一个字符一起处理
+                    carry = text[m.start():]
+                    length = pos = m.start()
+                else:
+                    pos = m.end()
+                    if m.group() == state:
+                        state = None
+            elif state == '--':
+                end = text.find('\n', pos)
+                if end == -1:
+                    pos = length
+                else:
+                    pos = end + 1
+                    state = None
+            else:
+                end = text.find('*/', pos)
+                if end == -1:
+                    # 末尾的 '*' 可能是注释结束符的一半
+                    if text.endswith('*') and not at_eof:
+                        carry = '*'
+                        length = pos = len(text) - 1
+                    else:
+                        pos = length
+                else:
+                    pos = end + 2
+                    state = None
+        parts.append(text[start:length])
+        if at_eof:
+            break
+    statement = (''.join(parts) + carry).strip()
+    if statement:
+        yield statement
+
+
 class SQLParser:
     """SQL语句解析器，负责将SQL语句解析为中间表示"""
     
@@ -6,103 +119,474 @@ class SQLParser:
     
     def remove_comments(self, sql):
         """移除SQL语句中的注释
-        
+
         支持两种类型的注释:
         1. 单行注释: 以 -- 开头
         2. 多行注释: 以 /* 开始, 以 */ 结束
+        每个注释替换为一个空格，字符串中的内容不受影响（见 tokenizer.strip_comments）。
         """
-        # 去除空白字符
-        sql = sql.strip()
-        
-        # 用于存储处理后的SQL
-        result = []
-        i = 0
-        in_string = False
-        string_quote = None
-        
-        while i < len(sql):
-            # 处理字符串字面量，避免误删字符串中的内容
-            if sql[i] in ["'", '"'] and (i == 0 or sql[i-1] != '\\'):
-                if not in_string:
-                    in_string = True
-                    string_quote = sql[i]
-                elif sql[i] == string_quote:
-                    in_string = False
-                result.append(sql[i])
-                i += 1
-                continue
-            
-            # 如果在字符串内，直接添加
-            if in_string:
-                result.append(sql[i])
-                i += 1
-                continue
-            
-            # 单行注释 --
-            if i < len(sql) - 1 and sql[i:i+2] == '--':
-                # 找到行尾
-                newline_pos = sql.find('\n', i)
-                if newline_pos == -1:  # 如果找不到换行符，说明注释一直到结尾
-                    i = len(sql)
-                else:
-                    i = newline_pos + 1  # 跳过注释和换行符
-                # 添加空格代替注释，保持SQL语句的格式
-                result.append(' ')
-                continue
-            
-            # 多行注释 /* */
-            if i < len(sql) - 1 and sql[i:i+2] == '/*':
-                # 找到注释结束
-                end_comment = sql.find('*/', i+2)
-                if end_comment == -1:  # 如果找不到结束标记，认为注释到文件末尾
-                    i = len(sql)
-                else:
-                    i = end_comment + 2  # 跳过注释结束标记
-                # 添加空格代替注释，保持SQL语句的格式
-                result.append(' ')
-                continue
-            
-            # 正常字符
-            result.append(sql[i])
-            i += 1
-        
-        return ''.join(result)
-    
+        return strip_comments(sql.strip())
+
     def parse_sql(self, sql):
-        """解析SQL语句，返回解析结果"""
-        # 首先移除注释
-        sql_no_comments = self.remove_comments(sql)
-        
-        # 转换为大写便于比较
-        sql_upper = sql_no_comments.strip().upper()
-        
+        """解析SQL语句，返回解析结果
+
+        返回的字典中 statement 为语句的语法树；语法错误时 type 为 'ERROR'，
+        error 中是错误信息。
+        """
         # 保存原始SQL(包含注释)用于显示
         original_sql = sql
-        
-        if sql_upper.startswith('CREATE TABLE'):
-            return {'type': 'CREATE_TABLE', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('INSERT INTO'):
-            return {'type': 'INSERT', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('DELETE FROM'):
-            return {'type': 'DELETE', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('SELECT'):
-            return {'type': 'SELECT', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('UPDATE'):
-            return {'type': 'UPDATE', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('ALTER TABLE'):
-            return {'type': 'ALTER_TABLE', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('DROP TABLE'):
-            return {'type': 'DROP_TABLE', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('SHOW TABLES'):
-            return {'type': 'SHOW_TABLES', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('JOIN'):
-            return {'type': 'JOIN', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('GROUP BY'):
-            return {'type': 'GROUP_BY', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('ORDER BY'):
-            return {'type': 'ORDER_BY', 'content': sql_no_comments, 'original': original_sql}
-        elif sql_upper.startswith('-- ') or sql_upper.startswith('/*'):
+
+        try:
+            tokens = tokenize(sql)
+        except SQLSyntaxError as e:
+            return {'type': 'ERROR', 'content': sql, 'original': original_sql, 'error': str(e)}
+
+        if all(token.kind == 'EOF' or token.value == ';' for token in tokens):
             # 纯注释，不执行任何操作
             return {'type': 'COMMENT', 'content': '', 'original': original_sql}
+
+        if tokens[0].upper not in StatementParser.STATEMENTS:
+            return {'type': 'UNKNOWN', 'content': sql, 'original': original_sql}
+
+        parser = StatementParser(sql, tokens)
+        try:
+            statement = parser.parse_statement()
+        except SQLSyntaxError as e:
+            return {'type': 'ERROR', 'content': sql, 'original': original_sql, 'error': str(e)}
+
+        return {
+            'type': statement.type, 'content': sql, 'original': original_sql,
+            'statement': statement, 'parameters': tuple(parser.parameters),
+        }
+
+
+class StatementParser:
+    """递归下降语法分析器，把词法单元序列解析为一条语句的语法树"""
+
+    STATEMENTS = {
+        'CREATE': 'parse_create',
+        'INSERT': 'parse_insert',
+        'DELETE': 'parse_delete',
+        'SELECT': 'parse_select',
+        'UPDATE': 'parse_update',
+        'ALTER': 'parse_alter',
+        'DROP': 'parse_drop',
+        'SHOW': 'parse_show',
+        'EXPLAIN': 'parse_explain',
+        'ANALYZE': 'parse_analyze',
+        'BEGIN': 'parse_transaction',
+        'COMMIT': 'parse_transaction',
+        'ROLLBACK': 'parse_transaction',
+    }
+
+    def __init__(self, sql, tokens):
+        self.sql = sql
+        self.tokens = tokens
+        self.pos = 0
+        # 语句中出现的参数（位置参数为序号，命名参数为名称），按出现顺序
+        self.parameters = []
+        # 当前解析的条件中是否允许聚合函数（只有HAVING允许）
+        self.allow_aggregates = False
+
+    # ---------- 基础方法 ----------
+
+    @property
+    def current(self):
+        return self.tokens[self.pos]
+
+    def advance(self):
+        token = self.tokens[self.pos]
+        if token.kind != 'EOF':
+            self.pos += 1
+        return token
+
+    def error(self, expected):
+        token = self.current
+        found = '语句结尾' if token.kind == 'EOF' else repr(token.value)
+        return SQLSyntaxError(f"位置 {token.start} 附近: 期望{expected}，实际为 {found}")
+
+    def at_keyword(self, *words):
+        token = self.current
+        return token.kind == 'NAME' and token.upper in words
+
+    def accept_keyword(self, *words):
+        """当前是指定关键字时消费并返回True"""
+        if self.at_keyword(*words):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_keyword(self, *words):
+        if not self.at_keyword(*words):
+            raise self.error(' '.join(words))
+        return self.advance().upper
+
+    def at_punct(self, value):
+        token = self.current
+        return token.kind == 'PUNCT' and token.value == value
+
+    def accept_punct(self, value):
+        if self.at_punct(value):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_punct(self, value):
+        if not self.at_punct(value):
+            raise self.error(f" '{value}'")
+        return self.advance()
+
+    def expect_name(self, what='名称'):
+        token = self.current
+        if token.kind != 'NAME' or token.upper in RESERVED_WORDS:
+            raise self.error(what)
+        return self.advance().value
+
+    # ---------- 语句 ----------
+
+    def parse_statement(self):
+        statement = getattr(self, self.STATEMENTS[self.current.upper])()
+        while self.accept_punct(';'):
+            pass
+        if self.current.kind != 'EOF':
+            raise self.error('语句结尾')
+        return statement
+
+    def parse_create(self):
+        self.expect_keyword('CREATE')
+        if self.accept_keyword('INDEX'):
+            return self.parse_create_index()
+        self.expect_keyword('TABLE')
+        table = self.expect_name('表名')
+        self.expect_punct('(')
+        columns = [self.parse_column_def()]
+        while self.accept_punct(','):
+            columns.append(self.parse_column_def())
+        self.expect_punct(')')
+        return CreateTable(table, tuple(columns))
+
+    def parse_create_index(self):
+        name = self.expect_name('索引名')
+        self.expect_keyword('ON')
+        table = self.expect_name('表名')
+        self.expect_punct('(')
+        column = self.expect_name('列名')
+        self.expect_punct(')')
+        return CreateIndex(name, table, column)
+
+    def parse_column_def(self):
+        """列名 + 类型，类型部分保留原文（例如 DECIMAL(10,2)）"""
+        name = self.expect_name('列名')
+        start = self.current.start
+        end = None
+        depth = 0
+        while True:
+            token = self.current
+            if token.kind == 'EOF' or token.value == ';':
+                break
+            if token.kind == 'PUNCT':
+                if token.value == '(':
+                    depth += 1
+                elif token.value == ')':
+                    if depth == 0:
+                        break
+                    depth -= 1
+                elif token.value == ',' and depth == 0:
+                    break
+            end = token.end
+            self.advance()
+        if end is None:
+            raise self.error(f"列 {name} 的类型")
+        return ColumnDef(name, self.sql[start:end])
+
+    def parse_insert(self):
+        self.expect_keyword('INSERT')
+        self.expect_keyword('INTO')
+        table = self.expect_name('表名')
+        columns = None
+        if self.accept_punct('('):
+            # 可选的列清单：INSERT INTO 表 (列, ...) VALUES ...
+            columns = [self.expect_name('列名')]
+            while self.accept_punct(','):
+                columns.append(self.expect_name('列名'))
+            self.expect_punct(')')
+            columns = tuple(columns)
+        self.expect_keyword('VALUES')
+        rows = [self.parse_value_row()]
+        while self.accept_punct(','):
+            rows.append(self.parse_value_row())
+        return Insert(table, tuple(rows), columns)
+
+    def parse_value_row(self):
+        self.expect_punct('(')
+        values = [self.parse_literal()]
+        while self.accept_punct(','):
+            values.append(self.parse_literal())
+        self.expect_punct(')')
+        return tuple(values)
+
+    def parse_delete(self):
+        self.expect_keyword('DELETE')
+        self.expect_keyword('FROM')
+        table = self.expect_name('表名')
+        return Delete(table, self.parse_where())
+
+    def parse_select(self):
+        self.expect_keyword('SELECT')
+        columns = []
+        if not self.accept_punct('*'):
+            columns.append(self.parse_select_item())
+            while self.accept_punct(','):
+                columns.append(self.parse_select_item())
+
+        table = None
+        joins = []
+        if self.accept_keyword('FROM'):
+            table = self.expect_name('表名')
+            joins = self.parse_joins()
+
+        where = self.parse_where()
+
+        group_by = []
+        if self.accept_keyword('GROUP'):
+            self.expect_keyword('BY')
+            group_by.append(self.parse_column_ref())
+            while self.accept_punct(','):
+                group_by.append(self.parse_column_ref())
+
+        having = None
+        if self.accept_keyword('HAVING'):
+            self.allow_aggregates = True
+            having = self.parse_condition()
+            self.allow_aggregates = False
+
+        order_by = []
+        if self.accept_keyword('ORDER'):
+            self.expect_keyword('BY')
+            order_by.append(self.parse_order_item())
+            while self.accept_punct(','):
+                order_by.append(self.parse_order_item())
+
+        limit = offset = None
+        if self.accept_keyword('LIMIT'):
+            limit = self.parse_limit_value()
+            if self.accept_punct(','):
+                # LIMIT 偏移, 行数
+                offset, limit = limit, self.parse_limit_value()
+            elif self.accept_keyword('OFFSET'):
+                offset = self.parse_limit_value()
+
+        return Select(tuple(columns), table, tuple(joins), where, tuple(order_by),
+                      tuple(group_by), having, limit, offset)
+
+    def parse_limit_value(self):
+        """LIMIT / OFFSET 的值：非负整数或参数"""
+        token = self.current
+        if token.kind == 'PARAM':
+            return self.parse_parameter()
+        if token.kind != 'NUMBER' or not token.value.isdigit():
+            raise self.error('非负整数')
+        return Literal(self.advance().value)
+
+    def at_aggregate(self):
+        """当前位置是否为聚合函数调用"""
+        token = self.current
+        return (token.kind == 'NAME' and token.upper in AGGREGATE_FUNCTIONS
+                and self.tokens[self.pos + 1].value == '(')
+
+    def parse_select_item(self):
+        if self.at_aggregate():
+            return self.parse_aggregate()
+        return self.parse_column_ref()
+
+    def parse_aggregate(self):
+        func = self.advance().upper
+        self.expect_punct('(')
+        if self.accept_punct('*'):
+            if func != 'COUNT':
+                raise SQLSyntaxError(f"{func}(*) 无效，只有 COUNT 可以使用 *")
+            argument = None
+        else:
+            argument = self.parse_column_ref()
+        self.expect_punct(')')
+        return Aggregate(func, argument)
+
+    def parse_joins(self):
+        """FROM 表名之后的 JOIN 列表，逗号分隔的表视为 CROSS JOIN"""
+        joins = []
+        while True:
+            if self.accept_punct(','):
+                joins.append(Join(self.expect_name('表名'), 'CROSS'))
+                continue
+            if not self.at_keyword('JOIN', *JOIN_KINDS):
+                return joins
+            kind = 'INNER'
+            if not self.at_keyword('JOIN'):
+                kind = self.advance().upper
+                if kind != 'INNER' and kind != 'CROSS':
+                    self.accept_keyword('OUTER')
+            self.expect_keyword('JOIN')
+            table = self.expect_name('表名')
+            condition = None
+            if kind != 'CROSS' and self.accept_keyword('ON'):
+                condition = self.parse_condition()
+            joins.append(Join(table, kind if condition is not None else 'CROSS', condition))
+
+    def parse_order_item(self):
+        column = self.parse_select_item()
+        desc = False
+        if self.at_keyword('ASC', 'DESC'):
+            desc = self.advance().upper == 'DESC'
+        return OrderItem(column, desc)
+
+    def parse_update(self):
+        self.expect_keyword('UPDATE')
+        table = self.expect_name('表名')
+        self.expect_keyword('SET')
+        assignments = [self.parse_assignment()]
+        while self.accept_punct(','):
+            assignments.append(self.parse_assignment())
+        return Update(table, tuple(assignments), self.parse_where())
+
+    def parse_assignment(self):
+        column = self.expect_name('列名')
+        token = self.current
+        if token.kind != 'OP' or token.value != '=':
+            raise self.error(" '='")
+        self.advance()
+        return column, self.parse_literal()
+
+    def parse_alter(self):
+        self.expect_keyword('ALTER')
+        self.expect_keyword('TABLE')
+        table = self.expect_name('表名')
+        action = self.expect_keyword('ADD', 'DROP')
+        self.accept_keyword('COLUMN')
+        if action == 'ADD':
+            column_def = self.parse_column_def()
+            return AlterTable(table, action, column_def.name, column_def)
+        return AlterTable(table, action, self.expect_name('列名'))
+
+    def parse_drop(self):
+        self.expect_keyword('DROP')
+        if self.accept_keyword('INDEX'):
+            name = self.expect_name('索引名')
+            table = self.expect_name('表名') if self.accept_keyword('ON') else None
+            return DropIndex(name, table)
+        self.expect_keyword('TABLE')
+        return DropTable(self.expect_name('表名'))
+
+    def parse_show(self):
+        self.expect_keyword('SHOW')
+        self.expect_keyword('TABLES')
+        return ShowTables()
+
+    def parse_explain(self):
+        self.expect_keyword('EXPLAIN')
+        analyze = self.accept_keyword('ANALYZE')
+        if not self.at_keyword('SELECT'):
+            raise self.error('SELECT')
+        return Explain(self.parse_select(), analyze)
+
+    def parse_analyze(self):
+        self.expect_keyword('ANALYZE')
+        if self.current.kind == 'NAME':
+            return Analyze(self.expect_name('表名'))
+        return Analyze()
+
+    def parse_transaction(self):
+        keyword = self.expect_keyword('BEGIN', 'COMMIT', 'ROLLBACK')
+        self.accept_keyword('TRANSACTION', 'WORK')
+        return {'BEGIN': Begin, 'COMMIT': Commit, 'ROLLBACK': Rollback}[keyword]()
+
+    # ---------- 条件与表达式 ----------
+
+    def parse_where(self):
+        if self.accept_keyword('WHERE'):
+            return self.parse_condition()
+        return None
+
+    def parse_condition(self):
+        operands = [self.parse_and()]
+        while self.accept_keyword('OR'):
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else BoolOp('OR', tuple(operands))
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.accept_keyword('AND'):
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else BoolOp('AND', tuple(operands))
+
+    def parse_not(self):
+        if self.accept_keyword('NOT'):
+            return Not(self.parse_not())
+        if self.accept_punct('('):
+            condition = self.parse_condition()
+            self.expect_punct(')')
+            return condition
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_operand()
+        if self.at_keyword('LIKE') or (self.at_keyword('NOT')
+                                       and self.tokens[self.pos + 1].kind == 'NAME'
+                                       and self.tokens[self.pos + 1].upper == 'LIKE'):
+            op = 'NOT LIKE' if self.accept_keyword('NOT') else 'LIKE'
+            self.expect_keyword('LIKE')
+            return Comparison(left, op, self.parse_operand())
+        token = self.current
+        if token.kind != 'OP':
+            raise self.error('比较运算符或 LIKE')
+        self.advance()
+        return Comparison(left, token.value, self.parse_operand())
+
+    def parse_operand(self):
+        token = self.current
+        if self.at_aggregate():
+            if not self.allow_aggregates:
+                raise SQLSyntaxError(f"位置 {token.start} 附近: 聚合函数只能用于选择列、HAVING 和 ORDER BY")
+            return self.parse_aggregate()
+        if token.kind == 'NAME' and token.upper not in RESERVED_WORDS:
+            return self.parse_column_ref()
+        return self.parse_literal()
+
+    def parse_column_ref(self):
+        name = self.expect_name('列名')
+        if self.accept_punct('.'):
+            return ColumnRef(self.expect_name('列名'), name)
+        return ColumnRef(name)
+
+    def parse_parameter(self):
+        token = self.advance()
+        if token.value == '?':
+            key = len(self.parameters)
+            if any(isinstance(p, str) for p in self.parameters):
+                raise SQLSyntaxError(f"位置 {token.start} 附近: 不能混用 ? 和命名参数")
         else:
-            return {'type': 'UNKNOWN', 'content': sql_no_comments, 'original': original_sql} 
\ No newline at end of file
+            key = token.value[1:]
+            if any(isinstance(p, int) for p in self.parameters):
+                raise SQLSyntaxError(f"位置 {token.start} 附近: 不能混用 ? 和命名参数")
+        if key not in self.parameters:
+            self.parameters.append(key)
+        return Parameter(key)
+
+    def parse_literal(self):
+        """常量或参数占位符"""
+        token = self.current
+        if token.kind == 'PARAM':
+            return self.parse_parameter()
+        if token.kind == 'STRING':
+            self.advance()
+            return Literal(token.value, True)
+        if token.kind == 'NUMBER':
+            self.advance()
+            return Literal(token.value)
+        if self.at_punct('-') and self.tokens[self.pos + 1].kind == 'NUMBER':
+            self.advance()
+            return Literal('-' + self.advance().value)
+        if token.kind == 'NAME' and token.upper not in RESERVED_WORDS:
+            # 不带引号的单词，按原文保留，由具体操作做类型检查
+            self.advance()
+            return Literal(token.value)
+        raise self.error('常量')
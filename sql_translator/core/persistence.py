@@ -0,0 +1,469 @@
+"""持久化存储：目录中的 schema.json 加上每个表一个二进制文件
+
+表文件格式（列式）::
+
+    b'SQLTBL01' | 头部长度 (8字节) | JSON头部 | 各列数据（8字节对齐）
+
+JSON头部记录行数、字节序以及每列的名称、类型、编码和数据位置，表文件是自描述的；
+schema.json 记录表的顺序、表文件名和索引定义。列的编码：
+
+    q / d  INT / 数值列，原生 int64 / float64 数组
+    s      字符串列，(行数+1) 个 int64 偏移量 + UTF-8 文本
+    m      混合类型的列，每行一个类型标记字节（i/f/s），后面与 s 相同
+
+打开数据库时只读取 schema.json 和各表文件的头部，表文件以只读方式内存映射，
+数值列直接作为 memoryview 使用，字符串列按需解码；某列第一次被修改时才复制到内存。
+写入时先写临时文件再原子替换，写完后重新映射，已修改的列不再占用内存。
+数据修改和 ALTER TABLE 先写入预写日志（见 wal.py），检查点时才写表文件。
+"""
+
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from itertools import accumulate, chain
+
+from sql_translator.core.storage import ColumnarTable, SharedColumn
+from sql_translator.core.wal import WriteAheadLog
+
+MAGIC = b'SQLTBL01'
+SCHEMA_FILE = 'schema.json'
+TABLE_SUFFIX = '.tbl'
+
+# 执行后直接写表快照的语句（其他修改写入预写日志）
+SNAPSHOT_TYPES = {'CREATE_TABLE'}
+# 预写日志中 ALTER TABLE 的记录
+ALTER_OPS = {'add_column', 'drop_column'}
+# 需要更新 schema.json 的语句
+SCHEMA_WRITE_TYPES = {'CREATE_TABLE', 'ALTER_TABLE', 'DROP_TABLE', 'CREATE_INDEX', 'DROP_INDEX'}
+
+# 日志超过该字节数时自动执行检查点
+DEFAULT_CHECKPOINT_BYTES = 64 << 20
+
+# 顺序扫描字符串列时每次解码的行数
+STRING_SCAN_CHUNK = 1 << 16
+
+_MIXED_TAGS = {int: b'i', float: b'f'}
+_MIXED_TYPES = {ord('i'): int, ord('f'): float}
+
+
+def _align(n):
+    return (n + 7) & ~7
+
+
+def _sync_directory(path):
+    """fsync 目录，使文件的创建和替换落盘（不支持的平台上忽略）"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _encode_strings(values):
+    """把字符串序列编码为 (偏移量字节, UTF-8文本)"""
+    encoded = [value.encode('utf-8', 'surrogatepass') for value in values]
+    offsets = array('q', [0])
+    offsets.extend(accumulate(len(data) for data in encoded))
+    return offsets.tobytes(), b''.join(encoded)
+
+
+class MappedStrings:
+    """内存映射文件中的字符串列，只读，按需解码"""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('列下标越界')
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8', 'surrogatepass')
+
+    def __iter__(self):
+        return chain.from_iterable(self._chunks())
+
+    def _chunks(self):
+        """按块解码；纯ASCII的块中字节偏移就是字符偏移，整块解码后直接切片"""
+        blob = self.blob
+        count = len(self)
+        for lo in range(0, count, STRING_SCAN_CHUNK):
+            bounds = list(self.offsets[lo:min(lo + STRING_SCAN_CHUNK, count) + 1])
+            chunk = blob[bounds[0]:bounds[-1]]
+            text = str(chunk, 'utf-8', 'surrogatepass')
+            if len(text) == len(chunk):
+                base = bounds[0]
+                if base:
+                    bounds = [offset - base for offset in bounds]
+                yield map(text.__getitem__, map(slice, bounds[:-1], bounds[1:]))
+            else:
+                yield [str(blob[start:end], 'utf-8', 'surrogatepass')
+                       for start, end in zip(bounds, bounds[1:])]
+
+    def materialize(self):
+        """复制为内存中的列表，用于修改"""
+        return [sys.intern(value) for value in self]
+
+    def sections(self):
+        """文件中的原始数据：偏移量和文本，写入时无需重新编码"""
+        return self.offsets, self.blob
+
+
+def _column_sections(column):
+    """返回列的 (编码, 数据片段列表)"""
+    if isinstance(column, SharedColumn):
+        column = column.materialize()
+    if isinstance(column, array):
+        return column.typecode, [column.tobytes()]
+    if isinstance(column, memoryview):
+        return column.format, [column]
+    if isinstance(column, MappedStrings):
+        return 's', list(column.sections())
+    if all(type(value) is str for value in column):
+        return 's', list(_encode_strings(column))
+    tags = b''.join(_MIXED_TAGS.get(type(value), b's') for value in column)
+    texts = [repr(value) if type(value) is float else str(value) for value in column]
+    return 'm', [tags, b'\0' * (_align(len(tags)) - len(tags)), *_encode_strings(texts)]
+
+
+def write_table_file(file_path, table, col_names, col_types, lsn=0):
+    """把表写入文件：先写临时文件，同步到磁盘后原子替换。lsn 为快照包含的最后一条日志"""
+    sections = [_column_sections(column) for column in table.columns]
+
+    header = {'rows': len(table), 'byteorder': sys.byteorder, 'lsn': lsn, 'columns': []}
+    offset = 0
+    for name, col_type, (encoding, parts) in zip(col_names, col_types, sections):
+        length = sum(len(memoryview(part).cast('B')) for part in parts)
+        header['columns'].append({
+            'name': name, 'type': col_type, 'encoding': encoding,
+            'offset': offset, 'length': length,
+        })
+        offset = _align(offset + length)
+
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    header_bytes += b' ' * (_align(len(header_bytes)) - len(header_bytes))
+    data_start = len(MAGIC) + 8 + len(header_bytes)
+
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(len(header_bytes).to_bytes(8, 'little'))
+        f.write(header_bytes)
+        for info, (_, parts) in zip(header['columns'], sections):
+            f.seek(data_start + info['offset'])
+            for part in parts:
+                f.write(part)
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, file_path)
+    _sync_directory(os.path.dirname(file_path))
+
+
+class MappedTableFile:
+    """以只读方式内存映射的表文件"""
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.map)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"不是有效的表文件: {file_path}")
+        header_len = int.from_bytes(view[len(MAGIC):len(MAGIC) + 8], 'little')
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(bytes(view[header_start:header_start + header_len]))
+        self.data = view[header_start + header_len:]
+        self.rows = self.header['rows']
+
+    @property
+    def col_names(self):
+        return [info['name'] for info in self.header['columns']]
+
+    @property
+    def col_types(self):
+        return [info['type'] for info in self.header['columns']]
+
+    def columns(self):
+        """返回各列的只读视图"""
+        swapped = self.header['byteorder'] != sys.byteorder
+        return [self._column(info, swapped) for info in self.header['columns']]
+
+    def _column(self, info, swapped):
+        data = self.data[info['offset']:info['offset'] + info['length']]
+        encoding = info['encoding']
+        if encoding in ('q', 'd'):
+            if swapped:
+                # 其他字节序的机器写入的文件，复制到内存并转换
+                column = array(encoding, bytes(data))
+                column.byteswap()
+                return column
+            return data.cast(encoding)
+
+        tags = None
+        if encoding == 'm':
+            tags = bytes(data[:self.rows])
+            data = data[_align(self.rows):]
+        offsets_len = (self.rows + 1) * 8
+        if swapped:
+            offsets = array('q', bytes(data[:offsets_len]))
+            offsets.byteswap()
+        else:
+            offsets = data[:offsets_len].cast('q')
+        strings = MappedStrings(offsets, data[offsets_len:])
+        if tags is None:
+            return strings
+        return [_MIXED_TYPES.get(tag, str)(value) for tag, value in zip(tags, strings)]
+
+    def close(self):
+        self.data.release()
+        try:
+            self.map.close()
+        except BufferError:
+            # 仍有查询结果引用映射的数据，等其释放后由垃圾回收关闭
+            pass
+
+
+class Database:
+    """持久化数据库目录，由 SQLExecutor(path=...) 创建
+
+    表文件是某个时刻的快照，头部记录快照包含的最后一条日志的LSN。
+    INSERT/UPDATE/DELETE 对表的修改通过表的 journal 收集，语句结束时作为一条记录
+    写入预写日志；ALTER TABLE 写入 add_column / drop_column 记录（按列名，不复制数据）；
+    CREATE 直接写表快照。检查点把有修改的表写成新快照并清空日志，
+    日志超过 checkpoint_bytes 时由执行器在语句结束、释放锁之后执行（见 checkpoint_due），
+    关闭数据库时也会执行。
+    启动时先打开快照，再重放日志中比快照新的记录。
+    """
+
+    def __init__(self, path, sync_mode='full', sync_interval_ms=10,
+                 checkpoint_bytes=DEFAULT_CHECKPOINT_BYTES):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.wal = WriteAheadLog(path, sync_mode, sync_interval_ms)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.tables = {}
+        self.data = {}
+        self.files = {}       # 表名 -> 表文件名
+        self.mapped = {}      # 表名 -> 当前映射的 MappedTableFile
+        self.table_lsn = {}   # 表名 -> 表快照包含的最后一条日志
+        self.pending = []     # 当前语句的修改: [表名, 操作]
+        self.dirty = set()    # 上次快照之后有修改的表
+
+    def load(self, tables, data):
+        """打开所有表的快照并填入 tables / data，然后重放日志"""
+        self.tables = tables
+        self.data = data
+        schema_path = os.path.join(self.path, SCHEMA_FILE)
+        entries = []
+        if os.path.exists(schema_path):
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)['tables']
+
+        for entry in entries:
+            name = entry['name']
+            table_file = MappedTableFile(os.path.join(self.path, entry['file']))
+            col_names, col_types = table_file.col_names, table_file.col_types
+            table = ColumnarTable(col_types)
+            table.columns = table_file.columns()
+            table.length = table_file.rows
+            tables[name] = dict(zip(col_names, col_types))
+            data[name] = table
+            self.files[name] = entry['file']
+            self.mapped[name] = table_file
+            self.table_lsn[name] = table_file.header.get('lsn', 0)
+
+        records, valid_end = self.wal.read_records()
+        last_lsn = max(self.table_lsn.values(), default=0)
+        for lsn, ops in records:
+            for table_name, op in ops:
+                if table_name in data and lsn > self.table_lsn[table_name]:
+                    if op[0] in ALTER_OPS:
+                        self._replay_alter(table_name, op)
+                    else:
+                        data[table_name].apply_journal(op)
+                    self.dirty.add(table_name)
+            last_lsn = max(last_lsn, lsn)
+        self.wal.open(last_lsn, valid_end)
+
+        # 重放 ALTER TABLE 之后列的位置才确定；索引在第一次使用时才根据数据构建
+        for entry in entries:
+            col_names = list(tables[entry['name']])
+            for index_name, column in entry.get('indexes', []):
+                if column in col_names:
+                    data[entry['name']].restore_index(index_name, column, col_names.index(column))
+
+        for name, table in data.items():
+            self._attach(name, table)
+
+    def _replay_alter(self, table_name, op):
+        """重放 ALTER TABLE 记录；执行失败的 ALTER 也会记录，已有的列不再添加，不存在的列不删除"""
+        structure = self.tables[table_name]
+        if op[0] == 'add_column':
+            _, column, col_type = op
+            if column not in structure:
+                structure[column] = col_type
+                self.data[table_name].add_column(col_type, '')
+        elif op[1] in structure:
+            col_index = list(structure).index(op[1])
+            del structure[op[1]]
+            self.data[table_name].drop_column(col_index)
+
+    def _attach(self, table_name, table):
+        """收集表的修改，语句结束时写入日志"""
+        pending = self.pending
+        table.journal = lambda op: pending.append([table_name, op])
+
+    def persist(self, statement):
+        """语句执行后调用：把数据修改写入日志；表结构变化时写快照和 schema.json
+
+        返回写入的最后一条记录的LSN（没有写入时为None），释放锁之后用 sync(lsn) 提交。
+        """
+        lsn = None
+        if self.pending:
+            lsn = self.commit()
+        table_name = getattr(statement, 'table', None)
+        if statement.type == 'ALTER_TABLE' and table_name in self.data:
+            if statement.action == 'ADD':
+                op = ['add_column', statement.column, statement.column_def.col_type]
+            else:
+                op = ['drop_column', statement.column]
+            self.pending.append([table_name, op])
+            lsn = self.commit()
+        if statement.type in SNAPSHOT_TYPES and table_name in self.data:
+            self._attach(table_name, self.data[table_name])
+            self.save_table(table_name)
+        if statement.type == 'DROP_TABLE' and table_name not in self.data:
+            self.save_schema()
+            self.remove_table_file(table_name)
+        elif statement.type in SCHEMA_WRITE_TYPES:
+            self.save_schema()
+        return lsn
+
+    def commit_transaction(self, tables, ops):
+        """提交事务：tables 为换上的表 {表名: 表}，事务的全部修改 ops 作为一条记录写入日志
+
+        返回记录的LSN（没有修改时为None），释放锁之后用 sync(lsn) 提交。
+        """
+        for table_name, table in tables.items():
+            self._attach(table_name, table)
+        self.pending.extend(ops)
+        return self.commit_pending()
+
+    def commit(self):
+        """把当前语句收集到的修改写入日志，返回记录的LSN"""
+        ops = self.pending[:]
+        self.pending.clear()
+        self.dirty.update(table_name for table_name, _ in ops)
+        return self.wal.append(ops)
+
+    def commit_pending(self):
+        """把收集到的修改写入日志（后台整理等语句之外的修改），返回LSN，没有修改时返回None"""
+        if self.pending:
+            return self.commit()
+        return None
+
+    def sync(self, lsn):
+        """按同步方式提交 lsn 及之前写入的记录；在释放写互斥锁之后调用，多个线程的 fsync 可以合并"""
+        if lsn is not None:
+            self.wal.commit(lsn)
+
+    def checkpoint_due(self):
+        """日志是否已超过 checkpoint_bytes，需要执行检查点"""
+        return self.wal.file is not None and self.wal.size() >= self.checkpoint_bytes
+
+    def checkpoint(self):
+        """把有修改的表写成新快照，然后清空日志"""
+        self.sync(self.commit_pending())
+        self.wal.sync()
+        for table_name in sorted(self.dirty):
+            if table_name in self.data:
+                self.save_table(table_name)
+        self.dirty.clear()
+        self.wal.reset()
+
+    def file_name(self, table_name):
+        """表对应的文件名，新表根据表名生成不重复的文件名"""
+        if table_name in self.files:
+            return self.files[table_name]
+        base = re.sub(r'\W', '_', table_name)
+        used = set(self.files.values())
+        file_name = base + TABLE_SUFFIX
+        n = 1
+        while file_name in used or os.path.exists(os.path.join(self.path, file_name)):
+            n += 1
+            file_name = f"{base}_{n}{TABLE_SUFFIX}"
+        self.files[table_name] = file_name
+        return file_name
+
+    def save_table(self, table_name):
+        """写表快照，之后重新映射，使已修改的列不再占用内存"""
+        structure = self.tables[table_name]
+        table = self.data[table_name]
+        # 表文件只保存未删除的行，行号改变（此前开始的事务提交时换算，见 Transaction.journal_ops）
+        table.purge_deleted()
+        file_path = os.path.join(self.path, self.file_name(table_name))
+        write_table_file(file_path, table, list(structure.keys()), list(structure.values()),
+                         self.wal.lsn)
+        table_file = MappedTableFile(file_path)
+        table.columns = table_file.columns()
+        self.table_lsn[table_name] = self.wal.lsn
+        self.dirty.discard(table_name)
+        old = self.mapped.get(table_name)
+        self.mapped[table_name] = table_file
+        if old is not None:
+            old.close()
+
+    def save_schema(self):
+        """写入 schema.json：表的顺序、文件名和索引定义"""
+        entries = []
+        for name in self.tables:
+            entries.append({
+                'name': name,
+                'file': self.file_name(name),
+                'indexes': [[index.name, index.column] for index in self.data[name].indexes.values()],
+            })
+        schema_path = os.path.join(self.path, SCHEMA_FILE)
+        tmp_path = schema_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'tables': entries}, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, schema_path)
+        _sync_directory(self.path)
+
+    def remove_table_file(self, table_name):
+        file_name = self.files.pop(table_name, None)
+        table_file = self.mapped.pop(table_name, None)
+        self.table_lsn.pop(table_name, None)
+        self.dirty.discard(table_name)
+        if table_file is not None:
+            table_file.close()
+        if file_name is not None:
+            try:
+                os.remove(os.path.join(self.path, file_name))
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        """执行检查点，关闭日志并释放所有内存映射"""
+        if self.wal.file is None:
+            return
+        self.checkpoint()
+        self.wal.close()
+        for table_file in self.mapped.values():
+            table_file.close()
+        self.mapped = {}
@@ -0,0 +1,463 @@
+"""SELECT 的执行计划：谓词下推和连接顺序
+
+WHERE 条件和 INNER JOIN 的 ON 条件按顶层AND拆成若干项：只涉及一个表的项下推到该表的
+扫描（可以使用索引），涉及多个表的项在所需的表都连接之后立即使用。连接顺序用贪心法
+选择：依次以每个表为起点，每一步加入估计结果最小的表，有等值条件可用的表优先；只有
+中间结果估计行数之和（需要还原书写顺序时加上排序的代价）小于按书写顺序连接时才调整顺序。
+查询中有 LEFT/RIGHT/FULL JOIN、同一个表出现多次，或 ON 条件引用了之后才连接的表时，
+按书写顺序连接，WHERE 条件在所有连接之后使用。
+
+行数估计：列上有索引时用索引的二分查找得到准确的行数；执行过 ANALYZE 的表使用
+统计信息（不同值个数、直方图，见 statistics.py）；否则使用默认的选择率（见 DEFAULT_SELECTIVITY）。
+"""
+
+import math
+
+from sql_translator.core.ast_nodes import BoolOp, ColumnRef, Comparison, Literal, Not
+from sql_translator.core.index import INDEXABLE_OPERATORS, choose_index
+from sql_translator.core.predicate import MIRRORED_OPERATORS, find_column
+
+# 没有更好的信息时 "列 op 常量" 的选择率
+DEFAULT_SELECTIVITY = {'=': 0.1, '!=': 0.9, '<': 0.3, '>': 0.3, '<=': 0.3, '>=': 0.3,
+                       'LIKE': 0.1, 'NOT LIKE': 0.9}
+# OR / NOT 等其他条件的选择率
+OTHER_SELECTIVITY = 0.5
+
+# 可以调整连接顺序、下推WHERE条件的JOIN类型
+REORDERABLE_JOINS = {'INNER', 'CROSS'}
+
+STRATEGY_NAMES = {'hash_join': '哈希连接', 'nested_loop': '嵌套循环连接', 'cross_join': '笛卡尔积'}
+
+
+def split_conjuncts(condition):
+    """把条件按顶层AND拆成若干项"""
+    if condition is None:
+        return []
+    if isinstance(condition, BoolOp) and condition.op == 'AND':
+        terms = []
+        for operand in condition.operands:
+            terms.extend(split_conjuncts(operand))
+        return terms
+    return [condition]
+
+
+def conjunction(terms):
+    """用AND连接若干项，没有条件时返回None"""
+    if not terms:
+        return None
+    if len(terms) == 1:
+        return terms[0]
+    return BoolOp('AND', tuple(terms))
+
+
+def qualify(node, col_names, tables):
+    """把条件中能解析的列引用改写为带表名的形式，涉及的表加入 tables
+
+    列的解析与编译条件时相同（见 find_column），改写后在任何列顺序下都解析到同一列；
+    不能解析的列引用保持原样，编译时的处理也不变。
+    """
+    if isinstance(node, ColumnRef):
+        idx = find_column(col_names, node)
+        if idx == -1:
+            return node
+        table, name = col_names[idx].rsplit('.', 1)
+        tables.add(table)
+        return ColumnRef(name, table)
+    if isinstance(node, Comparison):
+        return Comparison(qualify(node.left, col_names, tables), node.op,
+                          qualify(node.right, col_names, tables))
+    if isinstance(node, BoolOp):
+        return BoolOp(node.op, tuple(qualify(operand, col_names, tables)
+                                     for operand in node.operands))
+    if isinstance(node, Not):
+        return Not(qualify(node.operand, col_names, tables))
+    return node
+
+
+def column_refs(node):
+    """条件中的所有列引用"""
+    if isinstance(node, ColumnRef):
+        yield node
+    elif isinstance(node, Comparison):
+        yield from column_refs(node.left)
+        yield from column_refs(node.right)
+    elif isinstance(node, BoolOp):
+        for operand in node.operands:
+            yield from column_refs(operand)
+    elif isinstance(node, Not):
+        yield from column_refs(node.operand)
+
+
+def _find_strict(col_names, column):
+    """与 find_column 相同，但带表名的列引用必须精确匹配"""
+    if column.table:
+        target = f"{column.table}.{column.name}".upper()
+        for i, name in enumerate(col_names):
+            if name.upper() == target:
+                return i
+        return -1
+    return find_column(col_names, column)
+
+
+def _is_column_equality(condition):
+    return (isinstance(condition, Comparison) and condition.op == '='
+            and isinstance(condition.left, ColumnRef) and isinstance(condition.right, ColumnRef))
+
+
+class ScanPlan:
+    """对一个表的扫描：下推到该表的条件、使用的索引和估计行数"""
+
+    def __init__(self, table, col_names, rows, stats=None):
+        self.table = table
+        self.col_names = col_names  # 多表查询中为 "表.列"
+        self.rows = rows            # 表的行数
+        self.stats = stats          # 表的统计信息，没有执行过 ANALYZE 时为None
+        self.filters = []           # 下推到该表的条件
+        self.index = None           # 使用的索引 (索引, 运算符, 常量)
+        self.estimate = rows        # 过滤后的估计行数
+
+    @property
+    def condition(self):
+        return conjunction(self.filters)
+
+    def describe(self):
+        parts = [f"{self.rows} 行"]
+        if self.index is not None:
+            index, op, value = self.index
+            parts.append(f"索引 {index.name} ({index.column} {op} {value})")
+        if self.filters:
+            parts.append(f"过滤 {self.condition.sql()}")
+        parts.append(f"估计 {round(self.estimate)} 行")
+        return '，'.join(parts)
+
+
+class JoinStep:
+    """把一个表连接到已有的结果上
+
+    strategy 为 hash_join / nested_loop / cross_join。哈希连接的 keys 为
+    (左侧合并行中的列, 右侧表中的列)，filters 在连接之后使用；
+    嵌套循环连接的 filters 即连接条件。
+    """
+
+    def __init__(self, scan, strategy, filters, estimate, keys=None, build_side='right'):
+        self.scan = scan
+        self.strategy = strategy
+        self.filters = filters
+        self.estimate = estimate
+        self.keys = keys
+        self.build_side = build_side
+        self.key_sql = None  # 哈希连接的等值条件，用于显示
+
+    @property
+    def condition(self):
+        return conjunction(self.filters)
+
+    def describe(self):
+        name = f"{STRATEGY_NAMES[self.strategy]} {self.scan.table}"
+        if self.strategy == 'hash_join':
+            name += f"（在{'右' if self.build_side == 'right' else '左'}侧建哈希表）"
+        parts = [self.scan.describe()]
+        if self.key_sql:
+            parts.append(f"连接键 {self.key_sql}")
+        if self.filters:
+            parts.append(f"条件 {self.condition.sql()}")
+        parts.append(f"结果估计 {round(self.estimate)} 行")
+        return f"{name}：" + '，'.join(parts)
+
+
+class QueryPlan:
+    """SELECT 的扫描和连接计划
+
+    scans[0] 是第一个读取的表，steps 依次把其余的表连接上来。连接顺序与书写顺序
+    不同时，output_map 把合并行还原为书写顺序的列；restore_order 为 True 时结果行也还原为
+    按书写顺序连接时的顺序（见 SelectOperation.execute_plan）。residual 为不涉及任何列的
+    条件，在最后使用。
+    """
+
+    def __init__(self, scans, steps=(), residual=None, output_map=None, restore_order=True):
+        self.scans = scans
+        self.steps = list(steps)
+        self.residual = residual
+        self.output_map = output_map
+        self.restore_order = output_map is not None and restore_order
+
+    @property
+    def strategies(self):
+        """每个JOIN选择的执行策略"""
+        result = []
+        for step in self.steps:
+            strategy = step.strategy
+            if strategy == 'hash_join':
+                strategy += f"(build={step.build_side})"
+            result.append(f"{step.scan.table}: {strategy}")
+        return result
+
+    def explain(self):
+        """计划的文字描述，每行一个步骤"""
+        lines = [f"扫描 {self.scans[0].table}：{self.scans[0].describe()}"]
+        lines.extend(step.describe() for step in self.steps)
+        if self.restore_order:
+            lines.append("按书写顺序排列各表的列，结果行按书写顺序的各表行号排序")
+        elif self.output_map is not None:
+            lines.append("按书写顺序排列各表的列")
+        if self.residual is not None:
+            lines.append(f"过滤 {self.residual.sql()}")
+        return lines
+
+
+def term_selectivity(term, table, col_names):
+    """单表条件的选择率
+
+    "列 op 常量" 形式的比较能用索引回答时用索引的行数，其次使用统计信息，其他使用默认值。
+    """
+    if not isinstance(term, Comparison):
+        return OTHER_SELECTIVITY
+    left, op, right = term.left, term.op, term.right
+    if op not in MIRRORED_OPERATORS:
+        # LIKE 没有索引和统计信息可用
+        return DEFAULT_SELECTIVITY.get(op, OTHER_SELECTIVITY)
+    if isinstance(left, Literal) and isinstance(right, ColumnRef):
+        left, right, op = right, left, MIRRORED_OPERATORS[op]
+    if isinstance(left, ColumnRef) and isinstance(right, Literal) and len(table):
+        col_index = find_column(col_names, left)
+        if op in INDEXABLE_OPERATORS:
+            for index in getattr(table, 'indexes', {}).values():
+                if index.col_index == col_index and index.built:
+                    count = index.estimate(op, right.value)
+                    if count is not None:
+                        return count / len(table)
+        stats = getattr(table, 'stats', None)
+        if stats is not None and col_index != -1:
+            selectivity = stats.columns[col_index].selectivity(op, right.value)
+            if selectivity is not None:
+                return selectivity
+    return DEFAULT_SELECTIVITY.get(op, OTHER_SELECTIVITY)
+
+
+def estimate_scan(scan, table):
+    """选择扫描使用的索引并估计过滤后的行数"""
+    condition = scan.condition
+    if condition is None:
+        return
+    scan.index = choose_index(table, condition, scan.col_names)
+    selectivity = 1.0
+    for term in split_conjuncts(condition):
+        selectivity *= term_selectivity(term, table, scan.col_names)
+    scan.estimate = scan.rows * selectivity
+
+
+def _distinct_values(scan, column):
+    """连接列的不同值个数：有统计信息时使用估计值，否则假设各行的值互不相同"""
+    if scan.stats is not None:
+        col_index = find_column(scan.col_names, column)
+        if col_index != -1 and scan.stats.columns[col_index].count:
+            return scan.stats.columns[col_index].distinct
+    return scan.rows
+
+
+def join_selectivity(term, scans):
+    """连接条件的选择率：等值条件为 1 / 两侧连接列不同值个数的较大者"""
+    if _is_column_equality(term):
+        sizes = [_distinct_values(scans[ref.table], ref)
+                 for ref in (term.left, term.right) if ref.table in scans]
+        return 1 / max(max(sizes, default=1), 1)
+    if isinstance(term, Comparison):
+        return DEFAULT_SELECTIVITY.get(term.op, OTHER_SELECTIVITY)
+    return OTHER_SELECTIVITY
+
+
+def plan_select(statement, schemas, data):
+    """为SELECT语句选择扫描和连接计划
+
+    schemas 为 {表名: {列名: 类型}}，data 为 {表名: 表数据}；调用前应已检查表存在。
+    """
+    names = statement.tables
+    multi = len(names) > 1
+    scans = []
+    for name in names:
+        columns = list(schemas[name].keys())
+        col_names = [f"{name}.{col}" for col in columns] if multi else columns
+        table = data[name]
+        scans.append(ScanPlan(name, col_names, len(table), getattr(table, 'stats', None)))
+
+    if not multi:
+        scan = scans[0]
+        if statement.where is not None:
+            scan.filters.append(statement.where)
+        estimate_scan(scan, data[scan.table])
+        return QueryPlan(scans)
+
+    if (len(set(names)) != len(names)
+            or any(join.kind not in REORDERABLE_JOINS for join in statement.joins)
+            or _has_forward_references(statement, scans)):
+        return _plan_written_order(statement, scans)
+    return _plan_reordered(statement, scans, data)
+
+
+def _has_forward_references(statement, scans):
+    """ON 条件中是否有在它之前（含本身）的表中找不到的列
+
+    这样的列在书写顺序下按未知列处理，调整连接顺序后可能变为已知，结果会不同。
+    """
+    prefix = list(scans[0].col_names)
+    for scan, join in zip(scans[1:], statement.joins):
+        prefix += scan.col_names
+        if any(find_column(prefix, ref) == -1 for ref in column_refs(join.condition)):
+            return True
+    return False
+
+
+def _build_side(steps, left_estimate, scan):
+    """第一个连接的两侧都是表，在较小的一侧建哈希表；之后左侧是数据流，在右侧建表"""
+    return 'left' if not steps and scan.estimate > left_estimate else 'right'
+
+
+def _plan_written_order(statement, scans):
+    """按书写顺序连接，每个ON条件只用于它所在的JOIN，WHERE 在最后使用"""
+    layout = list(scans[0].col_names)
+    estimate = scans[0].estimate
+    steps = []
+    by_name = {scan.table: scan for scan in scans}
+    for scan, join in zip(scans[1:], statement.joins):
+        condition = join.condition
+        keys = None
+        if _is_column_equality(condition):
+            for left, right in ((condition.left, condition.right),
+                                (condition.right, condition.left)):
+                left_idx = _find_strict(layout, left)
+                right_idx = _find_strict(scan.col_names, right)
+                if left_idx != -1 and right_idx != -1:
+                    keys = (left_idx, right_idx)
+                    break
+
+        result = estimate * scan.estimate
+        if condition is None:
+            step = JoinStep(scan, 'cross_join', [], result)
+        elif keys is not None:
+            result *= join_selectivity(qualify(condition, layout + scan.col_names, set()), by_name)
+            step = JoinStep(scan, 'hash_join', [], result, keys,
+                            _build_side(steps, estimate, scan))
+            step.key_sql = condition.sql()
+        else:
+            result *= OTHER_SELECTIVITY
+            step = JoinStep(scan, 'nested_loop', [condition], result)
+        steps.append(step)
+        layout += scan.col_names
+        estimate = result
+    return QueryPlan(scans, steps, statement.where)
+
+
+def _plan_reordered(statement, scans, data):
+    """下推单表条件，贪心选择连接顺序"""
+    combined = [name for scan in scans for name in scan.col_names]
+    by_name = {scan.table: scan for scan in scans}
+
+    join_terms = []
+    residual = []
+    # ON 条件中的列在它之前（含本身）的表中解析，与书写顺序下相同；WHERE 在所有表中解析
+    conditions = [(statement.where, combined)]
+    prefix = list(scans[0].col_names)
+    for scan, join in zip(scans[1:], statement.joins):
+        prefix = prefix + scan.col_names
+        conditions.append((join.condition, prefix))
+    for condition, col_names in conditions:
+        for term in split_conjuncts(condition):
+            tables = set()
+            term = qualify(term, col_names, tables)
+            if not tables:
+                residual.append(term)
+            elif len(tables) == 1:
+                by_name[tables.pop()].filters.append(term)
+            else:
+                join_terms.append((term, frozenset(tables)))
+    for scan in scans:
+        estimate_scan(scan, data[scan.table])
+
+    # 依次以每个表作为起点贪心地选择连接顺序，取中间结果估计行数之和最小的顺序；
+    # 只有代价（加上还原书写顺序的排序）严格小于按书写顺序连接时才调整顺序
+    restore = needs_written_order(statement)
+    written = _greedy_join(scans[0], scans, join_terms, by_name, fixed=True)
+    best = None
+    for first in scans:
+        candidate = _greedy_join(first, scans, join_terms, by_name)
+        if best is None or candidate[0] < best[0]:
+            best = candidate
+    cost = best[0]
+    if restore:
+        cost += sort_cost(best[2][-1].estimate)
+    # 按书写顺序连接时取够 LIMIT 行就能停止，还原顺序需要读完整个连接结果
+    if cost >= written[0] or (restore and statement.limit is not None):
+        best = written
+    _, order, steps, layout = best
+
+    output_map = None
+    if order != scans:
+        output_map = [layout.index(name) for name in combined]
+    return QueryPlan(order, steps, conjunction(residual), output_map, restore)
+
+
+def needs_written_order(statement):
+    """调整连接顺序后是否需要把结果行还原为书写顺序
+
+    有 ORDER BY 或分组聚合的查询不依赖连接结果的顺序（ORDER BY 中相等的行之间的顺序不保证），
+    其他查询的结果行与按书写顺序连接时相同。
+    """
+    return not (statement.order_by or statement.is_aggregate)
+
+
+def sort_cost(rows):
+    """对 rows 行排序的估计代价，与中间结果行数同一量级"""
+    return rows * max(math.log2(rows), 1.0) if rows > 1 else 0.0
+
+
+def _greedy_join(first, scans, join_terms, by_name, fixed=False):
+    """从 first 开始，每一步加入估计结果最小的表（有等值条件可用的优先）
+
+    fixed 为 True 时按 scans 的顺序连接（用于估计书写顺序的代价）。
+    返回 (代价, 连接顺序, 连接步骤, 合并行的列名)，代价为各步结果估计行数之和；
+    第一个表的行数已经体现在各步结果中，不重复计入，两表等值连接无论哪个表在前代价都相同。
+    """
+    remaining = [scan for scan in scans if scan is not first]
+    order = [first]
+    joined = {first.table}
+    layout = list(first.col_names)
+    estimate = first.estimate
+    cost = 0.0
+    steps = []
+    while remaining:
+        best = None
+        for scan in remaining[:1] if fixed else remaining:
+            available = joined | {scan.table}
+            terms = [term for term, tables in join_terms
+                     if scan.table in tables and tables <= available]
+            key_term = next((term for term in terms if _is_column_equality(term)), None)
+            result = estimate * scan.estimate
+            for term in terms:
+                result *= join_selectivity(term, by_name)
+            rank = (key_term is None, result)
+            if best is None or rank < best[0]:
+                best = (rank, scan, terms, key_term, result)
+        _, scan, terms, key_term, result = best
+
+        if key_term is not None:
+            left, right = key_term.left, key_term.right
+            if right.table != scan.table:
+                left, right = right, left
+            keys = (find_column(layout, left), find_column(scan.col_names, right))
+            filters = [term for term in terms if term is not key_term]
+            step = JoinStep(scan, 'hash_join', filters, result, keys,
+                            _build_side(steps, estimate, scan))
+            step.key_sql = key_term.sql()
+        elif terms:
+            step = JoinStep(scan, 'nested_loop', terms, result)
+        else:
+            step = JoinStep(scan, 'cross_join', [], result)
+        steps.append(step)
+        join_terms = [(term, tables) for term, tables in join_terms if term not in terms]
+        remaining.remove(scan)
+        order.append(scan)
+        joined.add(scan.table)
+        layout += scan.col_names
+        estimate = result
+        cost += result
+    return cost, order, steps, layout
@@ -0,0 +1,166 @@
+import operator
+import re
+from functools import lru_cache
+
+from sql_translator.core.ast_nodes import BoolOp, ColumnRef, Comparison, Literal, Not
+
+COMPARATORS = {
+    '=': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+}
+
+# 交换比较两侧时对应的运算符
+MIRRORED_OPERATORS = {'=': '=', '!=': '!=', '>': '<', '<': '>', '>=': '<=', '<=': '>='}
+
+# 模式匹配运算符，结果为真时是否匹配；两侧不能交换，也不能用索引
+PATTERN_OPERATORS = {'LIKE': True, 'NOT LIKE': False}
+
+# 编译结果缓存的最大条目数
+PREDICATE_CACHE_SIZE = 256
+
+
+def find_column(col_names, column):
+    """查找列引用在列名列表中的索引（不区分大小写），找不到返回-1
+
+    col_names 中的名称可以带表名前缀（多表查询时为 "表.列"）。
+    带表名的列引用优先精确匹配 "表.列"，否则按列名匹配第一个同名列。
+    """
+    if column.table:
+        target = f"{column.table}.{column.name}".upper()
+        for i, name in enumerate(col_names):
+            if name.upper() == target:
+                return i
+    target = column.name.upper()
+    for i, name in enumerate(col_names):
+        if name.rsplit('.', 1)[-1].upper() == target:
+            return i
+    return -1
+
+
+def compare_values(compare, left, right):
+    """两侧都能转换为数字时按数值比较，否则按字符串比较"""
+    try:
+        return compare(float(left), float(right))
+    except (ValueError, TypeError):
+        return compare(str(left), str(right))
+
+
+def _always_true(row):
+    return True
+
+
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
+def like_pattern(pattern):
+    """把 LIKE 模式编译为正则：% 匹配任意个字符，_ 匹配一个字符，区分大小写"""
+    parts = ('.*' if char == '%' else '.' if char == '_' else re.escape(char) for char in pattern)
+    return re.compile(''.join(parts), re.DOTALL)
+
+
+def like_match(value, pattern, expected=True):
+    """value 是否匹配 LIKE 模式（expected 为假时为 NOT LIKE），两侧都按字符串比较"""
+    return (like_pattern(str(pattern)).fullmatch(str(value)) is not None) == expected
+
+
+def _operand_getter(operand, col_names):
+    """返回 get(row) 取比较一侧的值；不是已知的列时按不带引号的常量处理"""
+    if isinstance(operand, ColumnRef):
+        col_index = find_column(col_names, operand)
+        if col_index != -1:
+            return operator.itemgetter(col_index)
+        operand = Literal(operand.sql())
+    value = operand.value
+    return lambda row: value
+
+
+def _compile_like(condition, col_names):
+    left, right = condition.left, condition.right
+    expected = PATTERN_OPERATORS[condition.op]
+    if isinstance(left, ColumnRef) and find_column(col_names, left) == -1:
+        return _always_true
+    get_value = _operand_getter(left, col_names)
+    if isinstance(right, Literal):
+        # 常量模式只编译一次
+        match = like_pattern(right.value).fullmatch
+        return lambda row: (match(str(get_value(row))) is not None) == expected
+    get_pattern = _operand_getter(right, col_names)
+    return lambda row: like_match(get_value(row), get_pattern(row), expected)
+
+
+def _compile_comparison(condition, col_names):
+    if condition.op in PATTERN_OPERATORS:
+        return _compile_like(condition, col_names)
+    left, op, right = condition.left, condition.op, condition.right
+    if isinstance(left, Literal) and isinstance(right, ColumnRef):
+        left, right, op = right, left, MIRRORED_OPERATORS[op]
+    compare = COMPARATORS[op]
+
+    if isinstance(left, Literal):
+        result = compare_values(compare, left.value, right.value)
+        return lambda row: result
+
+    col_index = find_column(col_names, left)
+    if col_index == -1:
+        return _always_true
+
+    if isinstance(right, ColumnRef):
+        other_index = find_column(col_names, right)
+        if other_index != -1:
+            return lambda row: compare_values(compare, row[col_index], row[other_index])
+        # 右侧不是已知的列，按不带引号的常量处理
+        right = Literal(right.sql())
+
+    value = right.value
+    try:
+        number = float(value)
+    except ValueError:
+        # 常量不是数字，按字符串比较
+        def predicate(row):
+            return compare(str(row[col_index]), value)
+        return predicate
+
+    def predicate(row):
+        row_value = row[col_index]
+        try:
+            return compare(float(row_value), number)
+        except (ValueError, TypeError):
+            return compare(str(row_value), value)
+    return predicate
+
+
+def _compile_node(condition, col_names):
+    if isinstance(condition, Comparison):
+        return _compile_comparison(condition, col_names)
+    if isinstance(condition, Not):
+        operand = _compile_node(condition.operand, col_names)
+        return lambda row: not operand(row)
+    if isinstance(condition, BoolOp):
+        operands = [_compile_node(operand, col_names) for operand in condition.operands]
+        if condition.op == 'AND':
+            return lambda row: all(operand(row) for operand in operands)
+        return lambda row: any(operand(row) for operand in operands)
+    raise TypeError(f"无法编译的条件: {condition!r}")
+
+
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
+def _compile(condition, col_names):
+    return _compile_node(condition, col_names)
+
+
+def compile_condition(condition, col_names):
+    """把WHERE条件的语法树编译为 predicate(row) -> bool
+
+    列索引和常量只在编译时解析一次。结果按 (条件, 列名元组) 缓存，
+    列名元组即表结构的版本：ALTER TABLE 之后列发生变化，会自动重新编译。
+    """
+    if condition is None:
+        return _always_true
+    return _compile(condition, tuple(col_names))
+
+
+def predicate_cache_info():
+    """返回编译缓存的命中统计"""
+    return _compile.cache_info()
@@ -0,0 +1,213 @@
+from dataclasses import fields, is_dataclass, replace
+
+from sql_translator.core.ast_nodes import Literal, Parameter
+from sql_translator.core.operations import MISSING_VALUE
+from sql_translator.core.storage import ColumnarTable, column_kind
+
+# 各存储类别在参数中无需转换的Python类型
+COLUMN_PYTHON_TYPES = {'int': int, 'float': float, 'str': str}
+
+
+def parameter_literal(value):
+    """把绑定的Python值转换为常量节点，不支持的类型返回None"""
+    if isinstance(value, str):
+        return Literal(value, True)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return Literal(str(value))
+    return None
+
+
+def bind_parameters(node, values):
+    """返回把语法树中的参数替换为常量后的新语法树，未包含参数的子树原样复用"""
+    if isinstance(node, Parameter):
+        return parameter_literal(values[node.key])
+    if isinstance(node, tuple):
+        bound = tuple(bind_parameters(item, values) for item in node)
+        return node if all(a is b for a, b in zip(bound, node)) else bound
+    if is_dataclass(node):
+        changes = {}
+        for field in fields(node):
+            value = getattr(node, field.name)
+            bound = bind_parameters(value, values)
+            if bound is not value:
+                changes[field.name] = bound
+        return replace(node, **changes) if changes else node
+    return node
+
+
+class PreparedStatement:
+    """预编译语句，由 SQLExecutor.prepare 创建
+
+    语句只解析一次。参数使用 ? （按位置）或 :名称 （按名称）占位，
+    execute 时传入序列或字典绑定。INSERT语句的表结构解析和常量类型检查
+    在第一次执行前完成，之后每次执行只检查并写入绑定的参数；
+    表结构发生变化（CREATE/ALTER/DROP）后会自动重新解析。
+    """
+
+    def __init__(self, executor, sql, parsed):
+        self.executor = executor
+        self.sql = sql
+        self.type = parsed['type']
+        self.statement = parsed['statement']
+        self.parameters = parsed['parameters']
+        self._insert_plan = None   # (版本, 插入计划)
+        if self.type == 'INSERT':
+            self._prepare_insert()
+
+    def execute(self, params=()):
+        """绑定参数并执行，返回值与 SQLExecutor.execute_sql 相同"""
+        values = self.bind(params)
+        if isinstance(values, str):
+            return values
+        return self.executor.traced(self.sql, self.type, lambda: self._execute(values))
+
+    def _execute(self, values):
+        if self.type == 'INSERT':
+            return self._execute_insert(values)
+
+        for key, value in values.items():
+            if parameter_literal(value) is None:
+                return f"错误：参数 {key} 的类型 {type(value).__name__} 不受支持"
+        return self.executor.execute_statement(bind_parameters(self.statement, values))
+
+    def bind(self, params):
+        """把传入的参数整理为 {参数键: 值}，参数个数或名称不匹配时返回错误信息"""
+        if self.parameters and isinstance(self.parameters[0], str):
+            if not isinstance(params, dict):
+                return "错误：命名参数需要以字典传入"
+            missing = [name for name in self.parameters if name not in params]
+            if missing:
+                return f"错误：缺少参数 {', '.join(':' + name for name in missing)}"
+            return {name: params[name] for name in self.parameters}
+
+        if isinstance(params, dict):
+            return "错误：位置参数需要以序列传入"
+        if len(params) != len(self.parameters):
+            return f"错误：需要 {len(self.parameters)} 个参数，实际为 {len(params)}"
+        return dict(enumerate(params))
+
+    def executemany(self, params_seq):
+        """用多组参数重复执行
+
+        INSERT语句先按列批量检查所有参数，全部通过后一次性追加到表中，
+        任何一组参数有错误时不插入任何数据；其他语句依次执行并返回结果列表。
+        """
+        bound = []
+        for params in params_seq:
+            values = self.bind(params)
+            if isinstance(values, str):
+                return values
+            bound.append(values)
+
+        if self.type != 'INSERT':
+            results = []
+            for values in bound:
+                for key, value in values.items():
+                    if parameter_literal(value) is None:
+                        return f"错误：参数 {key} 的类型 {type(value).__name__} 不受支持"
+                statement = bind_parameters(self.statement, values)
+                results.append(self.executor.traced(
+                    self.sql, self.type, lambda: self.executor.execute_statement(statement)))
+            return results
+
+        # 批量插入作为一条语句跟踪
+        return self.executor.traced(
+            self.sql, self.type,
+            lambda: self.executor.execute_locked(self.statement, lambda: self._insert(bound, False)))
+
+    def _prepare_insert(self):
+        """按当前线程看到的表（事务中为事务的快照，见 SQLExecutor.catalog）生成插入计划
+
+        计划和生成它时的版本作为一个元组保存在 _insert_plan 中：同一条预编译语句可能
+        同时在事务内外的多个线程中执行，各线程每次读取一次元组，不会拿到其他线程按
+        不同的表生成的计划。返回插入计划。
+        """
+        tables, data, version = self.executor.catalog()
+        plan = self._plan_insert(tables, data)
+        self._insert_plan = (version, plan)
+        return plan
+
+    def _plan_insert(self, tables, data):
+        """解析INSERT的目标表、检查常量值，并记录每个参数对应的行和列
+
+        返回 (表, 行模板, 参数位置, 是否保存转换后的值)，出错时返回错误信息。
+        """
+        statement = self.statement
+        operation = self.executor.operations['INSERT']
+        table_name = statement.table
+
+        if table_name not in data:
+            return f"表 {table_name} 不存在"
+
+        col_types = list(tables[table_name].values())
+        positions = operation.column_positions(statement, list(tables[table_name].keys()))
+        if isinstance(positions, str):
+            return positions
+        template = []
+        slots = []
+        for r, values in enumerate(statement.rows):
+            if len(values) != len(positions):
+                return (f"错误：{operation.row_label(r, len(statement.rows))}"
+                        f"值的数量({len(values)})与列数({len(positions)})不匹配")
+            row = [MISSING_VALUE] * len(col_types)
+            for i, value in zip(positions, values):
+                type_str = col_types[i]
+                if isinstance(value, Parameter):
+                    row[i] = None
+                    slots.append((r, i, value.key, column_kind(type_str)))
+                    continue
+                error = operation.check_value(i, value, type_str)
+                if error:
+                    return error
+                row[i] = value.value
+            template.append(row)
+
+        table = data[table_name]
+        # 行式存储保存字符串，列式存储直接保存转换后的值
+        keep_typed = isinstance(table, ColumnarTable)
+        return table, template, slots, keep_typed
+
+    def _execute_insert(self, values):
+        return self.executor.execute_locked(self.statement, lambda: self._insert([values], True))
+
+    def _insert(self, bound, single):
+        """按插入计划写入各组参数对应的行；single 为真时只有一行的插入使用单行的提示"""
+        version, plan = self._insert_plan
+        if version != self.executor.catalog()[2]:
+            plan = self._prepare_insert()
+        if isinstance(plan, str):
+            return plan
+
+        table, template, slots, keep_typed = plan
+        rows = self.build_rows(bound, template, slots, keep_typed)
+        if isinstance(rows, str):
+            return rows
+        if single and len(rows) == 1:
+            table.append(rows[0])
+            return f"向表 {self.statement.table} 插入数据成功"
+        table.extend(rows)
+        return f"向表 {self.statement.table} 插入 {len(rows)} 行数据成功"
+
+    def build_rows(self, bound, template, slots, keep_typed):
+        """按插入计划为每组参数生成行，参数按列批量转换，类型不符时返回错误信息"""
+        convert_parameter = self.executor.operations['INSERT'].convert_parameter
+        rows = [list(row) for _ in bound for row in template]
+        width = len(template)
+        for r, i, key, kind in slots:
+            column = [values[key] for values in bound]
+            expected = COLUMN_PYTHON_TYPES.get(kind)
+            if expected and all(type(value) is expected for value in column):
+                # 整列已经是目标类型，无需逐个转换
+                converted = column
+            else:
+                converted = []
+                for value in column:
+                    value, error = convert_parameter(i, value, kind)
+                    if error:
+                        return error
+                    converted.append(value)
+            if not keep_typed:
+                converted = [str(value) for value in converted]
+            for n, value in enumerate(converted):
+                rows[n * width + r][i] = value
+        return rows
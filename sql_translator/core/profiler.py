@@ -0,0 +1,245 @@
+"""查询剖析：EXPLAIN ANALYZE 和 SQLExecutor.profile
+
+SELECT 的执行管道由生成器串联（见 SelectOperation.iter_rows）。剖析时管道的每个阶段
+（扫描、过滤、连接、聚合、排序、LIMIT、投影、格式化）包装为 Stage，统计：
+
+    time_ms           该阶段自身的耗时，不含从上游阶段取行的时间
+    rows_in           从上游阶段读取的行数
+    rows_out          产出的行数
+    alloc_peak_bytes  开启内存统计时，该阶段一次取值期间（含上游）新分配内存的最大值
+
+阶段之间的上下游关系在执行时按调用关系记录，排序和哈希连接建表等需要先读完输入的
+阶段也能正确拆分耗时。内存统计基于 tracemalloc：EXPLAIN ANALYZE 在 tracemalloc 已经
+开启时统计，SQLExecutor.profile(sql, memory=True) 在执行期间临时开启；开启后执行会
+明显变慢，各阶段的耗时只适合相互比较；tracemalloc 是整个进程共用的，多个线程同时统计内存时
+结果不准确。没有在剖析时，构建管道的各阶段只检查一次当前线程是否在剖析中。
+"""
+
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+_local = threading.local()
+
+# 阶段名称 -> 显示名称
+STAGE_NAMES = {
+    'scan': '扫描',
+    'filter': '过滤',
+    'hash_join': '哈希连接',
+    'nested_loop': '嵌套循环连接',
+    'cross_join': '笛卡尔积',
+    'written_order': '还原书写顺序',
+    'vectorized': '向量化执行',
+    'parallel_scan': '并行扫描',
+    'aggregate': '分组聚合',
+    'sort': '排序',
+    'limit': 'LIMIT',
+    'project': '投影',
+    'format': '格式化',
+}
+
+
+def current_profile():
+    """当前线程正在剖析的查询，没有在剖析时为None"""
+    return getattr(_local, 'profile', None)
+
+
+@contextmanager
+def profiling(profile):
+    """在当前线程中把 profile 设为正在剖析的查询"""
+    previous = getattr(_local, 'profile', None)
+    _local.profile = profile
+    try:
+        yield profile
+    finally:
+        _local.profile = previous
+
+
+class Stage:
+    """执行管道中的一个阶段：包装该阶段产出行的迭代器"""
+
+    __slots__ = ('profile', 'id', 'name', 'detail', 'iterator', 'inputs', 'started', 'rows_out',
+                 'seconds', 'child_seconds', 'entry_memory', 'frame_peak', 'alloc_peak')
+
+    def __init__(self, profile, stage_id, name, detail, rows):
+        self.profile = profile
+        self.id = stage_id
+        self.name = name
+        self.detail = detail
+        self.iterator = iter(rows)
+        self.inputs = []          # 执行时从中取行的上游阶段
+        self.started = False      # 是否取过值；向量化等路径不使用按行的管道
+        self.rows_out = 0
+        self.seconds = 0.0        # 自身耗时，不含上游阶段
+        self.child_seconds = 0.0  # 本次取值中上游阶段的耗时
+        self.entry_memory = 0
+        self.frame_peak = 0
+        self.alloc_peak = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.profile.advance(self)
+
+    @property
+    def rows_in(self):
+        return sum(stage.rows_out for stage in self.inputs)
+
+    def summary(self):
+        result = {
+            'id': self.id,
+            'stage': self.name,
+            'detail': self.detail,
+            'inputs': [stage.id for stage in self.inputs],
+            'time_ms': self.seconds * 1000,
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+        }
+        if self.profile.memory:
+            result['alloc_peak_bytes'] = self.alloc_peak
+        return result
+
+    def line(self):
+        label = STAGE_NAMES.get(self.name, self.name)
+        if self.detail:
+            label += f" {self.detail}"
+        line = (f"{label}：耗时 {self.seconds * 1000:.3f} ms，"
+                f"输入 {self.rows_in} 行，输出 {self.rows_out} 行")
+        if self.profile.memory:
+            line += f"，内存峰值 {self.alloc_peak} 字节"
+        return line
+
+
+class QueryProfile:
+    """一次查询的剖析结果
+
+    memory 为真时用 tracemalloc 统计各阶段分配的内存（tracemalloc 没有开启时在执行期间临时开启）；
+    为None时只在 tracemalloc 已经开启时统计。
+    """
+
+    def __init__(self, sql=None, memory=None, parse_ms=0.0):
+        self.sql = sql
+        self.memory = tracemalloc.is_tracing() if memory is None else memory
+        self.parse_ms = parse_ms
+        self.build_ms = 0.0
+        self.execute_ms = 0.0
+        self.rows_returned = 0
+        self.stages = []
+        self.stack = []       # 正在取值的阶段，最后一个是当前阶段
+        self.frame_peak = 0   # 不在任何阶段中时的内存峰值
+        self.baseline = 0
+
+    def executed(self):
+        """实际执行过的阶段，按数据流顺序"""
+        return [stage for stage in self.stages if stage.started]
+
+    def stage(self, name, detail, rows):
+        """把 rows 包装为一个阶段"""
+        stage = Stage(self, len(self.stages), name, detail, rows)
+        self.stages.append(stage)
+        return stage
+
+    def advance(self, stage):
+        """从 stage 取下一行，统计耗时和内存
+
+        本次调用的全部耗时（包括统计本身）记入下游阶段的 child_seconds，
+        下游阶段的自身耗时因此不含剖析的开销。
+        """
+        entered = time.perf_counter()
+        stack = self.stack
+        parent = stack[-1] if stack else None
+        if parent is not None and stage not in parent.inputs:
+            parent.inputs.append(stage)
+        if self.memory:
+            self._enter_memory(parent or self, stage)
+        stack.append(stage)
+        stage.started = True
+        stage.child_seconds = 0.0
+        start = time.perf_counter()
+        try:
+            row = next(stage.iterator)
+        finally:
+            stage.seconds += time.perf_counter() - start - stage.child_seconds
+            stack.pop()
+            if self.memory:
+                self._exit_memory(parent or self, stage)
+            if parent is not None:
+                parent.child_seconds += time.perf_counter() - entered
+        stage.rows_out += 1
+        return row
+
+    # tracemalloc 只有一个全局峰值：进入阶段时把峰值记入外层再重置，退出时把本阶段的峰值
+    # 记入外层，从而得到每一层各自的峰值
+
+    @staticmethod
+    def _enter_memory(outer, stage):
+        current, peak = tracemalloc.get_traced_memory()
+        outer.frame_peak = max(outer.frame_peak, peak)
+        tracemalloc.reset_peak()
+        stage.entry_memory = current
+        stage.frame_peak = current
+
+    @staticmethod
+    def _exit_memory(outer, stage):
+        peak = max(stage.frame_peak, tracemalloc.get_traced_memory()[1])
+        stage.alloc_peak = max(stage.alloc_peak, peak - stage.entry_memory)
+        outer.frame_peak = max(outer.frame_peak, peak)
+        tracemalloc.reset_peak()
+
+    def run(self, build):
+        """在剖析中构建执行管道 build() 并读完全部结果
+
+        返回结果行列表；构建时出错返回错误信息。
+        """
+        started = self.memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        try:
+            if self.memory:
+                self.baseline = tracemalloc.get_traced_memory()[0]
+                self.frame_peak = self.baseline
+                tracemalloc.reset_peak()
+            with profiling(self):
+                start = time.perf_counter()
+                rows = build()
+                built = time.perf_counter()
+                if isinstance(rows, str):
+                    return rows
+                result = list(rows)
+                finished = time.perf_counter()
+            if self.memory:
+                self.frame_peak = max(self.frame_peak, tracemalloc.get_traced_memory()[1])
+        finally:
+            if started:
+                tracemalloc.stop()
+        self.build_ms = (built - start) * 1000
+        self.execute_ms = (finished - built) * 1000
+        self.rows_returned = len(result)
+        return result
+
+    def report(self):
+        """剖析结果的字典"""
+        result = {
+            'sql': self.sql,
+            'parse_ms': self.parse_ms,
+            'build_ms': self.build_ms,
+            'execute_ms': self.execute_ms,
+            'total_ms': self.parse_ms + self.build_ms + self.execute_ms,
+            'rows_returned': self.rows_returned,
+            'stages': [stage.summary() for stage in self.executed()],
+        }
+        if self.memory:
+            result['peak_alloc_bytes'] = self.frame_peak - self.baseline
+        return result
+
+    def lines(self):
+        """EXPLAIN ANALYZE 的文字描述：每个阶段一行，最后一行为合计"""
+        lines = [stage.line() for stage in self.executed()]
+        total = (f"合计：构建管道 {self.build_ms:.3f} ms（含选择执行计划），"
+                 f"执行 {self.execute_ms:.3f} ms，返回 {self.rows_returned} 行")
+        if self.memory:
+            total += f"，内存峰值 {self.frame_peak - self.baseline} 字节"
+        lines.append(total)
+        return lines
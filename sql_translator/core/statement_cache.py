@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+
+class StatementCache:
+    """已解析语句的LRU缓存
+
+    键为规范化后的SQL文本，值为 SQLParser.parse_sql 的结果。语法树是不可变的，
+    可以在多次执行之间安全共享。capacity 为0时不缓存。
+    多个线程可以同时使用同一个缓存。
+    """
+
+    def __init__(self, capacity=256):
+        if capacity < 0:
+            raise ValueError(f"缓存大小不能为负数: {capacity}")
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def normalize(sql):
+        """规范化SQL文本：去掉首尾空白和末尾的分号"""
+        return sql.strip().rstrip(';').rstrip()
+
+    def get(self, key):
+        """查找缓存，命中时把条目移到最近使用的位置"""
+        with self.lock:
+            parsed = self.entries.get(key)
+            if parsed is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return parsed
+
+    def put(self, key, parsed):
+        """加入缓存，超出容量时淘汰最久未使用的条目"""
+        with self.lock:
+            if self.capacity == 0:
+                return
+            self.entries[key] = parsed
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def resize(self, capacity):
+        """修改缓存容量"""
+        if capacity < 0:
+            raise ValueError(f"缓存大小不能为负数: {capacity}")
+        with self.lock:
+            self.capacity = capacity
+            while len(self.entries) > capacity:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """清空缓存和统计"""
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """返回命中/未命中/淘汰次数以及当前大小"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.entries),
+                'capacity': self.capacity,
+            }
@@ -0,0 +1,216 @@
+"""表的统计信息，由 ANALYZE 收集，供执行计划估计行数
+
+每列保存：
+
+    distinct   不同值个数的估计（HyperLogLog 草图，标准误差约 1.6%）
+    min / max  数值的最小值和最大值；列中没有数值时为字符串的最小值和最大值
+    histogram  数值的等高直方图：边界列表，相邻两个边界之间的行数大致相同
+
+值的比较规则与 WHERE 相同（见 index.index_key）：能转换为数字的按数值，否则按字符串。
+INSERT 时增量更新草图和 min/max；UPDATE/DELETE 无法从草图中去掉旧值，只记录修改的行数，
+直方图也只在 ANALYZE 时重建。修改较多之后应重新执行 ANALYZE。统计信息只保存在内存中。
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from math import log
+
+from sql_translator.core.index import index_key
+
+# HyperLogLog 寄存器个数为 2 ** HLL_PRECISION
+HLL_PRECISION = 12
+# 直方图的桶数
+HISTOGRAM_BUCKETS = 16
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix64(x):
+    """splitmix64 的混合函数：hash() 对小整数返回其本身，需要打散后再用于草图"""
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return x ^ (x >> 31)
+
+
+def _integer_key(key):
+    return int(key) if key.is_integer() else key
+
+
+def _same_key(key):
+    return key
+
+
+class HyperLogLog:
+    """估计不同值个数的草图，内存固定为 2 ** precision 字节"""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, key):
+        self.add_many((key,))
+
+    def add_many(self, keys):
+        registers = self.registers
+        shift = 64 - self.precision
+        low_mask = (1 << shift) - 1
+        for key in keys:
+            h = _mix64(hash(key) & _MASK64)
+            rank = shift - (h & low_mask).bit_length() + 1
+            slot = h >> shift
+            if rank > registers[slot]:
+                registers[slot] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        total = sum(2.0 ** -r for r in self.registers)
+        raw = alpha * m * m / total
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # 基数较小时使用线性计数
+            return round(m * log(m / zeros))
+        return round(raw)
+
+
+class ColumnStats:
+    """一列的统计信息"""
+
+    def __init__(self):
+        self.sketch = HyperLogLog()
+        self.count = 0            # 已加入的值的个数
+        self.numbers = 0          # 其中数值的个数
+        self.min = None           # 数值的最小值和最大值
+        self.max = None
+        self.text_min = None      # 非数值的最小值和最大值
+        self.text_max = None
+        self.histogram = []       # 数值的等高直方图边界，ANALYZE 时计算
+
+    @classmethod
+    def collect(cls, values):
+        """用一列的全部值计算统计信息（ANALYZE）"""
+        stats = cls()
+        keys = [key for key in map(index_key, values) if key is not None]
+        numbers = sorted(key for key in keys if type(key) is not str)
+        stats.add_keys(keys)
+        if numbers:
+            last = len(numbers) - 1
+            buckets = min(HISTOGRAM_BUCKETS, last) or 1
+            stats.histogram = [numbers[last * i // buckets] for i in range(buckets + 1)]
+        return stats
+
+    def add_values(self, values):
+        """加入新插入的值"""
+        self.add_keys([key for key in map(index_key, values) if key is not None])
+
+    def add_keys(self, keys):
+        if not keys:
+            return
+        self.sketch.add_many(keys)
+        self.count += len(keys)
+        numbers = [key for key in keys if type(key) is not str]
+        if numbers:
+            self.numbers += len(numbers)
+            low, high = min(numbers), max(numbers)
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        if len(numbers) < len(keys):
+            texts = [key for key in keys if type(key) is str]
+            low, high = min(texts), max(texts)
+            self.text_min = low if self.text_min is None else min(self.text_min, low)
+            self.text_max = high if self.text_max is None else max(self.text_max, high)
+
+    @property
+    def distinct(self):
+        """不同值个数的估计，不超过值的个数"""
+        return min(self.sketch.estimate(), self.count)
+
+    def fraction_below(self, number, inclusive=False):
+        """直方图估计的 "值 < number"（inclusive 时为 <=）的数值所占比例，没有直方图时返回None"""
+        bounds = self.histogram
+        if not bounds:
+            return None
+        i = (bisect_right if inclusive else bisect_left)(bounds, number)
+        buckets = len(bounds) - 1
+        if i == 0:
+            return 0.0
+        if i > buckets:
+            return 1.0
+        low, high = bounds[i - 1], bounds[i]
+        within = (number - low) / (high - low) if high > low else 1.0
+        return min(1.0, (i - 1 + within) / buckets)
+
+    def selectivity(self, op, value):
+        """条件 "列 op value" 的选择率，统计信息不足以估计时返回None"""
+        if not self.count:
+            return None
+        key = index_key(value)
+        if key is None:
+            return 0.0
+        if op in ('=', '!='):
+            if type(key) is not str and self.min is not None and not self.min <= key <= self.max:
+                equal = 0.0
+            else:
+                equal = 1 / max(self.distinct, 1)
+            return equal if op == '=' else 1 - equal
+        if type(key) is str:
+            return None
+        if op in ('<', '<='):
+            below = self.fraction_below(key, op == '<=')
+        else:
+            below = self.fraction_below(key, op == '>')
+            below = None if below is None else 1 - below
+        if below is None:
+            return None
+        return below * self.numbers / self.count
+
+    def to_dict(self, integer=False):
+        """统计信息的字典；integer 为真时（INT 列）数值按整数返回，而不是比较用的浮点数键"""
+        numeric = self.numbers > 0
+        convert = _integer_key if integer else _same_key
+        return {
+            'count': self.count,
+            'distinct': self.distinct,
+            'min': convert(self.min) if numeric else self.text_min,
+            'max': convert(self.max) if numeric else self.text_max,
+            'histogram': [convert(key) for key in self.histogram],
+        }
+
+
+class TableStats:
+    """一个表各列的统计信息"""
+
+    def __init__(self, columns, rows):
+        self.columns = columns        # 与表的列一一对应的 ColumnStats
+        self.analyzed_rows = rows     # ANALYZE 时的行数
+        self.modified_rows = 0        # 之后 UPDATE/DELETE 影响的行数
+
+    @classmethod
+    def collect(cls, table, column_count):
+        """扫描表的每一列计算统计信息（跳过已删除的行）"""
+        columns = []
+        for i in range(column_count):
+            values = table.column_values(i)
+            if table.live is not None:
+                values = list(compress(values, table.live))
+            columns.append(ColumnStats.collect(values))
+        return cls(columns, len(table))
+
+    def add_row(self, values):
+        for column, value in zip(self.columns, values):
+            column.add_values((value,))
+
+    def add_rows(self, rows):
+        for col_index, column in enumerate(self.columns):
+            column.add_values([values[col_index] for values in rows])
+
+    def set_value(self, col_index, value):
+        self.columns[col_index].add_values((value,))
+        self.modified_rows += 1
+
+    def add_column(self):
+        self.columns.append(ColumnStats())
+
+    def drop_column(self, col_index):
+        del self.columns[col_index]
@@ -0,0 +1,1030 @@
+import copy
+import sys
+import threading
+import weakref
+from array import array
+from itertools import accumulate, chain, compress, islice, repeat
+
+from sql_translator.core.index import TableIndex
+from sql_translator.core.statistics import TableStats
+
+# 多个查询可以同时读取一个表（见 locks.py），延迟构建索引时只能由一个线程构建；
+# 复制与快照共享的索引时也持有该锁，避免复制到构建了一半的索引
+_index_build_lock = threading.Lock()
+
+# 一次删除的行数超过该值时，各索引整体过滤一遍，而不是逐行删除
+BULK_INDEX_REMOVE = 64
+
+# 保护共享组（IndexedTable.sharers）和延迟快照的登记（IndexedTable.deferred）
+_share_lock = threading.Lock()
+
+
+def column_kind(type_str):
+    """根据列类型字符串判断存储类别: 'int'、'float' 或 'str'"""
+    type_upper = type_str.upper()
+    if 'INT' in type_upper:
+        return 'int'
+    if 'VARCHAR' in type_upper or 'CHAR' in type_upper:
+        return 'str'
+    if 'DECIMAL' in type_upper or 'FLOAT' in type_upper or 'DOUBLE' in type_upper:
+        return 'float'
+    return 'str'
+
+
+class IndexedTable:
+    """存储类的公共部分：维护表上的二级索引和修改日志
+
+    所有修改数据的方法都会同步更新索引，子类实现具体的存储和 _compress。
+    journal 不为None时，每次修改都以 (操作, 参数...) 的形式传给它，
+    持久化模式用它把修改写入预写日志；apply_journal 可以重放这些操作。
+    执行过 ANALYZE 的表在 stats 中保存统计信息，插入和修改时增量更新。
+
+    snapshot() 返回表的快照，与原表共享数据、索引和统计信息，任何一方修改时才复制被修改的
+    部分（写时复制），事务用它实现快照隔离（见 transaction.py）。version 在每次修改时加1。
+    共享数据的表用弱引用登记在同一个共享组（sharers）中：其他表都已释放时清除共享标记，
+    之后的修改不再复制。与快照共享的列（行式存储为行列表）修改时不复制，只在 SharedColumn
+    中记录修改，复制的代价与修改的行数成正比。defer_snapshot 登记的事务在本表第一次被修改
+    之前取快照（事务在此之前没有读取本表时，由修改方为它取快照）。
+
+    DELETE 只在 live 中把删除的行标记为墓碑（0），行号不变，扫描时跳过；已删除的行足够多时
+    由 compact 真正删除（见 compaction.py），之后的行号改变，epoch 加1。真正删除不改变表中的
+    数据，version 不变。行号在 [0, stored_rows()) 中，len() 为未删除的行数。
+    """
+
+    def __init__(self):
+        self.indexes = {}     # 索引名 -> TableIndex
+        self.journal = None   # 修改记录的回调
+        self.stats = None     # ANALYZE 收集的统计信息
+        self.version = 0      # 修改次数
+        self.epoch = 0        # 真正删除已删除的行（行号改变）的次数
+        self.shared_metadata = False  # indexes / stats / live 与快照共享
+        self.live = None      # 有已删除的行时为每行一个字节的 bytearray，0 表示已删除
+        self.dead_count = 0   # 已删除但仍占着行号的行数
+        self.sharers = None   # 共享数据的表（含本表）的 WeakSet，同一组的表使用同一个集合
+        self.deferred = None  # 延迟取快照的事务的 WeakSet，见 defer_snapshot
+
+    def snapshot(self):
+        """返回表的快照：此后对任何一方的修改都不会影响另一方"""
+        with _share_lock:
+            other = self._share()
+            other.indexes = dict(self.indexes)
+            other.stats = self.stats
+            other.version = self.version
+            other.epoch = self.epoch
+            other.live = self.live
+            other.dead_count = self.dead_count
+            self.shared_metadata = other.shared_metadata = True
+            if self.sharers is None:
+                self.sharers = weakref.WeakSet((self,))
+            self.sharers.add(other)
+            other.sharers = self.sharers
+        return other
+
+    def _still_shared(self):
+        """是否还有其他存活的表与本表共享数据；没有时清除所有共享标记"""
+        sharers = self.sharers
+        if sharers is None:
+            return False
+        with _share_lock:
+            if len(sharers) > 1:
+                return True
+            self.sharers = None
+        self._unshared()
+        return False
+
+    def _unshared(self):
+        """其他共享数据的表都已释放：数据、索引和统计信息都只属于本表"""
+        self.shared_metadata = False
+        for index in self.indexes.values():
+            index.shared_buckets = False
+            index.owned_keys = set()
+
+    def defer_snapshot(self, transaction):
+        """登记延迟的快照：本表第一次被修改之前调用 transaction.take_snapshot(本表)
+
+        只保存弱引用，事务结束后登记自动失效。
+        """
+        with _share_lock:
+            if self.deferred is None:
+                self.deferred = weakref.WeakSet()
+            self.deferred.add(transaction)
+
+    def cancel_snapshot(self, transaction):
+        """事务已经自己取了快照，取消登记"""
+        with _share_lock:
+            if self.deferred is not None:
+                self.deferred.discard(transaction)
+
+    def _before_write(self):
+        """修改数据（包括真正删除已删除的行、改变表结构）之前调用：先为登记的事务取快照"""
+        if not self.deferred:
+            return
+        with _share_lock:
+            waiting = list(self.deferred)
+            self.deferred = None
+        for transaction in waiting:
+            transaction.take_snapshot(self)
+
+    def _modified(self):
+        """修改数据、索引或统计信息之前调用：与快照共享的索引和统计信息先复制"""
+        self.version += 1
+        self._unshare()
+
+    def _unshare(self):
+        if self.shared_metadata and self._still_shared():
+            with _index_build_lock:
+                self.indexes = {name: index.copy() for name, index in self.indexes.items()}
+            self.stats = copy.deepcopy(self.stats)
+            if self.live is not None:
+                self.live = bytearray(self.live)
+            self.shared_metadata = False
+
+    def __len__(self):
+        return self.stored_rows() - self.dead_count
+
+    def __iter__(self):
+        return self.scan_range(0, self.stored_rows())
+
+    def scan_range(self, start, stop):
+        """逐行产出行号在 [start, stop) 中的未删除的行"""
+        rows = self._scan(start, stop)
+        if self.live is None:
+            return rows
+        return compress(rows, self.live[start:stop])
+
+    def row_ids(self, start=0, stop=None):
+        """行号在 [start, stop) 中的未删除的行的行号（升序），与 scan_range 产出的行一一对应"""
+        if stop is None:
+            stop = self.stored_rows()
+        if self.live is None:
+            return range(start, stop)
+        return list(compress(range(start, stop), self.live[start:stop]))
+
+    def copy(self):
+        """返回所有行组成的新列表"""
+        return list(self)
+
+    def needs_compaction(self, dead_fraction=0.0):
+        """是否需要整理（见 compaction.py）：已删除的行占 dead_fraction 以上，或者有
+        ALTER TABLE 留下的旧布局数据"""
+        return bool(self.dead_count) and self.dead_count >= dead_fraction * self.stored_rows()
+
+    def compact(self, limit=None, dead_fraction=0.0):
+        """整理表，返回是否还有需要整理的数据
+
+        已删除的行占 dead_fraction 以上时一次真正删除；然后整理 ALTER TABLE 留下的旧布局
+        数据，最多处理 limit 行（只有行式存储需要，见 RowTable.add_column）。
+        """
+        if self.dead_count and self.dead_count >= dead_fraction * self.stored_rows():
+            self.purge_deleted()
+            if self.journal is not None:
+                # 日志中之后的记录使用整理后的行号（此前开始的事务提交时换算，见 Transaction.journal_ops）
+                self.journal(('compact',))
+        return self._compact_layouts(limit)
+
+    def _compact_layouts(self, limit):
+        return False
+
+    def purge_deleted(self):
+        """真正删除已标记删除的行，之后的行号改变，索引同步更新；返回删除的行数
+
+        表中的数据没有变化，version 不变，epoch 加1。
+        """
+        live = self.live
+        if live is None:
+            return 0
+        self._before_write()
+        self._unshare()
+        live = self.live
+        removed = self.dead_count
+        self._compress(live)
+        self.live = None
+        self.dead_count = 0
+        self.epoch += 1
+        if self.indexes:
+            mapping = []
+            new_row = 0
+            for kept in live:
+                if kept:
+                    mapping.append(new_row)
+                    new_row += 1
+                else:
+                    mapping.append(-1)
+            for index in self.indexes.values():
+                index.remap(mapping)
+        return removed
+
+    def analyze(self, column_count):
+        """扫描所有列重新收集统计信息"""
+        self.stats = TableStats.collect(self, column_count)
+        return self.stats
+
+    def create_index(self, name, column, col_index):
+        """在指定列上创建索引并用现有数据构建"""
+        self._before_write()
+        self._modified()
+        index = TableIndex(name, column, col_index)
+        index.load(self.column_values(col_index), self.live)
+        self.indexes[name] = index
+        return index
+
+    def restore_index(self, name, column, col_index):
+        """登记一个已有的索引，第一次使用时才根据数据构建"""
+        self._before_write()
+        self._modified()
+        self.indexes[name] = TableIndex(name, column, col_index)
+
+    def active_indexes(self):
+        """返回所有索引，尚未构建的先构建"""
+        for index in self.indexes.values():
+            if not index.built:
+                with _index_build_lock:
+                    if not index.built:
+                        index.load(self.column_values(index.col_index), self.live)
+        return self.indexes.values()
+
+    def drop_index(self, name):
+        """删除索引"""
+        self._before_write()
+        self._modified()
+        del self.indexes[name]
+
+    def apply_journal(self, op):
+        """重放一条修改记录"""
+        name, *args = op
+        if name == 'append':
+            self.append(*args)
+        elif name == 'extend':
+            self.extend(*args)
+        elif name == 'set':
+            self.set_value(*args)
+        elif name == 'delete':
+            self.delete_rows(*args)
+        elif name == 'clear':
+            self.clear()
+        elif name == 'compact':
+            self.purge_deleted()
+        else:
+            raise ValueError(f"未知的修改记录: {name}")
+
+    def _after_append(self, values):
+        self._modified()
+        row = self.stored_rows() - 1
+        if self.live is not None:
+            self.live.append(1)
+        for index in self.indexes.values():
+            index.add(row, values[index.col_index])
+        if self.stats is not None:
+            self.stats.add_row(values)
+        if self.journal is not None:
+            self.journal(('append', values))
+
+    def _after_extend(self, start, rows):
+        self._modified()
+        if self.live is not None:
+            self.live.extend(bytes([1]) * len(rows))
+        for index in self.indexes.values():
+            col_index = index.col_index
+            index.add_many(start, [values[col_index] for values in rows])
+        if self.stats is not None:
+            self.stats.add_rows(rows)
+        if self.journal is not None:
+            self.journal(('extend', rows))
+
+    def _before_set(self, row_index, col_index, old_value, value):
+        self._modified()
+        for index in self.indexes.values():
+            if index.col_index == col_index:
+                index.remove(row_index, old_value)
+                index.add(row_index, value)
+        if self.stats is not None:
+            self.stats.set_value(col_index, value)
+        if self.journal is not None:
+            self.journal(('set', row_index, col_index, value))
+
+    def _after_clear(self):
+        self._modified()
+        self.live = None
+        self.dead_count = 0
+        for index in self.indexes.values():
+            index.clear()
+        if self.stats is not None:
+            self.stats = TableStats.collect(self, len(self.stats.columns))
+        if self.journal is not None:
+            self.journal(('clear',))
+
+    def _index_drop_column(self, col_index):
+        self._modified()
+        if self.stats is not None:
+            self.stats.drop_column(col_index)
+        for name, index in list(self.indexes.items()):
+            if index.col_index == col_index:
+                del self.indexes[name]
+            elif index.col_index > col_index:
+                index.col_index -= 1
+
+    def retain(self, keep):
+        """只保留 keep(row) 为真的行，返回删除的行数"""
+        return self.delete_rows([i for i, row in zip(self.row_ids(), self) if not keep(row)])
+
+    def delete_rows(self, row_indices):
+        """删除指定行号的行（未删除的行，不重复），返回删除的行数
+
+        只标记墓碑，其他行的行号不变，不复制表中的数据；索引中删除这些行。
+        """
+        row_indices = list(row_indices)
+        if not row_indices:
+            return 0
+        self._before_write()
+        self._modified()
+        if self.live is None:
+            self.live = bytearray([1]) * self.stored_rows()
+        live = self.live
+        for i in row_indices:
+            live[i] = 0
+        self.dead_count += len(row_indices)
+        if self.indexes:
+            deleted = [self[i] for i in row_indices]
+            for index in self.indexes.values():
+                values = [row[index.col_index] for row in deleted]
+                if len(row_indices) > BULK_INDEX_REMOVE:
+                    index.remove_rows(row_indices, values)
+                else:
+                    for i, value in zip(row_indices, values):
+                        index.remove(i, value)
+        if self.stats is not None:
+            self.stats.modified_rows += len(row_indices)
+        if self.journal is not None:
+            self.journal(('delete', row_indices))
+        return len(row_indices)
+
+
+class SharedColumn:
+    """与快照共享的列（行式存储为行列表）上的私有修改
+
+    前 base 个元素读取与快照共享的 shared（不修改），修改过的值保存在 values 中，之后追加的
+    元素保存在 tail（shared 是类型化数组时为同类型的数组，有无法放入的值时为列表）中。
+    与快照共享的列第一次被修改时换成 SharedColumn，不复制已有的数据；其他表都已释放之后，
+    release 把修改就地写回 shared 并换回普通的列。私有的修改较多时（见 grown）复制为普通的列，
+    读取的代价不会一直高于普通的列。需要连续内存的读取（向量化执行）使用 flat。
+    """
+
+    __slots__ = ('shared', 'base', 'values', 'tail', 'merged')
+
+    def __init__(self, shared, base=None, values=None, tail=None):
+        self.merged = None
+        self.shared = shared
+        self.base = len(shared) if base is None else base
+        self.values = values if values is not None else {}   # 行号 -> 值，行号小于 base
+        if tail is None:
+            tail = array(shared.typecode) if isinstance(shared, array) else []
+        self.tail = tail
+
+    def __len__(self):
+        return self.base + len(self.tail)
+
+    def _head(self, start, stop):
+        head = islice(self.shared, stop) if not start else self.shared[start:stop]
+        if not self.values:
+            return head
+        return map(self.values.get, range(start, stop), head)
+
+    def __getitem__(self, index):
+        base = self.base
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            head = list(self._head(min(start, base), min(stop, base)))
+            if stop > base:
+                head.extend(self.tail[max(start - base, 0):stop - base])
+            return head
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('列下标越界')
+        if index < base:
+            values = self.values
+            return values[index] if index in values else self.shared[index]
+        return self.tail[index - base]
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('列下标越界')
+        self.merged = None
+        if index < self.base:
+            self.values[index] = value
+            return
+        try:
+            self.tail[index - self.base] = value
+        except (TypeError, OverflowError):
+            self.tail = list(self.tail)
+            self.tail[index - self.base] = value
+
+    def __iter__(self):
+        return chain(self._head(0, self.base), self.tail)
+
+    def append(self, value):
+        self.merged = None
+        try:
+            self.tail.append(value)
+        except (TypeError, OverflowError):
+            self.tail = list(self.tail)
+            self.tail.append(value)
+
+    def extend(self, values):
+        self.merged = None
+        if isinstance(self.tail, array):
+            try:
+                values = array(self.tail.typecode, values)
+            except (TypeError, OverflowError):
+                self.tail = list(self.tail)
+        self.tail.extend(values)
+
+    def flat(self):
+        """合并为普通的列，缓存到下一次修改"""
+        merged = self.merged
+        if merged is None:
+            merged = self.merged = self.materialize()
+        return merged
+
+    def copy(self):
+        """复制私有的修改，shared 仍然共享"""
+        return SharedColumn(self.shared, self.base, dict(self.values), self.tail[:])
+
+    def grown(self):
+        """私有的修改是否已经较多：超过 base 的 1/8 时复制为普通的列，复制的代价分摊到这些修改上"""
+        return len(self.values) + len(self.tail) > (self.base >> 3) + 1024
+
+    def materialize(self):
+        """复制为普通的列：shared 是类型化数组时为同类型的数组（有无法放入的值时为列表）"""
+        values = list(self)
+        if isinstance(self.shared, array):
+            try:
+                return array(self.shared.typecode, values)
+            except (TypeError, OverflowError):
+                pass
+        return values
+
+    def release(self):
+        """没有其他表共享 shared 时调用：把修改就地写回 shared，返回普通的列"""
+        column = self.shared
+        try:
+            del column[self.base:]
+            for index, value in self.values.items():
+                column[index] = value
+            column.extend(self.tail)
+        except (TypeError, OverflowError, BufferError):
+            # 值无法放入类型化数组，或者数组正被 NumPy 映射；已写回的值与 values 相同
+            return self.materialize()
+        return column
+
+
+class RowTable(IndexedTable):
+    """行式存储：每行是一个字符串列表（默认存储方式）
+
+    ALTER TABLE ADD/DROP 不改写已有的行，只记录旧布局到当前布局的转换（layouts，按行的
+    长度区分），读取旧布局的行时转换，之后由 compact 分批改写（执行器在后台线程中调用）。
+    """
+
+    def __init__(self, rows=None):
+        super().__init__()
+        self.rows = rows if rows is not None else []
+        self.shared_list = False   # rows 列表与快照共享
+        self.shared_rows = False   # 各行的列表可能与快照共享
+        # 旧布局的行长度 -> (保留的列下标，None表示全部保留; 末尾补上的默认值列表)
+        self.layouts = {}
+        self.width = None          # 有旧布局时当前布局的行长度
+        self.pad = 0               # 当前布局的行末尾的占位个数，见 _change_layout
+        self.compact_pos = 0       # compact 下次开始的行号
+
+    def _share(self):
+        self.shared_list = self.shared_rows = True
+        other = RowTable(self.rows)
+        other.shared_list = other.shared_rows = True
+        other.layouts = self.layouts
+        other.width = self.width
+        other.pad = self.pad
+        other.compact_pos = self.compact_pos
+        return other
+
+    def _unshared(self):
+        super()._unshared()
+        self.shared_list = self.shared_rows = False
+
+    def _current(self, row):
+        """返回当前布局（不含占位）的行，旧布局的行转换为新的列表"""
+        if len(row) == self.width:
+            return row[:-self.pad] if self.pad else row
+        kept, tail = self.layouts[len(row)]
+        if kept is None:
+            return row + tail
+        return [row[i] for i in kept] + tail
+
+    def _stored(self, row):
+        """返回按当前布局存储的行：旧布局的行转换为新的列表并补上占位"""
+        if len(row) == self.width:
+            return row
+        row = self._current(row)
+        if self.pad:
+            row.extend([None] * self.pad)
+        return row
+
+    def _change_layout(self, drop=None, default=None):
+        """ALTER TABLE：在末尾添加一列（drop 为None，默认值为 default）或删除第 drop 列
+
+        只更新 layouts，已有的行在读取时转换。行按长度区分布局，新的列数与某个旧布局的
+        行长度相同时，当前布局的行在末尾补上占位（pad），compact 改写完旧布局的行后再去掉。
+        """
+        if not self.rows:
+            self.layouts = {}
+            self.width = None
+            self.pad = 0
+            return
+        if self.layouts:
+            width = self.width
+            current = (list(range(width - self.pad)) if self.pad else None, [])
+        else:
+            width = len(self.rows[0])
+            current = (None, [])
+        columns = width - self.pad + (1 if drop is None else -1)
+        layouts = {}
+        # 当前布局本身成为旧布局
+        for old_width, (kept, tail) in [*self.layouts.items(), (width, current)]:
+            if drop is None:
+                tail = tail + [default]
+            elif kept is None and drop >= old_width:
+                tail = tail[:drop - old_width] + tail[drop - old_width + 1:]
+            elif kept is None or drop < len(kept):
+                kept = list(range(old_width)) if kept is None else kept
+                kept = kept[:drop] + kept[drop + 1:]
+            else:
+                position = drop - len(kept)
+                tail = tail[:position] + tail[position + 1:]
+            layouts[old_width] = (kept, tail)
+        new_width = columns
+        while new_width in layouts:
+            new_width += 1
+        self.layouts = layouts
+        self.width = new_width
+        self.pad = new_width - columns
+        self.compact_pos = 0
+
+    def needs_compaction(self, dead_fraction=0.0):
+        return bool(self.layouts) or super().needs_compaction(dead_fraction)
+
+    def _compact_layouts(self, limit):
+        """把旧布局的行改写为当前布局，最多检查 limit 行；返回是否还有需要整理的行"""
+        if not self.layouts:
+            return False
+        self._before_write()
+        rows = self._writable_rows()
+        start = self.compact_pos
+        end = len(rows) if limit is None else min(len(rows), start + limit)
+        width = self.width
+        stored = self._stored
+        for i in range(start, end):
+            if len(rows[i]) != width:
+                rows[i] = stored(rows[i])
+        if end < len(rows):
+            self.compact_pos = end
+            return True
+        self.compact_pos = 0
+        if self.pad:
+            # 所有行都已是当前布局，再整理一遍去掉占位
+            columns = width - self.pad
+            self.layouts = {width: (list(range(columns)), [])}
+            self.width = columns
+            self.pad = 0
+            return True
+        self.layouts = {}
+        self.width = None
+        return False
+
+    def _writable_rows(self):
+        """返回可以修改的 rows：与快照共享时换成 SharedColumn，不复制行的引用
+
+        快照都已释放后，下一次修改把 SharedColumn 的修改写回原来的列表。
+        """
+        rows = self.rows
+        shared = self.shared_list and self._still_shared()
+        if isinstance(rows, SharedColumn):
+            if shared:
+                rows = self.rows = rows.copy()
+            elif not self._still_shared():
+                rows = self.rows = rows.release()
+            elif rows.grown():
+                rows = self.rows = rows.materialize()
+        elif shared:
+            rows = self.rows = SharedColumn(rows)
+        self.shared_list = False
+        return rows
+
+    def _scan(self, start, stop):
+        """逐行产出行号在 [start, stop) 中的行（包括已删除的行）"""
+        rows = self.rows
+        if start or stop < len(rows):
+            rows = rows[start:stop]
+        if self.layouts:
+            return map(self._current, rows)
+        return iter(rows)
+
+    def stored_rows(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if self.layouts:
+            return self._current(self.rows[index])
+        return self.rows[index]
+
+    def append(self, values):
+        """追加一行"""
+        self._before_write()
+        self._writable_rows().append(values + [None] * self.pad if self.pad else values)
+        self._after_append(values)
+
+    def extend(self, rows):
+        """批量追加多行"""
+        self._before_write()
+        start = len(self.rows)
+        if self.pad:
+            padding = [None] * self.pad
+            self._writable_rows().extend(values + padding for values in rows)
+        else:
+            self._writable_rows().extend(rows)
+        self._after_extend(start, rows)
+
+    def copy(self):
+        """返回所有行组成的新列表"""
+        if self.layouts or self.live is not None:
+            return list(self)
+        return self.rows[:]
+
+    def clear(self):
+        """清空所有行"""
+        self._before_write()
+        self.rows = []
+        self.shared_list = self.shared_rows = False
+        self.layouts = {}
+        self.width = None
+        self.pad = 0
+        self.compact_pos = 0
+        self._after_clear()
+
+    def column_values(self, col_index):
+        """按行号返回一列的所有值（包括已删除的行）"""
+        return [row[col_index] for row in self._scan(0, len(self.rows))]
+
+    def set_value(self, row_index, col_index, value):
+        """修改指定单元格的值"""
+        self._before_write()
+        rows = self._writable_rows()
+        row = rows[row_index]
+        if self.layouts and len(row) != self.width:
+            # 旧布局的行先转换（得到新的列表）
+            row = rows[row_index] = self._stored(row)
+            self._before_set(row_index, col_index, row[col_index], value)
+        else:
+            self._before_set(row_index, col_index, row[col_index], value)
+            if self.shared_rows and self._still_shared():
+                # 该行可能属于快照，换成新的列表再修改
+                row = rows[row_index] = row.copy()
+        row[col_index] = value
+
+    def _compress(self, mask):
+        self.rows = list(compress(self.rows, mask))
+        self.shared_list = False
+        # 行号改变了，compact 从头开始
+        self.compact_pos = 0
+
+    def add_column(self, col_type, default=''):
+        """在末尾添加一列，现有行使用默认值；不改写已有的行，见 _change_layout"""
+        self._before_write()
+        self._change_layout(default=default)
+        self._modified()
+        if self.stats is not None:
+            self.stats.add_column()
+
+    def drop_column(self, col_index):
+        """删除指定列，该列上的索引一并删除；不改写已有的行，见 _change_layout"""
+        self._before_write()
+        self._change_layout(drop=col_index)
+        self._index_drop_column(col_index)
+
+
+class DefaultColumn:
+    """ALTER TABLE ADD 添加的列：添加时已有的 base 行没有修改过的都是同一个默认值
+
+    修改过的值保存在 values 中，之后追加的行保存在 tail（类型化数组，有无法放入数组的值时
+    为列表）中，写入一个值的代价与表的大小无关。base 行全部修改过之后，ColumnarTable 在
+    修改之后把它转换为普通的列（见 ColumnarTable._store）。
+    """
+
+    __slots__ = ('default', 'base', 'values', 'tail')
+
+    def __init__(self, default, base, typecode=None, values=None, tail=None):
+        self.default = default
+        self.base = base
+        self.values = values if values is not None else {}   # 行号 -> 值，行号小于 base
+        if tail is None:
+            tail = array(typecode) if typecode else []
+        self.tail = tail
+
+    def __len__(self):
+        return self.base + len(self.tail)
+
+    def _head(self, start, stop):
+        if not self.values:
+            return repeat(self.default, stop - start)
+        return map(self.values.get, range(start, stop), repeat(self.default))
+
+    def __getitem__(self, index):
+        base = self.base
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            stop = max(start, stop)
+            head = list(self._head(min(start, base), min(stop, base)))
+            if stop > base:
+                head.extend(self.tail[max(start - base, 0):stop - base])
+            return head
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('列下标越界')
+        if index < base:
+            return self.values.get(index, self.default)
+        return self.tail[index - base]
+
+    def __setitem__(self, index, value):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('列下标越界')
+        if index < self.base:
+            self.values[index] = value
+            return
+        try:
+            self.tail[index - self.base] = value
+        except (TypeError, OverflowError):
+            self.tail = list(self.tail)
+            self.tail[index - self.base] = value
+
+    def __iter__(self):
+        return chain(self._head(0, self.base), self.tail)
+
+    def append(self, value):
+        try:
+            self.tail.append(value)
+        except (TypeError, OverflowError):
+            self.tail = list(self.tail)
+            self.tail.append(value)
+
+    def extend(self, values):
+        if isinstance(self.tail, array):
+            try:
+                values = array(self.tail.typecode, values)
+            except (TypeError, OverflowError):
+                self.tail = list(self.tail)
+        self.tail.extend(values)
+
+    def copy(self):
+        return DefaultColumn(self.default, self.base, values=dict(self.values), tail=self.tail[:])
+
+    def covered(self):
+        """添加列时已有的行是否都已修改过"""
+        return len(self.values) >= self.base
+
+    def compress(self, mask):
+        """只保留 mask 中为真的行"""
+        base = self.base
+        before = list(accumulate(mask[:base], initial=0))   # 每行之前保留的行数
+        values = {before[row]: value for row, value in self.values.items() if mask[row]}
+        tail = compress(self.tail, mask[base:])
+        tail = array(self.tail.typecode, tail) if isinstance(self.tail, array) else list(tail)
+        return DefaultColumn(self.default, before[-1], values=values, tail=tail)
+
+    def materialize(self):
+        """转换为普通的列：与 tail 相同的类型化数组（有无法放入的值时为列表）"""
+        values = list(self)
+        if isinstance(self.tail, array) and self.covered():
+            try:
+                return array(self.tail.typecode, values)
+            except (TypeError, OverflowError):
+                pass
+        return values
+
+
+class ColumnarTable(IndexedTable):
+    """列式存储：每列一个类型化数组
+
+    INT列使用 array('q')，DECIMAL/FLOAT/DOUBLE列使用 array('d')，
+    字符串列使用驻留(intern)后的字符串列表。值在写入时只转换一次。
+    某列出现无法放入类型化数组的值（例如 ALTER TABLE ADD 产生的空字符串）时，
+    该列退化为普通列表，不影响其他列。快照与原表共享各列，修改与快照共享的列时换成
+    SharedColumn，只记录修改，不复制已有的数据。
+    ALTER TABLE ADD 添加的列是 DefaultColumn，ADD/DROP 和之后修改该列都不需要复制已有的数据。
+    """
+
+    TYPECODES = {'int': 'q', 'float': 'd'}
+
+    def __init__(self, col_types):
+        super().__init__()
+        self.kinds = [column_kind(t) for t in col_types]
+        self.columns = [self._new_column(kind) for kind in self.kinds]
+        self.shared_columns = [False] * len(self.columns)   # 各列是否与快照共享
+        self.length = 0
+
+    def _share(self):
+        other = ColumnarTable([])
+        other.kinds = self.kinds.copy()
+        other.columns = self.columns.copy()
+        other.length = self.length
+        self.shared_columns = [True] * len(self.columns)
+        other.shared_columns = [True] * len(self.columns)
+        return other
+
+    def _unshared(self):
+        super()._unshared()
+        self.shared_columns = [False] * len(self.columns)
+
+    def _new_column(self, kind):
+        typecode = self.TYPECODES.get(kind)
+        return array(typecode) if typecode else []
+
+    def _convert(self, kind, value):
+        """把插入的字符串转换为列的存储类型，失败时返回原值"""
+        if not isinstance(value, str):
+            return value
+        try:
+            if kind == 'int':
+                return int(value)
+            if kind == 'float':
+                return float(value)
+        except ValueError:
+            return value
+        return sys.intern(value)
+
+    def _writable(self, col_index):
+        """返回可以修改的列；内存映射的只读列在第一次修改时复制
+
+        与快照共享的列换成 SharedColumn；DefaultColumn 和 SharedColumn 与快照共享时只复制
+        修改过的值和追加的行。快照都已释放后，下一次修改把 SharedColumn 换回普通的列。
+        """
+        column = self.columns[col_index]
+        shared = self.shared_columns[col_index] and self._still_shared()
+        if isinstance(column, memoryview):
+            column = self.columns[col_index] = array(column.format, column.tobytes())
+        elif isinstance(column, DefaultColumn):
+            if shared:
+                column = self.columns[col_index] = column.copy()
+        elif isinstance(column, SharedColumn):
+            if shared:
+                column = self.columns[col_index] = column.copy()
+            elif not self._still_shared():
+                column = self.columns[col_index] = column.release()
+            elif column.grown():
+                column = self.columns[col_index] = column.materialize()
+        elif not isinstance(column, (array, list)):
+            column = self.columns[col_index] = column.materialize()
+        elif shared:
+            column = self.columns[col_index] = SharedColumn(column)
+        self.shared_columns[col_index] = False
+        return column
+
+    def _store(self, col_index, value, row_index=None):
+        """写入一个值；row_index为None时追加"""
+        column = self._writable(col_index)
+        value = self._convert(self.kinds[col_index], value)
+        try:
+            if row_index is None:
+                column.append(value)
+            else:
+                column[row_index] = value
+                if isinstance(column, DefaultColumn) and column.covered():
+                    # 添加列时已有的行都已修改过，转换为普通的列
+                    self.columns[col_index] = column.materialize()
+        except (TypeError, OverflowError):
+            # 值无法放入类型化数组，退化为普通列表
+            column = self.columns[col_index] = list(column)
+            if row_index is None:
+                column.append(value)
+            else:
+                column[row_index] = value
+
+    def _scan(self, start, stop):
+        """逐行产出行号在 [start, stop) 中的行（包括已删除的行）"""
+        if not start and stop >= self.length:
+            return map(list, zip(*self.columns))
+        return map(list, zip(*[column[start:stop] for column in self.columns]))
+
+    def stored_rows(self):
+        return self.length
+
+    def __getitem__(self, index):
+        return [column[index] for column in self.columns]
+
+    def append(self, values):
+        """追加一行"""
+        self._before_write()
+        for col_index, value in enumerate(values):
+            self._store(col_index, value)
+        self.length += 1
+        self._after_append(values)
+
+    def extend(self, rows):
+        """批量追加多行，按列转换后整列追加"""
+        if not rows:
+            return
+        self._before_write()
+        for col_index, values in enumerate(zip(*rows)):
+            kind = self.kinds[col_index]
+            convert = self._convert
+            converted = [convert(kind, value) for value in values]
+            column = self._writable(col_index)
+            if isinstance(column, array):
+                try:
+                    # 先整体构造数组再追加，失败时原数组保持不变
+                    converted = array(column.typecode, converted)
+                except (TypeError, OverflowError):
+                    # 有值无法放入类型化数组，退化为普通列表
+                    column = self.columns[col_index] = list(column)
+            column.extend(converted)
+        start = self.length
+        self.length += len(rows)
+        self._after_extend(start, rows)
+
+    def clear(self):
+        """清空所有行"""
+        self._before_write()
+        self.columns = [self._new_column(kind) for kind in self.kinds]
+        self.shared_columns = [False] * len(self.columns)
+        self.length = 0
+        self._after_clear()
+
+    def column_values(self, col_index):
+        """按行号返回一列的所有值（包括已删除的行）"""
+        return self.columns[col_index]
+
+    def set_value(self, row_index, col_index, value):
+        """修改指定单元格的值"""
+        self._before_write()
+        self._before_set(row_index, col_index, self.columns[col_index][row_index], value)
+        self._store(col_index, value, row_index)
+
+    def _compress(self, mask):
+        new_columns = []
+        length = sum(mask)
+        for column in self.columns:
+            if isinstance(column, SharedColumn):
+                column = column.materialize()
+            if isinstance(column, DefaultColumn):
+                column = column.compress(mask)
+                new_columns.append(column.materialize() if column.covered() else column)
+                continue
+            kept = compress(column, mask)
+            if isinstance(column, (array, memoryview)):
+                typecode = column.typecode if isinstance(column, array) else column.format
+                new_columns.append(array(typecode, kept))
+            else:
+                new_columns.append(list(kept))
+        self.columns = new_columns
+        self.shared_columns = [False] * len(new_columns)
+        self.length = length
+
+    def add_column(self, col_type, default=''):
+        """在末尾添加一列，现有行使用默认值（DefaultColumn，不复制数据）"""
+        self._before_write()
+        kind = column_kind(col_type)
+        column = self._new_column(kind)
+        if self.length:
+            column = DefaultColumn(default, self.length, self.TYPECODES.get(kind))
+        self.kinds.append(kind)
+        self.columns.append(column)
+        self.shared_columns.append(False)
+        self._modified()
+        if self.stats is not None:
+            self.stats.add_column()
+
+    def drop_column(self, col_index):
+        """删除指定列，该列上的索引一并删除"""
+        self._before_write()
+        del self.kinds[col_index]
+        del self.columns[col_index]
+        del self.shared_columns[col_index]
+        self._index_drop_column(col_index)
+
+
+STORAGE_TYPES = {
+    'row': lambda col_types: RowTable(),
+    'columnar': ColumnarTable,
+}
+
+
+def create_table_storage(col_types, storage='row'):
+    """根据存储方式为新表创建数据容器"""
+    return STORAGE_TYPES[storage](col_types)
@@ -0,0 +1,102 @@
+import re
+from dataclasses import dataclass
+
+
+class SQLSyntaxError(Exception):
+    """SQL语法错误"""
+
+
+@dataclass(slots=True)
+class Token:
+    """词法单元
+
+    kind 取值: NAME（标识符或关键字）、NUMBER、STRING、OP（比较运算符）、
+    PUNCT（括号、逗号、点、星号、分号、负号）、PARAM（? 或 :名称 形式的参数）、EOF。
+    start/end 为在原SQL中的位置。
+    """
+    kind: str
+    value: str
+    start: int
+    end: int
+
+    @property
+    def upper(self):
+        return self.value.upper()
+
+
+# 所有词法规则合并为一个正则，按顺序匹配，整个语句只扫描一遍
+_TOKEN_RE = re.compile(r'''
+      (?P<SPACE>\s+)
+    | (?P<LINE_COMMENT>--[^\n]*)
+    | (?P<BLOCK_COMMENT>/\*.*?(?:\*/|\Z))
+    | (?P<STRING>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    | (?P<NUMBER>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+    | (?P<QUOTED_NAME>`[^`]*`)
+    | (?P<NAME>[^\W\d]\w*)
+    | (?P<PARAM>\?|:[^\W\d]\w*)
+    | (?P<OP><=|>=|!=|<>|=|<|>)
+    | (?P<PUNCT>[(),.*;-])
+''', re.VERBOSE | re.DOTALL)
+
+_SKIP = {'SPACE', 'LINE_COMMENT', 'BLOCK_COMMENT'}
+
+
+def _unquote(text):
+    """去掉字符串两侧的引号并处理转义（\\' 与 '' 两种写法）"""
+    quote = text[0]
+    body = text[1:-1]
+    if '\\' in body:
+        body = re.sub(r'\\(.)', r'\1', body)
+    return body.replace(quote * 2, quote)
+
+
+def tokenize(sql):
+    """把SQL文本切分为词法单元列表，注释和空白被跳过，末尾附加EOF"""
+    tokens = []
+    pos = 0
+    length = len(sql)
+    match = _TOKEN_RE.match
+    while pos < length:
+        m = match(sql, pos)
+        if m is None:
+            if sql[pos] in "'\"":
+                raise SQLSyntaxError(f"位置 {pos} 处的字符串没有结束")
+            raise SQLSyntaxError(f"位置 {pos} 处有无法识别的字符 {sql[pos]!r}")
+        kind = m.lastgroup
+        end = m.end()
+        if kind not in _SKIP:
+            text = m.group()
+            if kind == 'STRING':
+                text = _unquote(text)
+            elif kind == 'QUOTED_NAME':
+                kind = 'NAME'
+                text = text[1:-1]
+            elif kind == 'OP' and text == '<>':
+                text = '!='
+            tokens.append(Token(kind, text, pos, end))
+        pos = end
+    tokens.append(Token('EOF', '', length, length))
+    return tokens
+
+
+def strip_comments(sql):
+    """把SQL文本中的注释替换为一个空格，字符串中的 -- 和 /* 不受影响
+
+    使用与 tokenize 相同的词法规则；无法识别的字符原样保留，不报错。
+    """
+    parts = []
+    pos = 0
+    length = len(sql)
+    match = _TOKEN_RE.match
+    while pos < length:
+        m = match(sql, pos)
+        if m is None:
+            parts.append(sql[pos])
+            pos += 1
+            continue
+        if m.lastgroup in ('LINE_COMMENT', 'BLOCK_COMMENT'):
+            parts.append(' ')
+        else:
+            parts.append(m.group())
+        pos = m.end()
+    return ''.join(parts)
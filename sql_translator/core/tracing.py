@@ -0,0 +1,79 @@
+"""语句跟踪：SQLExecutor(tracer=回调) 开启后，每条语句执行结束时调用 tracer(event)
+
+event 为字典：
+
+    type           语句类型（'SELECT'、'INSERT' 等；语法错误为 'ERROR'，无法识别的语句为 'UNKNOWN'）
+    sql            语句文本
+    parse_ms       解析耗时（命中语句缓存时接近0，预编译语句为0）
+    plan_ms        选择执行计划的耗时（SELECT / EXPLAIN）
+    execute_ms     执行耗时，不含解析和选择执行计划
+    rows_scanned   从表中读取的行数（使用索引时为索引找到的行数）
+    rows_returned  查询返回的行数，其他语句为0
+
+回调在执行语句的线程中同步调用，耗时计入语句的延迟；写日志、上报等较慢的处理应放入队列
+另行完成。没有设置 tracer 时不创建跟踪对象，各操作只检查一次当前线程是否在跟踪中。
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def current_trace():
+    """当前线程正在跟踪的语句，没有开启跟踪时为None"""
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def tracing(trace):
+    """在当前线程中把 trace 设为正在跟踪的语句"""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+class StatementTrace:
+    """一条语句的跟踪数据，执行期间由各操作累加"""
+
+    __slots__ = ('type', 'sql', 'parse_ms', 'plan_ms', 'execute_ms',
+                 'rows_scanned', 'rows_returned')
+
+    def __init__(self, statement_type, sql, parse_ms=0.0):
+        self.type = statement_type
+        self.sql = sql
+        self.parse_ms = parse_ms
+        self.plan_ms = 0.0
+        self.execute_ms = 0.0
+        self.rows_scanned = 0
+        self.rows_returned = 0
+
+    def scanned(self, rows):
+        """逐行产出 rows，同时计入读取的行数"""
+        for row in rows:
+            self.rows_scanned += 1
+            yield row
+
+    @contextmanager
+    def planning(self):
+        """计时选择执行计划的部分"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.plan_ms += (time.perf_counter() - start) * 1000
+
+    def event(self):
+        return {
+            'type': self.type,
+            'sql': self.sql,
+            'parse_ms': self.parse_ms,
+            'plan_ms': self.plan_ms,
+            'execute_ms': self.execute_ms,
+            'rows_scanned': self.rows_scanned,
+            'rows_returned': self.rows_returned,
+        }
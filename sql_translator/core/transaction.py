@@ -0,0 +1,177 @@
+"""事务：BEGIN / COMMIT / ROLLBACK，快照隔离
+
+事务中的语句都在表的快照上执行（IndexedTable.snapshot，写时复制：快照与已提交的表共享
+数据，任何一方修改时只记录被修改的部分），只能看到事务开始时已提交的数据和事务自己的修改。
+BEGIN 不立即取快照，只在各表登记（IndexedTable.defer_snapshot）：事务第一次读取某表，或者
+其他线程第一次修改该表之前才取快照，与 BEGIN 时取快照的结果相同。事务没有用到的表不取快照，
+已提交的表之后的修改也不需要为它保留数据；事务结束后快照释放，共享随之结束。事务中的语句不加锁，长时间的事务不会阻塞其他线程的
+读写，其他线程的写入也不会阻塞事务中的查询。
+
+COMMIT 检查事务修改过的表在事务开始后是否被其他线程修改过（先提交者获胜）：没有冲突时
+用事务中的表替换已提交的表，持久化模式下事务的全部修改作为一条记录写入预写日志；有冲突时
+事务回滚并返回错误信息。后台整理和检查点真正删除已删除的行只改变行号，不算修改：修改记录
+中的行号在提交时换算为已提交的表当前的行号（见 journal_ops）。ROLLBACK 只需丢弃快照。
+事务中不能执行 CREATE/ALTER/DROP。
+每个线程各自有当前的事务，见 SQLExecutor.transaction。
+"""
+
+import threading
+import weakref
+from itertools import accumulate
+
+from sql_translator.core.locks import DML_TYPES, READ_ONLY_TYPES
+
+
+class Transaction:
+    """一个事务的快照：事务中的表结构 tables、表数据 data 和在它们上执行的 operations
+
+    names 为None时（BEGIN）包括所有表，延迟取快照（见 take_snapshot）；execute_iter 只对
+    查询涉及的表立即取快照。journaled 为真时收集事务中的修改记录（持久化模式），提交时写入
+    预写日志。
+    """
+
+    def __init__(self, tables, data, create_operations, names=None, journaled=False):
+        deferred = names is None
+        if deferred:
+            names = list(data)
+        names = [name for name in names if name in data]
+        self.tables = {name: dict(tables[name]) for name in names}
+        # 表名 -> 事务开始时已提交的表（弱引用，不延长它的生命）及其 version，提交时据此检测冲突
+        self.base = {name: (weakref.ref(data[name]), data[name].version) for name in names}
+        # 表名 -> 事务开始时的行号布局 (epoch, live, 行数)，提交时据此换算修改记录中的行号
+        self.layout = {}
+        self.journaled = journaled
+        self.ops = []   # 事务中的修改记录：[表名, 操作]
+        self.lock = threading.Lock()
+        self.pending = {name: data[name] for name in names}   # 尚未取快照的表
+        self.data = _Snapshots(self, names)
+        for name in names:
+            if deferred:
+                data[name].defer_snapshot(self)
+            else:
+                self.take_snapshot(data[name])
+        self.operations = create_operations(self.tables, self.data)
+
+    def take_snapshot(self, table):
+        """为事务开始时已提交的表 table 取快照（已取过时什么也不做）
+
+        事务第一次读取该表时调用，或者由修改方在修改该表之前调用（见 IndexedTable._before_write），
+        此时表还是事务开始时的状态。
+        """
+        with self.lock:
+            for name, pending in list(self.pending.items()):
+                if pending is not table:
+                    continue
+                del self.pending[name]
+                self.layout[name] = (table.epoch, table.live, table.stored_rows())
+                snapshot = table.snapshot()
+                if self.journaled:
+                    # 只引用 ops，快照不引用事务，事务结束时随之释放
+                    snapshot.journal = lambda op, name=name, ops=self.ops: ops.append([name, op])
+                dict.__setitem__(self.data, name, snapshot)
+
+    def load(self, name):
+        """返回表名对应的快照，尚未取快照时先取"""
+        table = self.pending.get(name)
+        if table is not None:
+            self.take_snapshot(table)
+            table.cancel_snapshot(self)
+        return dict.__getitem__(self.data, name)
+
+    def loaded(self):
+        """已取快照的表：{表名: 快照}"""
+        return {name: table for name, table in dict.items(self.data) if table is not None}
+
+    def run(self, statement, action):
+        """在事务中执行语句 action()，返回其结果"""
+        if statement.type not in READ_ONLY_TYPES and statement.type not in DML_TYPES:
+            return "错误：事务中不能执行 CREATE/ALTER/DROP 语句，请先 COMMIT 或 ROLLBACK"
+        return action()
+
+    def execute(self, statement):
+        """在事务的快照上执行语句"""
+        return self.run(statement, lambda: self.operations[statement.type].execute(statement))
+
+    def written(self):
+        """事务中修改过的表：{表名: 表}"""
+        return {name: table for name, table in self.loaded().items()
+                if table.version != self.base[name][1]}
+
+    def conflict(self, data):
+        """返回在事务开始后被其他线程修改或删除的、事务也修改过的表名，没有冲突时返回None
+
+        data 为已提交的表数据；调用方需要持有这些表的写锁。
+        """
+        for name in self.written():
+            table, version = self.base[name]
+            table = table()
+            if table is None or data.get(name) is not table or table.version != version:
+                return name
+        return None
+
+    def journal_ops(self, data):
+        """提交时写入预写日志的修改记录；调用方需要持有修改过的表的写锁，且没有冲突
+
+        事务开始后已提交的表被真正删除过已删除的行（epoch 改变，行号改变，数据没有变化）时，
+        记录中的行号换算为整理后的行号，事务中的表也真正删除已删除的行并记录 compact，
+        使重放日志得到的行号与内存中的表一致。
+        """
+        remaps = {}
+        for name in self.written():
+            epoch, live, rows = self.layout[name]
+            if data[name].epoch != epoch and live is not None:
+                remaps[name] = _row_id_mapping(live, rows)
+        if not remaps:
+            return self.ops
+        ops = []
+        for name, op in self.ops:
+            remap = remaps.get(name)
+            if remap is not None:
+                op = _remap_op(op, remap)
+            ops.append([name, op])
+        for name in remaps:
+            self.data[name].purge_deleted()
+            ops.append([name, ('compact',)])
+        return ops
+
+
+class _Snapshots(dict):
+    """事务中的表数据：表名 -> 快照，尚未取快照的表的值为None，第一次读取时取快照
+
+    只保存事务的弱引用，不形成引用环：事务结束后事务对象和快照立即释放。
+    """
+
+    def __init__(self, transaction, names):
+        super().__init__(dict.fromkeys(names))
+        self.transaction = weakref.ref(transaction)
+
+    def __getitem__(self, name):
+        table = super().__getitem__(name)
+        if table is None:
+            table = self.transaction().load(name)
+        return table
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    def values(self):
+        return [self[name] for name in self]
+
+    def items(self):
+        return [(name, self[name]) for name in self]
+
+
+def _row_id_mapping(live, rows):
+    """事务开始时的行号 -> 真正删除这些已删除的行之后的行号；事务中追加的行依次前移"""
+    before = list(accumulate(live, initial=0))   # 每行之前未删除的行数
+    dead = rows - before[rows]
+    return lambda row: before[row] if row < rows else row - dead
+
+
+def _remap_op(op, remap):
+    name = op[0]
+    if name == 'set':
+        return ('set', remap(op[1]), *op[2:])
+    if name == 'delete':
+        return ('delete', [remap(row) for row in op[1]])
+    return op
@@ -0,0 +1,344 @@
+"""向量化执行：用 NumPy 在列式存储的数值列上整批过滤、排序和聚合
+
+NumPy 是可选依赖，没有安装时 available() 返回 False，查询全部按行执行。
+只处理单表查询，并且 WHERE、ORDER BY 和聚合函数用到的列都必须是存入类型化数组的
+数值列（列式存储中的 INT/DECIMAL/FLOAT/DOUBLE 列，见 ColumnarTable）；其他情况
+由调用方按行执行。NumPy 数组直接映射列的内存，不复制数据，也不会在产出结果时继续引用；
+与快照共享并已修改过的列（SharedColumn）先合并为普通的列，合并结果缓存到该列下一次修改。
+
+结果与按行执行相同：比较按 float 进行（与 predicate.compare_values 一致），排序是稳定的，
+SUM/AVG 按行的顺序逐个累加，分组按第一次出现的顺序排列。
+"""
+
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 是可选依赖
+    np = None
+
+from sql_translator.core.ast_nodes import BoolOp, ColumnRef, Comparison, Literal, Not
+from sql_translator.core.predicate import (
+    COMPARATORS, MIRRORED_OPERATORS, compare_values, find_column
+)
+from sql_translator.core.storage import ColumnarTable, SharedColumn
+from sql_translator.core.tracing import current_trace
+
+# 行数少于该值的表按行执行，整批处理的固定开销不值得
+MIN_ROWS = 1024
+# 每批过滤的行数；没有排序的查询取够 OFFSET + LIMIT 行后不再读取后面的批
+CHUNK_ROWS = 65536
+
+_DTYPES = {'q': 'int64', 'd': 'float64'}
+
+
+def available():
+    """是否安装了 NumPy"""
+    return np is not None
+
+
+def numeric_array(column):
+    """把类型化数组形式的数值列映射为 NumPy 数组（不复制），其他列返回None"""
+    if isinstance(column, SharedColumn):
+        column = column.flat()
+    if isinstance(column, array):
+        typecode = column.typecode
+    elif isinstance(column, memoryview):
+        typecode = column.format
+    else:
+        return None
+    if typecode not in _DTYPES:
+        return None
+    return np.frombuffer(column, dtype=_DTYPES[typecode])
+
+
+class _Batch:
+    """一批行：行号数组 ids，或连续的行号范围 [start, stop)；列数组按需映射并缓存"""
+
+    def __init__(self, table, ids=None, start=0, stop=0):
+        self.table = table
+        self.ids = ids
+        self.start = start
+        self.stop = stop
+        self.size = len(ids) if ids is not None else stop - start
+        self.cache = {}
+
+    def row_ids(self):
+        if self.ids is None:
+            return np.arange(self.start, self.stop, dtype=np.intp)
+        return self.ids
+
+    def floats(self, col_index):
+        """该批行在一列上的值，转换为 float64（与按行比较时的 float() 一致）"""
+        values = self.cache.get(col_index)
+        if values is None:
+            column = numeric_array(self.table.columns[col_index])
+            if self.ids is None:
+                column = column[self.start:self.stop]
+            else:
+                column = column[self.ids]
+            values = self.cache[col_index] = column.astype(np.float64, copy=False)
+        return values
+
+
+def _compile_comparison(condition, col_names, numeric):
+    left, op, right = condition.left, condition.op, condition.right
+    if op not in COMPARATORS:
+        # LIKE 按字符串匹配，不能向量化
+        return None
+    if isinstance(left, Literal) and isinstance(right, ColumnRef):
+        left, right, op = right, left, MIRRORED_OPERATORS[op]
+    compare = COMPARATORS[op]
+
+    if isinstance(left, Literal):
+        if not isinstance(right, Literal):
+            return None
+        result = compare_values(compare, left.value, right.value)
+        return lambda batch: np.full(batch.size, result)
+    if not isinstance(left, ColumnRef):
+        return None
+
+    col_index = find_column(col_names, left)
+    if col_index == -1:
+        return lambda batch: np.ones(batch.size, dtype=bool)
+    if not numeric(col_index):
+        return None
+
+    if isinstance(right, ColumnRef):
+        other_index = find_column(col_names, right)
+        # 右侧不是已知的列时按字符串常量比较，不能向量化
+        if other_index == -1 or not numeric(other_index):
+            return None
+        return lambda batch: compare(batch.floats(col_index), batch.floats(other_index))
+    if not isinstance(right, Literal):
+        return None
+    try:
+        number = float(right.value)
+    except ValueError:
+        return None
+    return lambda batch: compare(batch.floats(col_index), number)
+
+
+def compile_mask(condition, col_names, numeric):
+    """把WHERE条件编译为 mask(batch) -> 布尔数组
+
+    numeric(col_index) 判断列是否为数值数组。条件中有不能向量化的部分
+    （字符串比较、非数值列等）时返回None。
+    """
+    if isinstance(condition, Comparison):
+        return _compile_comparison(condition, col_names, numeric)
+    if isinstance(condition, Not):
+        operand = compile_mask(condition.operand, col_names, numeric)
+        if operand is None:
+            return None
+        return lambda batch: ~operand(batch)
+    if isinstance(condition, BoolOp):
+        operands = [compile_mask(operand, col_names, numeric) for operand in condition.operands]
+        if any(operand is None for operand in operands):
+            return None
+        combine = np.logical_and if condition.op == 'AND' else np.logical_or
+        return lambda batch: combine.reduce([operand(batch) for operand in operands])
+    return None
+
+
+class VectorScan:
+    """单表扫描的向量化执行：按批计算过滤条件的布尔掩码，得到满足条件的行号"""
+
+    def __init__(self, table, mask=None, candidates=None):
+        self.table = table
+        self.mask = mask              # 编译后的过滤条件，None表示不过滤
+        self.candidates = candidates  # 索引找到的候选行号（升序），None表示全表扫描
+        self.trace = current_trace()  # 跟踪中时记录读取的行数
+
+    def numeric(self, col_index):
+        """该列是否为数值数组"""
+        return numeric_array(self.table.columns[col_index]) is not None
+
+    def sortable(self, col_index):
+        """该列能否向量化排序：数值列且没有 NaN（NaN 按行排序时的位置不确定）"""
+        values = numeric_array(self.table.columns[col_index])
+        return values is not None and not (values.dtype.kind == 'f' and np.isnan(values).any())
+
+    def batches(self):
+        """逐批产出满足条件的行号数组（升序）"""
+        if self.candidates is not None:
+            candidates = np.asarray(self.candidates, dtype=np.intp)
+            batches = (_Batch(self.table, candidates[start:start + CHUNK_ROWS])
+                       for start in range(0, len(candidates), CHUNK_ROWS))
+        else:
+            length = self.table.stored_rows()
+            batches = (_Batch(self.table, None, start, min(start + CHUNK_ROWS, length))
+                       for start in range(0, length, CHUNK_ROWS))
+        for batch in batches:
+            if self.trace is not None:
+                self.trace.rows_scanned += batch.size
+            ids = batch.row_ids()
+            keep = None if self.mask is None else self.mask(batch)
+            live = self.table.live
+            if live is not None and batch.ids is None:
+                # 跳过已删除的行（索引找到的行都未删除）
+                alive = np.frombuffer(live, dtype=np.bool_)[batch.start:batch.stop].copy()
+                keep = alive if keep is None else keep & alive
+            if keep is not None:
+                ids = ids[keep]
+            # 产出前释放这一批映射的列数组，迭代期间表仍然可以修改
+            batch = None
+            yield ids
+
+    def matching_ids(self):
+        """满足条件的所有行号"""
+        parts = list(self.batches())
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate(parts)
+
+    def values(self, col_index, ids):
+        """指定行在一列上的值（复制为新数组）"""
+        return numeric_array(self.table.columns[col_index])[ids]
+
+    def rows(self, ids, col_indices):
+        """按行号取出指定的列，返回逐行产出列表的迭代器"""
+        id_list = None
+        columns = []
+        for col_index in col_indices:
+            column = self.table.columns[col_index]
+            values = numeric_array(column)
+            if values is not None:
+                columns.append(values[ids].tolist())
+                continue
+            if id_list is None:
+                id_list = ids.tolist()
+            columns.append([column[i] for i in id_list])
+        return map(list, zip(*columns))
+
+    def select(self, col_indices, order_keys, limit=None, offset=0):
+        """过滤、排序和投影，逐行产出结果
+
+        order_keys 为 [(列下标, 是否降序)]，列必须是 sortable 的数值列；为空时不排序，
+        取够 offset + limit 行后不再扫描。
+        """
+        if not order_keys:
+            skip, remaining = offset, limit
+            if remaining == 0:
+                return
+            for ids in self.batches():
+                if skip:
+                    cut = min(skip, len(ids))
+                    ids, skip = ids[cut:], skip - cut
+                if remaining is not None:
+                    ids = ids[:remaining]
+                    remaining -= len(ids)
+                yield from self.rows(ids, col_indices)
+                if remaining == 0:
+                    return
+            return
+
+        ids = self.matching_ids()
+        # lexsort 以最后一个键为主键，排序稳定；降序的列把键取反
+        keys = []
+        for col_index, desc in reversed(order_keys):
+            key = self.values(col_index, ids).astype(np.float64)
+            keys.append(-key if desc else key)
+        ids = ids[np.lexsort(keys)]
+        ids = ids[offset:] if limit is None else ids[offset:offset + limit]
+        for start in range(0, len(ids), CHUNK_ROWS):
+            yield from self.rows(ids[start:start + CHUNK_ROWS], col_indices)
+
+    def aggregate(self, key_indices, arg_indices, funcs):
+        """向量化的 hash_aggregate，结果的格式和分组顺序与之相同
+
+        funcs 为各聚合函数的名称。只支持不分组或按一个数值列分组，聚合的列必须是数值列；
+        不支持的查询、分组列或 MIN/MAX 的列中有 NaN、整数求和可能溢出时返回None。
+        """
+        if len(key_indices) > 1:
+            return None
+        for arg_index, func in zip(arg_indices, funcs):
+            if func != 'COUNT' and not self.numeric(arg_index):
+                return None
+        if key_indices and not self.numeric(key_indices[0]):
+            return None
+
+        ids = self.matching_ids()
+        if key_indices:
+            keys = self.values(key_indices[0], ids)
+            if keys.dtype.kind == 'f' and np.isnan(keys).any():
+                return None
+            _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            # np.unique 按值排序，改为按第一次出现的顺序编号
+            order = np.argsort(first)
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            groups = rank[inverse.reshape(-1)]
+            group_count = len(first)
+            group_keys = keys[first[order]].tolist()
+        else:
+            groups = np.zeros(len(ids), dtype=np.intp)
+            group_count = 1
+            group_keys = None
+
+        counts = np.bincount(groups, minlength=group_count).tolist()
+        results = []
+        for arg_index, func in zip(arg_indices, funcs):
+            if func == 'COUNT':
+                results.append(counts)
+                continue
+            values = self.values(arg_index, ids)
+            if func in ('SUM', 'AVG'):
+                if values.dtype.kind == 'i' and len(values):
+                    largest = max(abs(int(values.min())), abs(int(values.max())))
+                    if largest * len(values) >= 2 ** 63:
+                        return None
+                totals = np.zeros(group_count, dtype=values.dtype)
+                # ufunc.at 按行的顺序逐个累加，浮点数的舍入与逐行求和相同
+                np.add.at(totals, groups, values)
+                if func == 'SUM':
+                    results.append([total if count else None
+                                    for total, count in zip(totals.tolist(), counts)])
+                else:
+                    results.append([total / count if count else None
+                                    for total, count in zip(totals.tolist(), counts)])
+                continue
+            if values.dtype.kind == 'f' and np.isnan(values).any():
+                return None
+            if not len(values):
+                results.append([None] * group_count)
+                continue
+            if func == 'MIN':
+                extremes = np.full(group_count, values.max())
+                np.minimum.at(extremes, groups, values)
+            else:
+                extremes = np.full(group_count, values.min())
+                np.maximum.at(extremes, groups, values)
+            if values.dtype.kind == 'f' and not extremes.all():
+                # 0.0 与 -0.0 相等，按行聚合时保留先出现的那个
+                positions = np.flatnonzero(values == extremes[groups])
+                first = np.full(group_count, len(values))
+                np.minimum.at(first, groups[positions], positions)
+                extremes = values[first]
+            results.append(extremes.tolist())
+
+        rows = []
+        for group in range(group_count):
+            row = [group_keys[group]] if group_keys is not None else []
+            row.extend(result[group] for result in results)
+            rows.append(row)
+        return rows
+
+
+def vector_scan(table, scan):
+    """单表扫描能向量化执行时返回 VectorScan，否则返回None
+
+    scan 为执行计划中的 ScanPlan：过滤条件必须能编译为掩码，使用索引时只检查索引找到的行。
+    """
+    if np is None or not isinstance(table, ColumnarTable) or len(table) < MIN_ROWS:
+        return None
+    vector = VectorScan(table)
+    condition = scan.condition
+    if condition is not None:
+        vector.mask = compile_mask(condition, scan.col_names, vector.numeric)
+        if vector.mask is None:
+            return None
+    if scan.index is not None:
+        index, op, value = scan.index
+        vector.candidates = index.lookup(op, value)
+    return vector
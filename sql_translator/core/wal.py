@@ -0,0 +1,173 @@
+"""预写日志（WAL）
+
+持久化模式下，INSERT/UPDATE/DELETE 不再重写整个表文件，而是把每条语句对表的修改
+作为一条记录追加到 wal.log。记录格式::
+
+    长度 (4字节) | CRC32 (4字节) | JSON: {"lsn": 序号, "ops": [[表名, 操作], ...]}
+
+同步方式（sync_mode）：
+
+    full      每条语句提交时 fsync；多个线程同时提交时合并为一次 fsync（组提交）
+    interval  提交时只写入操作系统，后台线程每 sync_interval_ms 毫秒 fsync 一次
+    off       从不主动 fsync，由操作系统决定何时落盘
+
+提交分两步：append 在持有写互斥锁时写入记录（只写入操作系统），commit 在释放锁之后
+按同步方式等待。一个线程 fsync 期间其他线程可以继续写入记录，之后一次 fsync 覆盖它们。
+
+启动时读取日志，遇到不完整或校验失败的记录（崩溃时写了一半）即停止，并截掉这部分。
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+WAL_FILE = 'wal.log'
+SYNC_MODES = ('full', 'interval', 'off')
+
+_FRAME = struct.Struct('<II')
+
+
+class WriteAheadLog:
+    """追加写入的日志文件，记录按 LSN（日志序号）递增"""
+
+    def __init__(self, path, sync_mode='full', sync_interval_ms=10):
+        if sync_mode not in SYNC_MODES:
+            raise ValueError(f"不支持的同步方式: {sync_mode}")
+        self.file_path = os.path.join(path, WAL_FILE)
+        self.sync_mode = sync_mode
+        self.sync_interval = sync_interval_ms / 1000
+        self.lock = threading.Lock()        # 保护写入和LSN
+        self.sync_lock = threading.Lock()   # 同一时间只有一个线程执行 fsync
+        self.file = None
+        self.lsn = 0          # 最后写入的记录
+        self.synced_lsn = 0   # 已经 fsync 的最后一条记录
+        self.started = {}     # 已写入、尚未 commit 的记录 -> 开始写入的时间
+        self._stop = threading.Event()
+        self._syncer = None
+        self.reset_stats()
+
+    def reset_stats(self):
+        """清零提交统计"""
+        self.commits = 0
+        self.syncs = 0
+        self.bytes_written = 0
+        self.commit_seconds = 0.0
+        self.max_commit_seconds = 0.0
+
+    def read_records(self):
+        """读取日志中所有完整的记录，返回 ([(lsn, ops), ...], 有效数据的长度)"""
+        records = []
+        valid_end = 0
+        try:
+            with open(self.file_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return records, 0
+
+        pos = 0
+        while pos + _FRAME.size <= len(data):
+            length, crc = _FRAME.unpack_from(data, pos)
+            payload = data[pos + _FRAME.size:pos + _FRAME.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            record = json.loads(payload)
+            records.append((record['lsn'], record['ops']))
+            pos += _FRAME.size + length
+            valid_end = pos
+        return records, valid_end
+
+    def open(self, lsn, valid_end=None):
+        """打开日志准备追加；valid_end 之后的残缺数据被截掉"""
+        self.file = open(self.file_path, 'ab')
+        if valid_end is not None and self.file.tell() > valid_end:
+            self.file.truncate(valid_end)
+            self.file.seek(valid_end)
+        self.lsn = self.synced_lsn = lsn
+        if self.sync_mode == 'interval':
+            self._stop.clear()
+            self._syncer = threading.Thread(target=self._sync_loop, name='wal-sync', daemon=True)
+            self._syncer.start()
+
+    def append(self, ops):
+        """写入一条记录（只写入操作系统，不 fsync），返回其LSN；之后应调用 commit(lsn)"""
+        start = time.perf_counter()
+        with self.lock:
+            self.lsn += 1
+            lsn = self.lsn
+            payload = json.dumps({'lsn': lsn, 'ops': ops}, ensure_ascii=False,
+                                 separators=(',', ':')).encode('utf-8')
+            self.file.write(_FRAME.pack(len(payload), zlib.crc32(payload)))
+            self.file.write(payload)
+            self.file.flush()
+            self.bytes_written += _FRAME.size + len(payload)
+            self.started[lsn] = start
+        return lsn
+
+    def commit(self, lsn):
+        """按同步方式提交 append 写入的记录：full 模式下等到 fsync 覆盖 lsn 为止"""
+        if self.sync_mode == 'full':
+            self.sync(lsn)
+        with self.lock:
+            elapsed = time.perf_counter() - self.started.pop(lsn)
+            self.commits += 1
+            self.commit_seconds += elapsed
+            self.max_commit_seconds = max(self.max_commit_seconds, elapsed)
+
+    def sync(self, lsn=None):
+        """把日志 fsync 到磁盘。指定 lsn 时，如果其他线程的 fsync 已经覆盖了它就直接返回"""
+        with self.sync_lock:
+            if lsn is not None and self.synced_lsn >= lsn:
+                return
+            with self.lock:
+                target = self.lsn
+                self.file.flush()
+            if target > self.synced_lsn:
+                os.fsync(self.file.fileno())
+                self.synced_lsn = target
+                self.syncs += 1
+
+    def _sync_loop(self):
+        while not self._stop.wait(self.sync_interval):
+            if self.synced_lsn < self.lsn:
+                self.sync()
+
+    def size(self):
+        """日志文件当前的字节数"""
+        return self.file.tell() if self.file is not None else 0
+
+    def reset(self):
+        """检查点之后清空日志，LSN继续递增"""
+        with self.sync_lock, self.lock:
+            self.file.truncate(0)
+            self.file.seek(0)
+            os.fsync(self.file.fileno())
+            self.synced_lsn = self.lsn
+
+    def stats(self):
+        """提交次数、fsync次数、写入字节数和提交延迟"""
+        return {
+            'sync_mode': self.sync_mode,
+            'lsn': self.lsn,
+            'synced_lsn': self.synced_lsn,
+            'commits': self.commits,
+            'syncs': self.syncs,
+            'bytes_written': self.bytes_written,
+            'log_size': self.size(),
+            'avg_commit_ms': self.commit_seconds / self.commits * 1000 if self.commits else 0.0,
+            'max_commit_ms': self.max_commit_seconds * 1000,
+        }
+
+    def close(self):
+        """停止后台同步线程，fsync 并关闭日志"""
+        if self.file is None:
+            return
+        if self._syncer is not None:
+            self._stop.set()
+            self._syncer.join()
+            self._syncer = None
+        self.sync()
+        self.file.close()
+        self.file = None
@@ -0,0 +1,185 @@
+"""DELETE 的墓碑与后台整理：整理前后查询结果不变，索引与表中的行一致"""
+
+import shutil
+import tempfile
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+ROWS = 400
+
+INDEXES = [
+    "CREATE INDEX ik ON t (k)",
+    "CREATE INDEX iname ON t (name)",
+    "CREATE INDEX iprice ON t (price)",
+]
+
+QUERIES = [
+    "SELECT * FROM t",
+    "SELECT id FROM t WHERE k = 3",
+    "SELECT id FROM t WHERE k >= 17 AND price < 20",
+    "SELECT id, k FROM t WHERE name = 'n7'",
+    "SELECT id FROM t WHERE price > 45.5",
+    "SELECT k, COUNT(*) FROM t GROUP BY k ORDER BY k",
+]
+
+
+def insert_rows(executor, start, stop):
+    executor.executemany("INSERT INTO t VALUES (?, ?, ?, ?)",
+                         [(i, i % 20, f"n{i % 11}", i % 100 / 2) for i in range(start, stop)])
+
+
+class TombstoneCompactionTest(unittest.TestCase):
+
+    storage = 'row'
+
+    def setUp(self):
+        self.executor = self.create(compact_threshold=0.25)
+        for sql in INDEXES:
+            self.executor.execute_sql(sql)
+        # 参照：没有索引，也从不整理
+        self.reference = self.create(compact_threshold=2.0)
+
+    def tearDown(self):
+        self.executor.close()
+        self.reference.close()
+
+    def create(self, path=None, **options):
+        executor = SQLExecutor(storage=self.storage, path=path, **options)
+        if 't' not in executor.data:
+            executor.execute_sql("CREATE TABLE t (id INT, k INT, name VARCHAR(10), price DECIMAL(10,2))")
+            insert_rows(executor, 0, ROWS)
+        return executor
+
+    def both(self, sql):
+        """在两个执行器上执行同一条语句，返回结果"""
+        result = self.executor.execute_sql(sql)
+        self.assertEqual(result, self.reference.execute_sql(sql), sql)
+        return result
+
+    def assert_same_results(self):
+        for sql in QUERIES:
+            self.both(sql)
+
+    def assert_indexes_consistent(self, table):
+        """每个索引对每个值查到的行号，恰好是表中该值所在的未删除的行
+
+        重新打开后索引在第一次使用时才构建，与查询一样通过 active_indexes 取得索引。
+        """
+        self.assertEqual(len(table.indexes), len(INDEXES))
+        ids = table.row_ids()
+        for index in table.active_indexes():
+            expected = {}
+            for i, row in zip(ids, table):
+                expected.setdefault(str(row[index.col_index]), []).append(i)
+            found = {value: index.lookup('=', value) for value in expected}
+            self.assertEqual(found, expected, index.name)
+
+    def test_delete_leaves_tombstones(self):
+        table = self.executor.data['t']
+        epoch = table.epoch
+        self.both("DELETE FROM t WHERE k = 3")
+        self.assertEqual(table.dead_count, ROWS // 20)
+        self.assertEqual(table.stored_rows(), ROWS)
+        self.assertEqual(len(table), ROWS - ROWS // 20)
+        self.assertEqual(table.epoch, epoch)
+        self.assert_indexes_consistent(table)
+        self.assert_same_results()
+
+    def test_compaction_keeps_indexes(self):
+        self.both("DELETE FROM t WHERE k < 4")
+        self.both("DELETE FROM t WHERE name = 'n5'")
+        self.both("UPDATE t SET price = 1.5 WHERE k = 10")
+        self.executor.compactor.wait()
+
+        table = self.executor.data['t']
+        self.assertEqual(table.dead_count, 0)
+        self.assertEqual(table.stored_rows(), len(table))
+        self.assertGreater(self.executor.compactor.stats()['batches'], 0)
+        self.assert_indexes_consistent(table)
+        self.assert_same_results()
+
+        # 整理之后的修改使用新的行号
+        self.both("UPDATE t SET k = 3, name = 'moved' WHERE id = 399")
+        self.both("DELETE FROM t WHERE k = 19")
+        insert_rows(self.executor, ROWS, ROWS + 50)
+        insert_rows(self.reference, ROWS, ROWS + 50)
+        self.assert_indexes_consistent(self.executor.data['t'])
+        self.assert_same_results()
+        self.both("SELECT id FROM t WHERE name = 'moved'")
+
+    def test_below_threshold_is_not_compacted(self):
+        self.both("DELETE FROM t WHERE id < 10")
+        self.executor.compactor.wait()
+        table = self.executor.data['t']
+        self.assertEqual(table.dead_count, 10)
+        self.assertEqual(table.stored_rows(), ROWS)
+        self.assert_same_results()
+
+    def test_delete_everything(self):
+        self.both("DELETE FROM t WHERE id >= 0")
+        self.executor.compactor.wait()
+        table = self.executor.data['t']
+        self.assertEqual((len(table), table.stored_rows()), (0, 0))
+        self.assert_indexes_consistent(table)
+        insert_rows(self.executor, 0, 5)
+        insert_rows(self.reference, 0, 5)
+        self.assert_same_results()
+
+    def test_transaction_delete_then_compaction(self):
+        self.executor.execute_sql("BEGIN")
+        self.executor.execute_sql("DELETE FROM t WHERE k >= 10")
+        self.assertEqual(self.executor.execute_sql("COMMIT"), "提交事务成功")
+        self.reference.execute_sql("DELETE FROM t WHERE k >= 10")
+        self.executor.compactor.wait()
+        table = self.executor.data['t']
+        self.assertEqual(table.stored_rows(), len(table))
+        self.assert_indexes_consistent(table)
+        self.assert_same_results()
+
+
+class ColumnarTombstoneCompactionTest(TombstoneCompactionTest):
+    storage = 'columnar'
+
+
+class PersistentCompactionTest(ColumnarTombstoneCompactionTest):
+    """持久化模式（只支持列式存储）：整理记录写入预写日志，重新打开后结果和索引不变"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.executor = self.create(self.path, compact_threshold=0.25)
+        for sql in INDEXES:
+            self.executor.execute_sql(sql)
+        self.reference = self.create(compact_threshold=2.0)
+
+    def tearDown(self):
+        super().tearDown()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def reopen(self):
+        self.executor.close()
+        self.executor = self.create(self.path)
+        self.assert_indexes_consistent(self.executor.data['t'])
+        self.assert_same_results()
+
+    def test_compaction_survives_reopen(self):
+        self.both("DELETE FROM t WHERE k < 8")
+        self.executor.compactor.wait()
+        self.assertEqual(self.executor.data['t'].dead_count, 0)
+        self.both("UPDATE t SET price = 0.5 WHERE id = 398")
+        self.reopen()
+        table = self.executor.data['t']
+        self.assertEqual(table.stored_rows(), len(table))
+
+    def test_checkpoint_purges_tombstones(self):
+        self.both("DELETE FROM t WHERE id < 10")
+        self.executor.checkpoint()
+        table = self.executor.data['t']
+        self.assertEqual(table.stored_rows(), len(table))
+        self.assert_indexes_consistent(table)
+        self.both("DELETE FROM t WHERE id = 20")
+        self.reopen()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""多个线程共享一个执行器：并发的查询和修改"""
+
+import threading
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+WRITERS = 4
+READERS = 4
+GROUPS_PER_WRITER = 60
+
+
+class ConcurrentClientsTest(unittest.TestCase):
+    """每条 INSERT 写入一对 v 相加为0的行，每条 DELETE 删除一对行：
+    查询任何时候看到的都是完整语句的结果，行数为偶数且 SUM(v) 为0"""
+
+    storage = 'row'
+
+    def setUp(self):
+        self.executor = SQLExecutor(storage=self.storage)
+        self.executor.execute_sql("CREATE TABLE t (g INT, v INT)")
+        self.executor.execute_sql("CREATE INDEX ig ON t (g)")
+        self.errors = []
+        self.done = threading.Event()
+
+    def tearDown(self):
+        self.executor.close()
+
+    def run_clients(self, writers, readers=READERS):
+        """并发执行 writers 中的函数和 readers 个查询线程，写入全部完成后查询线程退出"""
+        writer_threads = [threading.Thread(target=self.guard, args=(w,)) for w in writers]
+        reader_threads = [threading.Thread(target=self.guard, args=(self.reader,))
+                          for _ in range(readers)]
+        for thread in writer_threads + reader_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        self.done.set()
+        for thread in reader_threads:
+            thread.join()
+        self.assertEqual(self.errors, [])
+
+    def guard(self, target):
+        try:
+            target()
+        except Exception as e:   # 线程中的失败在主线程中报告
+            self.errors.append(repr(e))
+            self.done.set()
+
+    def writer(self, w):
+        def write():
+            sql = self.executor.execute_sql
+            insert = self.executor.prepare("INSERT INTO t VALUES (?, ?), (?, ?)")
+            for i in range(GROUPS_PER_WRITER):
+                g = w * GROUPS_PER_WRITER + i
+                if i % 2:
+                    insert.execute((g, i, g, -i))
+                else:
+                    self.check_result(sql(f"INSERT INTO t VALUES ({g}, {i}), ({g}, {-i})"))
+                if i % 3 == 2:
+                    self.check_result(sql(f"DELETE FROM t WHERE g = {g - 1}"))
+                if i % 5 == 4:
+                    self.check_result(sql(f"UPDATE t SET v = 0 WHERE g = {g}"))
+        return write
+
+    def check_result(self, result):
+        if isinstance(result, str) and result.startswith('错误'):
+            raise AssertionError(result)
+
+    def reader(self):
+        sql = self.executor.execute_sql
+        while not self.done.is_set():
+            (count, total), = sql("SELECT COUNT(*), SUM(v) FROM t")
+            if count % 2 or (count and total != 0):
+                raise AssertionError(f"看到了不完整的语句：{count} 行，SUM(v) = {total}")
+            rows = sql("SELECT g, v FROM t WHERE g >= 0 ORDER BY g")
+            if len(rows) % 2:
+                raise AssertionError(f"ORDER BY 的结果有 {len(rows)} 行")
+            for row in self.executor.execute_iter("SELECT g FROM t WHERE g < 10"):
+                if row[0] >= 10:
+                    raise AssertionError(row)
+
+    def test_readers_and_writers(self):
+        self.run_clients([self.writer(w) for w in range(WRITERS)])
+
+        expected = []
+        for w in range(WRITERS):
+            for i in range(GROUPS_PER_WRITER):
+                if i % 3 == 1 and i + 1 < GROUPS_PER_WRITER:
+                    continue   # 已被 DELETE 删除
+                g = w * GROUPS_PER_WRITER + i
+                value = 0 if i % 5 == 4 else i
+                expected += [[g, value], [g, -value]]
+        rows = self.executor.execute_sql("SELECT g, v FROM t")
+        self.assertEqual(sorted(rows), sorted(expected))
+        self.assertEqual(self.executor.execute_sql("SELECT g, v FROM t WHERE g = 5"), [[5, 5], [5, -5]])
+
+    def test_lock_stats(self):
+        self.run_clients([self.writer(w) for w in range(WRITERS)], readers=1)
+        stats = self.executor.get_lock_stats()
+        self.assertGreaterEqual(stats['write_acquisitions'], WRITERS * GROUPS_PER_WRITER)
+        self.assertGreater(stats['read_acquisitions'], 0)
+
+    def test_ddl_with_queries(self):
+        self.executor.execute_sql("INSERT INTO t VALUES (1, 5), (1, -5)")
+
+        def ddl():
+            sql = self.executor.execute_sql
+            for i in range(30):
+                self.check_result(sql(f"CREATE TABLE x{i} (a INT)"))
+                self.check_result(sql(f"INSERT INTO x{i} VALUES ({i})"))
+                self.check_result(sql(f"ALTER TABLE t ADD c{i} INT"))
+                self.check_result(sql(f"ALTER TABLE t DROP c{i}"))
+                self.check_result(sql(f"DROP TABLE x{i}"))
+        self.run_clients([ddl])
+        self.assertEqual(self.executor.execute_sql("SHOW TABLES"), [['t']])
+        self.assertEqual(self.executor.execute_sql("SELECT * FROM t"), [[1, 5], [1, -5]])
+
+    def test_iterator_reads_a_snapshot(self):
+        self.executor.execute_sql("INSERT INTO t VALUES (1, 1), (1, -1)")
+        rows = self.executor.execute_iter("SELECT * FROM t")
+        self.assertEqual(next(rows), [1, 1])
+        # 迭代期间不持有锁，修改不会阻塞，也不影响已经开始的查询
+        self.assertEqual(self.executor.execute_sql("INSERT INTO t VALUES (2, 2), (2, -2)"),
+                         "向表 t 插入 2 行数据成功")
+        self.assertEqual(list(rows), [[1, -1]])
+
+
+class ColumnarConcurrentClientsTest(ConcurrentClientsTest):
+    storage = 'columnar'
+
+
+if __name__ == '__main__':
+    unittest.main()
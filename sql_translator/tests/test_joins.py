@@ -0,0 +1,143 @@
+"""JOIN 的执行策略"""
+
+import threading
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+HASH_JOIN = "SELECT * FROM a JOIN b ON a.x = b.x"
+NESTED_LOOP = "SELECT * FROM a JOIN b ON a.x < b.y"
+CROSS_JOIN = "SELECT * FROM a, b"
+
+
+class JoinStrategyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = SQLExecutor()
+        sql = self.executor.execute_sql
+        sql("CREATE TABLE a (x INT, y INT)")
+        sql("CREATE TABLE b (x INT, y INT)")
+        sql("INSERT INTO a VALUES (1, 2), (2, 3), (3, 4)")
+        sql("INSERT INTO b VALUES (1, 2), (2, 3)")
+
+    def tearDown(self):
+        self.executor.close()
+
+    def strategies(self, sql):
+        self.executor.execute_sql(sql)
+        return self.executor.get_join_strategies()
+
+    def test_reported_strategies(self):
+        self.assertEqual(self.strategies(HASH_JOIN), ['b: hash_join(build=right)'])
+        self.assertEqual(self.strategies(NESTED_LOOP), ['b: nested_loop'])
+        self.assertEqual(self.strategies(CROSS_JOIN), ['b: cross_join'])
+        self.assertEqual(self.strategies("SELECT * FROM a LEFT JOIN b ON a.x = b.x"),
+                         ['b: hash_join(build=right)'])
+        self.assertEqual(self.strategies("SELECT * FROM a"), [])
+
+    def test_transaction_and_iterator(self):
+        self.executor.execute_sql("BEGIN")
+        self.assertEqual(self.strategies(NESTED_LOOP), ['b: nested_loop'])
+        self.executor.execute_sql("ROLLBACK")
+        list(self.executor.execute_iter(CROSS_JOIN))
+        self.assertEqual(self.executor.get_join_strategies(), ['b: cross_join'])
+
+    def test_threads_do_not_see_each_other(self):
+        """并发执行的查询各自报告自己的策略"""
+        expected = {
+            HASH_JOIN: ['b: hash_join(build=right)'],
+            NESTED_LOOP: ['b: nested_loop'],
+            CROSS_JOIN: ['b: cross_join'],
+        }
+        errors = []
+        start = threading.Barrier(len(expected))
+
+        def client(sql):
+            start.wait()
+            for _ in range(300):
+                reported = self.strategies(sql)
+                if reported != expected[sql]:
+                    errors.append((sql, reported))
+                    return
+
+        threads = [threading.Thread(target=client, args=(sql,)) for sql in expected]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(self.executor.get_join_strategies(), [])
+
+
+class JoinOrderTest(unittest.TestCase):
+    """调整连接顺序的条件，以及调整后结果行的顺序"""
+
+    THREE_TABLES = "FROM a JOIN b ON a.x = b.x JOIN c ON b.z = c.z WHERE c.w < 3"
+
+    def setUp(self):
+        self.executor = SQLExecutor()
+        sql = self.executor.execute_sql
+        sql("CREATE TABLE a (x INT, y INT)")
+        sql("CREATE TABLE b (x INT, z INT)")
+        sql("CREATE TABLE c (z INT, w INT)")
+        self.a = [[i % 40, i] for i in range(200)]
+        self.b = [[i, i % 10] for i in range(40)]
+        self.c = [[i, i] for i in range(10)]
+        for name, rows in (('a', self.a), ('b', self.b), ('c', self.c)):
+            sql(f"INSERT INTO {name} VALUES " + ', '.join(f"({x}, {y})" for x, y in rows))
+
+    def tearDown(self):
+        self.executor.close()
+
+    def explain(self, sql):
+        return [line for line, in self.executor.execute_sql("EXPLAIN " + sql)]
+
+    def written_order(self):
+        """按书写顺序用嵌套循环连接三个表的结果"""
+        return [ra + rb + rc for ra in self.a for rb in self.b for rc in self.c
+                if ra[0] == rb[0] and rb[1] == rc[0] and rc[1] < 3]
+
+    def test_two_tables_keep_written_order(self):
+        """两表等值连接无论哪个表在前代价都相同，不调整顺序，在较小的一侧建哈希表"""
+        for sql in ("SELECT * FROM a JOIN b ON a.x = b.x",
+                    "SELECT COUNT(*) FROM a JOIN b ON a.x = b.x",
+                    "SELECT * FROM a JOIN b ON a.x = b.x LIMIT 5"):
+            with self.subTest(sql=sql):
+                self.executor.execute_sql(sql)
+                self.assertEqual(self.executor.get_join_strategies(), ['b: hash_join(build=right)'])
+        self.assertIn("LIMIT 5，取够行数后停止扫描",
+                      self.explain("SELECT * FROM a JOIN b ON a.x = b.x LIMIT 5"))
+
+    def test_reordered_rows_in_written_order(self):
+        self.assertEqual(self.executor.execute_sql("SELECT * " + self.THREE_TABLES),
+                         self.written_order())
+        self.assertEqual(self.executor.get_join_strategies(),
+                         ['c: hash_join(build=right)', 'a: hash_join(build=right)'])
+        self.assertIn("按书写顺序排列各表的列，结果行按书写顺序的各表行号排序",
+                      self.explain("SELECT * " + self.THREE_TABLES))
+
+    def test_aggregate_and_order_by_skip_written_order(self):
+        """有聚合或 ORDER BY 时调整顺序后不再按书写顺序排序"""
+        expected = self.written_order()
+        self.assertEqual(self.executor.execute_sql("SELECT COUNT(*) " + self.THREE_TABLES),
+                         [[len(expected)]])
+        self.assertEqual(self.executor.execute_sql("SELECT a.y " + self.THREE_TABLES + " ORDER BY a.y"),
+                         sorted([row[1]] for row in expected))
+        for sql in ("SELECT COUNT(*) " + self.THREE_TABLES,
+                    "SELECT a.y " + self.THREE_TABLES + " ORDER BY a.y"):
+            with self.subTest(sql=sql):
+                lines = self.explain(sql)
+                self.assertIn("按书写顺序排列各表的列", lines)
+                self.assertTrue(lines[0].startswith("扫描 b"))
+
+    def test_limit_keeps_written_order(self):
+        """需要还原书写顺序时，LIMIT 按书写顺序连接，取够行数就停止"""
+        sql = "SELECT * " + self.THREE_TABLES + " LIMIT 3"
+        self.assertEqual(self.executor.execute_sql(sql), self.written_order()[:3])
+        lines = self.explain(sql)
+        self.assertTrue(lines[0].startswith("扫描 a"))
+        self.assertIn("LIMIT 3，取够行数后停止扫描", lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
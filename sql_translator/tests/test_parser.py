@@ -0,0 +1,149 @@
+"""SQL解析器：接受和拒绝的语句"""
+
+import unittest
+
+from sql_translator.core import SQLExecutor, SQLParser
+from sql_translator.core.ast_nodes import Comparison, Insert, Not
+
+
+class ParserAcceptTest(unittest.TestCase):
+    """能够解析的语句"""
+
+    def setUp(self):
+        self.parser = SQLParser()
+
+    def parse(self, sql):
+        parsed = self.parser.parse_sql(sql)
+        self.assertNotIn(parsed['type'], ('ERROR', 'UNKNOWN'), parsed.get('error'))
+        return parsed['statement']
+
+    def test_statements(self):
+        cases = {
+            "CREATE TABLE t (id INT, price DECIMAL(10,2), name VARCHAR(20))": 'CREATE_TABLE',
+            "INSERT INTO t VALUES (1, 2.5, 'a'), (-2, 3, 'b')": 'INSERT',
+            "SELECT * FROM t WHERE id >= 1 AND (name = 'a' OR NOT price < 2)": 'SELECT',
+            "SELECT name, COUNT(*) FROM t GROUP BY name HAVING COUNT(*) > 1 ORDER BY name DESC": 'SELECT',
+            "SELECT * FROM t LIMIT 10 OFFSET 5": 'SELECT',
+            "SELECT * FROM a JOIN b ON a.id = b.id LEFT JOIN c ON b.id = c.id": 'SELECT',
+            "UPDATE t SET name = 'x', price = 1 WHERE id <> 3": 'UPDATE',
+            "DELETE FROM t WHERE id = ?": 'DELETE',
+            "ALTER TABLE t ADD COLUMN age INT": 'ALTER_TABLE',
+            "ALTER TABLE t DROP age": 'ALTER_TABLE',
+            "CREATE INDEX i ON t (id)": 'CREATE_INDEX',
+            "DROP INDEX i ON t": 'DROP_INDEX',
+            "DROP TABLE t": 'DROP_TABLE',
+            "SHOW TABLES": 'SHOW_TABLES',
+            "EXPLAIN ANALYZE SELECT * FROM t": 'EXPLAIN',
+            "ANALYZE t": 'ANALYZE',
+            "BEGIN TRANSACTION": 'BEGIN',
+            "COMMIT": 'COMMIT',
+            "ROLLBACK WORK": 'ROLLBACK',
+        }
+        for sql, expected in cases.items():
+            with self.subTest(sql=sql):
+                self.assertEqual(self.parse(sql).type, expected)
+
+    def test_comments_and_case(self):
+        statement = self.parse("select /* 注释 */ id from t -- 行尾注释\n where id = 1;")
+        self.assertEqual(statement.table, 't')
+        self.assertEqual(self.parser.parse_sql("-- 只有注释")['type'], 'COMMENT')
+
+    def test_remove_comments(self):
+        sql = "  SELECT a -- 行尾注释\nFROM t /* 块注释 */ WHERE s = '-- 不是注释' AND q = '/*x*/'  "
+        self.assertEqual(self.parser.remove_comments(sql),
+                         "SELECT a  \nFROM t   WHERE s = '-- 不是注释' AND q = '/*x*/'")
+        self.assertEqual(self.parser.remove_comments("SELECT 1 /* 没有结束"), "SELECT 1  ")
+
+    def test_string_literals(self):
+        statement = self.parse("INSERT INTO t VALUES ('it''s', 'a;b', '-- 不是注释')")
+        self.assertEqual([value.value for value in statement.rows[0]], ["it's", 'a;b', '-- 不是注释'])
+
+    def test_like(self):
+        where = self.parse("SELECT * FROM t WHERE name LIKE 'a%'").where
+        self.assertEqual(where, Comparison(where.left, 'LIKE', where.right))
+        where = self.parse("SELECT * FROM t WHERE name NOT LIKE '_b'").where
+        self.assertEqual(where.op, 'NOT LIKE')
+        where = self.parse("SELECT * FROM t WHERE NOT name LIKE 'a%'").where
+        self.assertIsInstance(where, Not)
+
+    def test_insert_column_list(self):
+        statement = self.parse("INSERT INTO t (name, id) VALUES ('a', 1)")
+        self.assertIsInstance(statement, Insert)
+        self.assertEqual(statement.columns, ('name', 'id'))
+        self.assertIsNone(self.parse("INSERT INTO t VALUES (1)").columns)
+
+    def test_non_reserved_keywords_as_names(self):
+        statement = self.parse("CREATE TABLE index (desc INT, offset INT, add VARCHAR(5), tables INT)")
+        self.assertEqual([column.name for column in statement.columns],
+                         ['desc', 'offset', 'add', 'tables'])
+        statement = self.parse("SELECT desc FROM index WHERE like LIKE 'x' ORDER BY desc DESC LIMIT 1")
+        self.assertTrue(statement.order_by[0].desc)
+
+    def test_parameters(self):
+        parsed = self.parser.parse_sql("SELECT * FROM t WHERE a = :a AND b = :b AND c = :a")
+        self.assertEqual(parsed['parameters'], ('a', 'b'))
+
+
+class ParserRejectTest(unittest.TestCase):
+    """语法错误返回 ERROR 和错误信息，不抛出异常"""
+
+    def test_syntax_errors(self):
+        parser = SQLParser()
+        cases = [
+            "SELECT FROM t",
+            "SELECT * FROM t WHERE",
+            "SELECT * FROM t WHERE name LIKE",
+            "SELECT * FROM t WHERE id",
+            "SELECT * FROM t LIMIT -1",
+            "INSERT INTO t VALUES 1, 2",
+            "INSERT INTO t () VALUES (1)",
+            "UPDATE t SET name 'x'",
+            "DELETE t WHERE id = 1",
+            "CREATE TABLE select (id INT)",
+            "SELECT * FROM t WHERE name = 'unterminated",
+            "SELECT * FROM t WHERE a = ? AND b = :b",
+            "SELECT SUM(*) FROM t",
+            "SELECT * FROM t WHERE COUNT(*) > 1",
+            "SELECT * FROM t extra",
+        ]
+        for sql in cases:
+            with self.subTest(sql=sql):
+                parsed = parser.parse_sql(sql)
+                self.assertEqual(parsed['type'], 'ERROR')
+                self.assertTrue(parsed['error'])
+
+    def test_unknown_statement(self):
+        self.assertEqual(SQLParser().parse_sql("VACUUM")['type'], 'UNKNOWN')
+
+
+class LikeAndColumnListTest(unittest.TestCase):
+    """LIKE 与 INSERT 列清单的执行结果，行式和列式存储相同"""
+
+    def check(self, storage):
+        executor = SQLExecutor(storage=storage)
+        executor.execute_sql("CREATE TABLE t (id INT, name VARCHAR(20), desc INT)")
+        executor.execute_sql("INSERT INTO t VALUES (1, 'apple', 1), (2, 'Apricot', 2), (3, 'banana', 3)")
+        self.assertEqual(executor.execute_sql("INSERT INTO t (name, id) VALUES ('a_c', 4)"),
+                         "向表 t 插入数据成功")
+        self.assertEqual(executor.execute_sql("SELECT id FROM t WHERE name LIKE 'a%'"), [[1], [4]])
+        self.assertEqual(executor.execute_sql("SELECT id FROM t WHERE name LIKE 'a_c'"), [[4]])
+        self.assertEqual(executor.execute_sql("SELECT id FROM t WHERE name NOT LIKE '%an%'"),
+                         [[1], [2], [4]])
+        self.assertEqual(executor.execute_sql("SELECT name, desc FROM t WHERE id = 4"), [['a_c', '']])
+        self.assertIn("没有列", executor.execute_sql("INSERT INTO t (nope) VALUES (1)"))
+        self.assertIn("重复", executor.execute_sql("INSERT INTO t (id, id) VALUES (1, 2)"))
+        self.assertIn("不匹配", executor.execute_sql("INSERT INTO t (id, name) VALUES (1)"))
+        insert = executor.prepare("INSERT INTO t (desc, id) VALUES (?, ?)")
+        insert.execute((50, 5))
+        self.assertEqual(executor.execute_sql("SELECT id, name, desc FROM t WHERE id = 5"),
+                         [[5, '', 50]])
+
+    def test_row(self):
+        self.check('row')
+
+    def test_columnar(self):
+        self.check('columnar')
+
+
+if __name__ == '__main__':
+    unittest.main()
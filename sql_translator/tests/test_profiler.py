@@ -0,0 +1,95 @@
+"""查询剖析（EXPLAIN ANALYZE / SQLExecutor.profile）：各阶段的行数与耗时"""
+
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+JOIN_QUERY = "SELECT a.x, b.z FROM a JOIN b ON a.x = b.x WHERE a.y < 5"
+
+
+class ProfilerTest(unittest.TestCase):
+    """a 有100行（x 为 0..99，y = x % 10），b 有40行（x 为 0..19，各两行）：
+    过滤后 a 剩50行，其中 x < 20 的10行各连接到 b 的两行，结果20行"""
+
+    storage = 'row'
+
+    def setUp(self):
+        self.executor = SQLExecutor(storage=self.storage)
+        sql = self.executor.execute_sql
+        sql("CREATE TABLE a (x INT, y INT)")
+        sql("CREATE TABLE b (x INT, z VARCHAR(5))")
+        self.executor.executemany("INSERT INTO a VALUES (?, ?)", [(i, i % 10) for i in range(100)])
+        self.executor.executemany("INSERT INTO b VALUES (?, ?)", [(i % 20, f"z{i}") for i in range(40)])
+
+    def tearDown(self):
+        self.executor.close()
+
+    def stages(self, profile):
+        return {(stage['stage'], stage['detail']): stage for stage in profile['stages']}
+
+    def test_filter_and_join_row_counts(self):
+        profile = self.executor.profile(JOIN_QUERY)
+        self.assertEqual(profile['rows_returned'], 20)
+        stages = self.stages(profile)
+        rows = {key: (stage['rows_in'], stage['rows_out']) for key, stage in stages.items()}
+        self.assertEqual(rows[('scan', 'a')], (0, 100))
+        self.assertEqual(rows[('filter', 'a.y < 5')], (100, 50))
+        self.assertEqual(rows[('scan', 'b')], (0, 40))
+        self.assertEqual(rows[('hash_join', 'b')], (90, 20))
+        self.assertEqual(rows[('project', 'a.x, b.z')], (20, 20))
+
+        # 连接阶段的输入是过滤和扫描 b 两个阶段
+        join = stages[('hash_join', 'b')]
+        inputs = {profile['stages'][i]['stage'] for i in join['inputs']}
+        self.assertEqual(inputs, {'filter', 'scan'})
+
+    def test_timings(self):
+        profile = self.executor.profile(JOIN_QUERY)
+        for key in ('parse_ms', 'build_ms', 'execute_ms', 'total_ms'):
+            self.assertGreaterEqual(profile[key], 0.0)
+        stage_ms = sum(stage['time_ms'] for stage in profile['stages'])
+        self.assertTrue(all(stage['time_ms'] >= 0 for stage in profile['stages']))
+        # 各阶段的耗时不含上游阶段，合计不超过整体执行时间
+        self.assertLessEqual(stage_ms, profile['execute_ms'] + 1.0)
+        self.assertLessEqual(profile['execute_ms'], profile['total_ms'])
+
+    def test_explain_analyze_output(self):
+        lines = [row[0] for row in self.executor.execute_sql("EXPLAIN ANALYZE " + JOIN_QUERY)]
+        actual = lines[lines.index('实际执行（各阶段的耗时不含上游阶段）：') + 1:]
+        self.assertTrue(any(line.startswith('过滤 a.y < 5：') and line.endswith('输入 100 行，输出 50 行')
+                            for line in actual), actual)
+        self.assertTrue(any(line.startswith('哈希连接 b：') and line.endswith('输入 90 行，输出 20 行')
+                            for line in actual), actual)
+        self.assertTrue(actual[-1].startswith('合计：') and actual[-1].endswith('返回 20 行'), actual[-1])
+        # 计划部分与 EXPLAIN 相同
+        plan = [row[0] for row in self.executor.execute_sql("EXPLAIN " + JOIN_QUERY)]
+        self.assertEqual(lines[:len(plan)], plan)
+
+    def test_limit_stops_scan(self):
+        stages = self.stages(self.executor.profile("SELECT x FROM a WHERE y = 3 LIMIT 2"))
+        self.assertEqual(stages[('limit', '2 OFFSET 0')]['rows_out'], 2)
+        self.assertLess(stages[('scan', 'a')]['rows_out'], 100)
+
+    def test_group_by(self):
+        profile = self.executor.profile("SELECT y, COUNT(*) FROM a WHERE x >= 50 GROUP BY y")
+        self.assertEqual(profile['rows_returned'], 10)
+        aggregate = [stage for stage in profile['stages'] if stage['rows_in'] == 50 and stage['rows_out'] == 10]
+        self.assertTrue(aggregate, profile['stages'])
+
+    def test_memory(self):
+        profile = self.executor.profile(JOIN_QUERY, memory=True)
+        self.assertGreater(profile['peak_alloc_bytes'], 0)
+        self.assertTrue(all('alloc_peak_bytes' in stage for stage in profile['stages']))
+
+    def test_errors(self):
+        self.assertEqual(self.executor.profile("DELETE FROM a"), "错误：只能剖析 SELECT 语句")
+        self.assertTrue(self.executor.profile("SELECT * FROM").startswith("SQL语法错误"))
+        self.assertEqual(self.executor.execute_sql("SELECT COUNT(*) FROM a"), [[100]])
+
+
+class ColumnarProfilerTest(ProfilerTest):
+    storage = 'columnar'
+
+
+if __name__ == '__main__':
+    unittest.main()
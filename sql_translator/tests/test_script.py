@@ -0,0 +1,118 @@
+"""SQL脚本：流式分割语句（块边界上的引号、注释和分号）与命令行执行文件"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from sql_translator.cli.main import execute_sql_file
+from sql_translator.core import SQLExecutor
+from sql_translator.core.parser import iter_sql_statements
+from sql_translator.utils import SQLResultDisplay
+
+SCRIPT = (
+    "CREATE TABLE t (a INT, s VARCHAR(20));\n"
+    "INSERT INTO t VALUES (1, 'x;y');\n"
+    "INSERT INTO t VALUES (2, 'it''s; ok');\n"
+    "INSERT INTO t VALUES (3, 'back\\'slash;');\n"
+    "-- 注释中的 ; 和 ' 不起作用\n"
+    "SELECT * FROM t WHERE a > -1;\n"
+    "/* 块注释 ; 'q' * / ** */ SELECT \"d;q\" FROM t;\n"
+    ";;  \n"
+    "UPDATE t SET a = 5 - 1 WHERE s = 'a/b'"
+)
+
+EXPECTED = [
+    "CREATE TABLE t (a INT, s VARCHAR(20))",
+    "INSERT INTO t VALUES (1, 'x;y')",
+    "INSERT INTO t VALUES (2, 'it''s; ok')",
+    "INSERT INTO t VALUES (3, 'back\\'slash;')",
+    "-- 注释中的 ; 和 ' 不起作用\nSELECT * FROM t WHERE a > -1",
+    "/* 块注释 ; 'q' * / ** */ SELECT \"d;q\" FROM t",
+    "UPDATE t SET a = 5 - 1 WHERE s = 'a/b'",
+]
+
+
+def split(text, chunk_size):
+    return list(iter_sql_statements(io.StringIO(text), chunk_size))
+
+
+class IterSqlStatementsTest(unittest.TestCase):
+
+    def test_every_chunk_size(self):
+        """任意块大小（包括每块一个字符）的分割结果都相同"""
+        for chunk_size in range(1, len(SCRIPT) + 2):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(split(SCRIPT, chunk_size), EXPECTED)
+
+    def test_boundary_tokens(self):
+        """块恰好在 ''、反斜杠、-- 、/* 和 */ 的中间断开"""
+        cases = {
+            "SELECT 'a''b;c'; SELECT 2": ["SELECT 'a''b;c'", "SELECT 2"],
+            "SELECT 'a\\';b'; SELECT 2": ["SELECT 'a\\';b'", "SELECT 2"],
+            "SELECT 1 --;x\n; SELECT 2": ["SELECT 1 --;x", "SELECT 2"],
+            "SELECT 1 /*;*/; SELECT 2": ["SELECT 1 /*;*/", "SELECT 2"],
+            "SELECT 1 /* ;**/; SELECT 2": ["SELECT 1 /* ;**/", "SELECT 2"],
+            "SELECT 5 - 1; SELECT 4 / 2": ["SELECT 5 - 1", "SELECT 4 / 2"],
+            "SELECT 1 -": ["SELECT 1 -"],
+        }
+        for text, expected in cases.items():
+            for chunk_size in range(1, len(text) + 1):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    self.assertEqual(split(text, chunk_size), expected)
+
+    def test_unterminated(self):
+        """没有结束的字符串和注释到脚本末尾为止，交给解析器报告"""
+        for chunk_size in (1, 3, 100):
+            self.assertEqual(split("SELECT 1; SELECT 'a;b", chunk_size), ["SELECT 1", "SELECT 'a;b"])
+            self.assertEqual(split("SELECT 1; /* a;b", chunk_size), ["SELECT 1", "/* a;b"])
+
+    def test_empty(self):
+        self.assertEqual(split("", 4), [])
+        self.assertEqual(split(" ;\n; ", 1), [])
+
+    def test_execute_batch_iter(self):
+        executor = SQLExecutor()
+        results = list(executor.execute_batch_iter(io.StringIO(SCRIPT), chunk_size=5))
+        self.assertEqual(len(results), len(EXPECTED))
+        self.assertEqual(executor.execute_sql("SELECT s FROM t ORDER BY a"),
+                         [['x;y'], ["it's; ok"], ["back'slash;"]])
+        self.assertEqual(len(results[4]), 3)
+
+
+class ExecuteSqlFileTest(unittest.TestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sql')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def run_file(self, content, path=None):
+        with open(self.path, 'wb') as f:
+            f.write(content)
+        executor = SQLExecutor()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            execute_sql_file(executor, path or self.path, SQLResultDisplay(), quiet=True)
+        return executor, output.getvalue()
+
+    def test_runs_statements(self):
+        executor, output = self.run_file(SCRIPT.encode('utf-8'))
+        self.assertIn(f"共执行 {len(EXPECTED)} 条语句", output)
+        self.assertEqual(executor.execute_sql("SELECT COUNT(*) FROM t"), [[3]])
+
+    def test_undecodable_file(self):
+        with self.assertRaises(SystemExit) as raised:
+            self.run_file(b"SELECT 1; SELECT '\xff\xfe';")
+        self.assertEqual(raised.exception.code, 1)
+
+    def test_missing_file(self):
+        with self.assertRaises(SystemExit):
+            self.run_file(b"", path=self.path + '.missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
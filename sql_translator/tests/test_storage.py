@@ -0,0 +1,178 @@
+"""行式与列式存储（包括向量化执行和并行扫描）对同样的语句返回同样的结果"""
+
+import random
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from sql_translator.core import SQLExecutor
+from sql_translator.core.parallel import table_partition
+
+ROWS = 600
+
+# 数值都是 0.25 的倍数：分段求和（并行扫描）与逐行求和的结果完全相同
+SETUP = [
+    "CREATE TABLE items (id INT, cat VARCHAR(10), price DECIMAL(10,2), qty INT, note VARCHAR(20))",
+    "CREATE TABLE cats (cat VARCHAR(10), label VARCHAR(20), rank INT)",
+    "INSERT INTO cats VALUES ('a', 'Alpha', 3), ('b', 'Beta', 1), ('c', 'Gamma', 2), ('z', 'Zeta', 4)",
+]
+
+MUTATIONS = [
+    "CREATE INDEX iq ON items (qty)",
+    "UPDATE items SET price = 99.75 WHERE qty = 7",
+    "UPDATE items SET note = 'updated' WHERE id > 500 AND cat = 'b'",
+    "DELETE FROM items WHERE qty = 3 OR id < 10",
+    "ALTER TABLE items ADD extra INT",
+    "UPDATE items SET extra = 1 WHERE cat = 'a'",
+    "INSERT INTO items VALUES (1000, 'd', 0.5, 1, 'late', 2)",
+    "DELETE FROM items WHERE note LIKE 'n1%'",
+]
+
+QUERIES = [
+    "SELECT * FROM items",
+    "SELECT id, price FROM items WHERE price > 50",
+    "SELECT id FROM items WHERE qty >= 5 AND price < 30.5",
+    "SELECT id FROM items WHERE cat = 'a' OR NOT qty != 2",
+    "SELECT id, note FROM items WHERE note LIKE '%5' AND cat <> 'c'",
+    "SELECT id FROM items WHERE qty = 7",
+    "SELECT id FROM items WHERE extra = 1",
+    "SELECT id, qty FROM items ORDER BY qty DESC, id LIMIT 15 OFFSET 3",
+    "SELECT note, price FROM items ORDER BY note, price DESC LIMIT 20",
+    "SELECT id FROM items WHERE price > 10 LIMIT 7",
+    "SELECT cat, COUNT(*), SUM(price), AVG(qty), MIN(note), MAX(price) FROM items GROUP BY cat",
+    "SELECT qty, COUNT(*) FROM items WHERE price < 40 GROUP BY qty HAVING COUNT(*) > 20 ORDER BY qty",
+    "SELECT COUNT(*), SUM(qty), MIN(price), MAX(id) FROM items",
+    "SELECT COUNT(extra) FROM items WHERE cat = 'b'",
+    "SELECT items.id, cats.label FROM items JOIN cats ON items.cat = cats.cat WHERE items.qty > 8",
+    "SELECT cats.label, COUNT(*) FROM items JOIN cats ON items.cat = cats.cat "
+    "GROUP BY cats.label ORDER BY COUNT(*) DESC",
+    "SELECT cats.cat, items.id FROM cats LEFT JOIN items ON cats.cat = items.cat AND items.id > 590",
+    "SELECT items.id FROM items, cats WHERE items.cat = cats.cat AND cats.rank < 2 AND items.price > 90",
+    "SELECT * FROM items WHERE id = 1000",
+]
+
+
+def items(seed=7):
+    rng = random.Random(seed)
+    return [(i, rng.choice('abcd'), rng.randint(0, 400) / 4, rng.randint(0, 9), f"n{rng.randint(0, 99)}")
+            for i in range(ROWS)]
+
+
+class StorageEquivalenceTest(unittest.TestCase):
+
+    # 名称 -> SQLExecutor 的参数；第一个作为参照
+    CONFIGS = {
+        'row': {'storage': 'row'},
+        'columnar': {'storage': 'columnar'},
+        'columnar-rows': {'storage': 'columnar', 'vectorized': False},
+        'row-parallel': {'storage': 'row', 'parallel_workers': 2},
+        'columnar-parallel': {'storage': 'columnar', 'parallel_workers': 2},
+    }
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executors = {}
+        cls.mutation_results = {}
+        for name, options in cls.CONFIGS.items():
+            executor = cls.executors[name] = SQLExecutor(**options)
+            if executor.parallel is not None:
+                # 测试数据较小，降低并行扫描的行数下限
+                executor.parallel.min_rows = 100
+            for sql in SETUP:
+                executor.execute_sql(sql)
+            executor.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)", items())
+            cls.mutation_results[name] = [executor.execute_sql(sql) for sql in MUTATIONS]
+
+    @classmethod
+    def tearDownClass(cls):
+        for executor in cls.executors.values():
+            executor.close()
+
+    def compare(self, sql):
+        reference, *others = self.executors.items()
+        expected = reference[1].execute_sql(sql)
+        self.assertIsInstance(expected, list, expected)
+        for name, executor in others:
+            with self.subTest(sql=sql, executor=name):
+                self.assertEqual(executor.execute_sql(sql), expected)
+
+    def test_mutations(self):
+        reference, *others = self.mutation_results.values()
+        for results in others:
+            self.assertEqual(results, reference)
+
+    def test_queries(self):
+        for sql in QUERIES:
+            self.compare(sql)
+
+    def test_prepared_queries(self):
+        for params in [(0, 'a'), (5, 'b'), (9, 'zz')]:
+            results = [executor.prepare("SELECT id, price FROM items WHERE qty > ? AND cat = ?")
+                       .execute(params) for executor in self.executors.values()]
+            for result in results[1:]:
+                self.assertEqual(result, results[0])
+
+    def test_iterator(self):
+        sql = "SELECT id, note FROM items WHERE price >= 25 ORDER BY note, id"
+        expected = self.executors['row'].execute_sql(sql)
+        for name, executor in self.executors.items():
+            with self.subTest(executor=name):
+                self.assertEqual(list(executor.execute_iter(sql)), expected)
+
+    def test_parallel_scans_ran(self):
+        """开启并行扫描的执行器确实在进程池中执行了扫描"""
+        for name, executor in self.executors.items():
+            if executor.parallel is not None:
+                with self.subTest(executor=name):
+                    self.assertTrue(executor.parallel.enabled(executor.data['items']))
+                    self.assertIsNotNone(executor.parallel.pool)
+
+
+class PersistentParallelScanTest(unittest.TestCase):
+    """内存映射的表并行扫描：各段按列传递字节，工作进程解码，结果与串行扫描相同"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.executor = SQLExecutor(path=self.path, parallel_workers=2, vectorized=False,
+                                    compact_threshold=1.0)
+        self.executor.parallel.min_rows = 100
+        self.serial = SQLExecutor(storage='row')
+        for executor in (self.executor, self.serial):
+            for sql in SETUP:
+                executor.execute_sql(sql)
+            executor.executemany("INSERT INTO items VALUES (?, ?, ?, ?, ?)", items())
+        self.executor.checkpoint()
+        for executor in (self.executor, self.serial):
+            executor.execute_sql("DELETE FROM items WHERE qty = 3")
+
+    def tearDown(self):
+        self.executor.close()
+        self.serial.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def test_partition_is_column_bytes(self):
+        columns, rows, live = table_partition(self.executor.data['items'], 100, 200)
+        self.assertIsNone(rows)
+        self.assertEqual(len(live), 100)
+        self.assertIsInstance(columns[0], array)
+        # 字符串列为文件中原始的偏移量和 UTF-8 文本
+        offsets, blob = columns[1]
+        self.assertEqual((len(offsets), type(blob)), (101, bytes))
+
+    def test_queries(self):
+        for sql in QUERIES:
+            if 'extra' in sql:
+                continue
+            with self.subTest(sql=sql):
+                self.assertEqual(self.executor.execute_sql(sql), self.serial.execute_sql(sql))
+        self.assertIsNotNone(self.executor.parallel.pool)
+
+    def test_delete(self):
+        sql = "DELETE FROM items WHERE note LIKE 'n1%'"
+        self.assertEqual(self.executor.execute_sql(sql), self.serial.execute_sql(sql))
+        self.assertEqual(self.executor.execute_sql(QUERIES[0]), self.serial.execute_sql(QUERIES[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+"""语句跟踪：每条语句执行结束后调用一次 tracer，报告语句类型和行数"""
+
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+ROWS = 50
+
+
+class TracingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.events = []
+        self.executor = SQLExecutor(tracer=self.events.append)
+        self.executor.execute_sql("CREATE TABLE t (id INT, name VARCHAR(10))")
+        self.executor.executemany("INSERT INTO t VALUES (?, ?)",
+                                  [(i, f"n{i % 5}") for i in range(ROWS)])
+        self.executor.execute_sql("CREATE INDEX iid ON t (id)")
+        self.events.clear()
+
+    def tearDown(self):
+        self.executor.close()
+
+    def single_event(self):
+        self.assertEqual(len(self.events), 1, self.events)
+        event = self.events.pop()
+        for key in ('parse_ms', 'plan_ms', 'execute_ms'):
+            self.assertGreaterEqual(event[key], 0.0)
+        return event
+
+    def assert_event(self, sql, statement_type, returned, scanned=None):
+        self.executor.execute_sql(sql)
+        event = self.single_event()
+        self.assertEqual((event['type'], event['sql'], event['rows_returned']),
+                         (statement_type, sql, returned))
+        if scanned is not None:
+            self.assertEqual(event['rows_scanned'], scanned)
+        return event
+
+    def test_statement_types(self):
+        self.assert_event("SELECT * FROM t WHERE name = 'n1'", 'SELECT', ROWS // 5, scanned=ROWS)
+        self.assert_event("SELECT * FROM t WHERE id = 7", 'SELECT', 1, scanned=1)
+        self.assert_event("SELECT name, COUNT(*) FROM t GROUP BY name", 'SELECT', 5, scanned=ROWS)
+        self.assert_event("INSERT INTO t VALUES (100, 'x')", 'INSERT', 0)
+        self.assert_event("UPDATE t SET name = 'y' WHERE id = 100", 'UPDATE', 0, scanned=1)
+        self.assert_event("DELETE FROM t WHERE id >= 100", 'DELETE', 0, scanned=1)
+        self.assert_event("SHOW TABLES", 'SHOW_TABLES', 0)
+        self.assert_event("SELEC * FROM t", 'UNKNOWN', 0)
+        self.assert_event("SELECT * FROM", 'ERROR', 0)
+
+    def test_prepared_and_executemany(self):
+        query = self.executor.prepare("SELECT id FROM t WHERE id < ?")
+        self.assertEqual(len(query.execute((3,))), 3)
+        event = self.single_event()
+        self.assertEqual((event['type'], event['rows_returned'], event['parse_ms']), ('SELECT', 3, 0.0))
+
+        self.executor.executemany("INSERT INTO t VALUES (?, ?)", [(200, 'a'), (201, 'b')])
+        self.assertEqual(self.single_event()['type'], 'INSERT')
+
+    def test_execute_iter(self):
+        rows = list(self.executor.execute_iter("SELECT id FROM t WHERE id >= 10"))
+        self.assertEqual(len(rows), ROWS - 10)
+        event = self.single_event()
+        self.assertEqual((event['type'], event['rows_returned']), ('SELECT', ROWS - 10))
+
+    def test_execute_iter_closed_early(self):
+        rows = self.executor.execute_iter("SELECT id FROM t")
+        self.assertEqual([next(rows), next(rows)], [[0], [1]])
+        self.assertEqual(self.events, [])
+        rows.close()
+        event = self.single_event()
+        self.assertEqual(event['rows_returned'], 2)
+        # 没有排序时只读取了需要的行
+        self.assertLess(event['rows_scanned'], ROWS)
+        rows.close()
+        self.assertEqual(self.events, [])
+
+    def test_execute_iter_other_statements(self):
+        self.assertEqual(list(self.executor.execute_iter("DELETE FROM t WHERE id = 3")),
+                         ["从表 t 删除数据成功"])
+        self.assertEqual(self.single_event()['type'], 'DELETE')
+
+    def test_transaction_statements(self):
+        for sql, statement_type in [("BEGIN", 'BEGIN'), ("SELECT * FROM t", 'SELECT'),
+                                    ("ROLLBACK", 'ROLLBACK')]:
+            self.executor.execute_sql(sql)
+            self.assertEqual(self.single_event()['type'], statement_type)
+
+    def test_no_tracer(self):
+        executor = SQLExecutor()
+        executor.execute_sql("CREATE TABLE t (id INT)")
+        self.assertEqual(list(executor.execute_iter("SELECT * FROM t")), [])
+        self.assertEqual(self.events, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,205 @@
+"""事务：快照隔离、回滚和提交冲突（先提交者获胜）"""
+
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sql_translator.core import SQLExecutor
+
+COMMITTED = "提交事务成功"
+
+
+def in_thread(function, *args):
+    """在另一个线程中执行 function 并返回结果（事务属于线程）"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function(*args)))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class SnapshotIsolationTest(unittest.TestCase):
+
+    storage = 'row'
+
+    def setUp(self):
+        self.executor = SQLExecutor(storage=self.storage)
+        self.sql = self.executor.execute_sql
+        self.sql("CREATE TABLE t (id INT, v INT)")
+        self.sql("CREATE TABLE u (id INT)")
+        self.sql("INSERT INTO t VALUES (1, 10), (2, 20), (3, 30)")
+
+    def tearDown(self):
+        self.executor.close()
+
+    def other(self, sql):
+        """在另一个线程中（事务之外）执行一条语句"""
+        return in_thread(self.sql, sql)
+
+    def test_uncommitted_changes_are_invisible(self):
+        self.assertEqual(self.sql("BEGIN"), "开始事务")
+        self.sql("INSERT INTO t VALUES (4, 40)")
+        self.sql("UPDATE t SET v = 11 WHERE id = 1")
+        self.sql("DELETE FROM t WHERE id = 2")
+        expected = [[1, 11], [3, 30], [4, 40]]
+        self.assertEqual(self.sql("SELECT * FROM t"), expected)
+        self.assertEqual(self.other("SELECT * FROM t"), [[1, 10], [2, 20], [3, 30]])
+        self.assertEqual(self.sql("COMMIT"), COMMITTED)
+        self.assertEqual(self.other("SELECT * FROM t"), expected)
+
+    def test_transaction_reads_its_snapshot(self):
+        self.sql("BEGIN")
+        self.assertEqual(self.sql("SELECT COUNT(*) FROM t"), [[3]])
+        self.other("INSERT INTO t VALUES (4, 40)")
+        self.other("UPDATE t SET v = 0 WHERE id = 1")
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 10], [2, 20], [3, 30]])
+        self.assertEqual(self.sql("COMMIT"), COMMITTED)
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 0], [2, 20], [3, 30], [4, 40]])
+
+    def test_rollback(self):
+        self.sql("BEGIN")
+        self.sql("DELETE FROM t")
+        self.sql("INSERT INTO u VALUES (1)")
+        self.assertEqual(self.sql("ROLLBACK"), "回滚事务成功")
+        self.assertEqual(self.sql("SELECT COUNT(*) FROM t"), [[3]])
+        self.assertEqual(self.sql("SELECT * FROM u"), [])
+
+    def test_write_conflict(self):
+        self.sql("BEGIN")
+        self.sql("UPDATE t SET v = 99 WHERE id = 1")
+        self.sql("INSERT INTO u VALUES (1)")
+        self.other("UPDATE t SET v = 50 WHERE id = 3")
+        result = self.sql("COMMIT")
+        self.assertTrue(result.startswith("提交失败：表 t"), result)
+        # 事务的全部修改都被回滚，包括没有冲突的表
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 10], [2, 20], [3, 50]])
+        self.assertEqual(self.sql("SELECT * FROM u"), [])
+        self.assertIn("没有进行中的事务", self.sql("COMMIT"))
+
+    def test_conflict_between_two_transactions(self):
+        self.sql("BEGIN")
+        self.sql("UPDATE t SET v = 1 WHERE id = 1")
+
+        def second():
+            return [self.sql("BEGIN"), self.sql("DELETE FROM t WHERE id = 2"), self.sql("COMMIT")]
+        self.assertEqual(in_thread(second)[-1], COMMITTED)
+        self.assertTrue(self.sql("COMMIT").startswith("提交失败"))
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 10], [3, 30]])
+
+    def test_dropped_table_conflicts(self):
+        self.sql("BEGIN")
+        self.sql("INSERT INTO u VALUES (1)")
+        self.other("DROP TABLE u")
+        self.assertTrue(self.sql("COMMIT").startswith("提交失败"))
+        self.assertEqual(self.sql("SHOW TABLES"), [['t']])
+
+    def test_no_conflict_on_other_tables_or_reads(self):
+        self.sql("BEGIN")
+        self.sql("INSERT INTO u VALUES (1)")
+        self.assertEqual(self.sql("SELECT COUNT(*) FROM t"), [[3]])
+        self.other("DELETE FROM t WHERE id = 1")
+        self.assertEqual(self.sql("COMMIT"), COMMITTED)
+        self.assertEqual(self.sql("SELECT * FROM u"), [[1]])
+        self.assertEqual(self.sql("SELECT COUNT(*) FROM t"), [[2]])
+
+    def test_prepared_insert_uses_the_transaction(self):
+        insert = self.executor.prepare("INSERT INTO t VALUES (?, ?)")
+        insert.execute((4, 40))
+        self.sql("BEGIN")
+        insert.execute((5, 50))
+        in_thread(insert.execute, (6, 60))
+        self.assertEqual(self.other("SELECT id FROM t"), [[1], [2], [3], [4], [6]])
+        self.assertEqual(self.sql("SELECT id FROM t"), [[1], [2], [3], [4], [5]])
+        self.assertTrue(self.sql("ROLLBACK"))
+        self.assertEqual(self.sql("SELECT id FROM t"), [[1], [2], [3], [4], [6]])
+
+    def test_deferred_snapshot(self):
+        """事务还没有读取的表被其他线程修改：事务看到的仍是 BEGIN 时的数据"""
+        self.sql("BEGIN")
+        self.other("INSERT INTO t VALUES (4, 40)")
+        self.other("UPDATE t SET v = 0 WHERE id = 1")
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 10], [2, 20], [3, 30]])
+        self.sql("DELETE FROM t WHERE id = 3")
+        self.assertTrue(self.sql("COMMIT").startswith("提交失败：表 t"))
+        self.sql("BEGIN")
+        self.other("DELETE FROM t WHERE id = 4")
+        self.sql("INSERT INTO u VALUES (1)")
+        self.assertEqual(self.sql("COMMIT"), COMMITTED)
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 0], [2, 20], [3, 30]])
+
+    def test_writes_stop_copying_after_snapshots_end(self):
+        """快照都释放后，已提交的表的修改不再复制数据，事务期间的修改写回原来的存储"""
+        table = self.executor.data['t']
+        stored = table.rows if self.storage == 'row' else table.columns[0]
+        self.sql("BEGIN")
+        self.assertEqual(self.sql("SELECT COUNT(*) FROM t"), [[3]])
+        self.other("INSERT INTO t VALUES (4, 40)")
+        self.other("UPDATE t SET v = 0 WHERE id = 1")
+        self.assertEqual(self.sql("SELECT * FROM t"), [[1, 10], [2, 20], [3, 30]])
+        self.sql("ROLLBACK")
+        self.assertEqual(list(self.executor.execute_iter("SELECT id FROM t WHERE v = 0")), [[1]])
+        self.sql("INSERT INTO t VALUES (5, 50)")
+        self.assertIsNone(table.sharers)
+        self.assertIs(table.rows if self.storage == 'row' else table.columns[0], stored)
+        self.assertEqual(self.sql("SELECT * FROM t"),
+                         [[1, 0], [2, 20], [3, 30], [4, 40], [5, 50]])
+
+    def test_nested_begin_and_stray_commit(self):
+        self.assertIn("没有进行中的事务", self.sql("COMMIT"))
+        self.assertIn("没有进行中的事务", self.sql("ROLLBACK"))
+        self.sql("BEGIN")
+        self.assertIn("事务已经开始", self.sql("BEGIN"))
+        self.sql("ROLLBACK")
+
+
+class ColumnarSnapshotIsolationTest(SnapshotIsolationTest):
+    storage = 'columnar'
+
+
+class HousekeepingDuringTransactionTest(unittest.TestCase):
+    """检查点和后台整理只改变行号，不会让进行中的事务提交失败"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.executor = SQLExecutor(path=self.path, compact_threshold=0.9)
+        self.sql = self.executor.execute_sql
+        self.sql("CREATE TABLE t (id INT, v INT)")
+        self.executor.executemany("INSERT INTO t VALUES (?, ?)", [(i, i) for i in range(100)])
+        self.sql("CREATE INDEX iv ON t (v)")
+        self.sql("DELETE FROM t WHERE id < 20")
+
+    def tearDown(self):
+        self.executor.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def check(self, housekeeping):
+        self.sql("BEGIN")
+        self.sql("UPDATE t SET v = -1 WHERE id = 50")
+        self.sql("DELETE FROM t WHERE id > 90")
+        epoch = self.executor.data['t'].epoch
+        in_thread(housekeeping)
+        self.assertNotEqual(self.executor.data['t'].epoch, epoch)
+        self.assertEqual(self.sql("COMMIT"), COMMITTED)
+        expected = self.sql("SELECT * FROM t")
+        self.assertEqual(len(expected), 71)
+        self.assertEqual(self.sql("SELECT id FROM t WHERE v = -1"), [[50]])
+
+        self.executor.close()
+        self.executor = SQLExecutor(path=self.path)
+        self.assertEqual(self.executor.execute_sql("SELECT * FROM t"), expected)
+        self.assertEqual(self.executor.execute_sql("SELECT id FROM t WHERE v = -1"), [[50]])
+
+    def test_checkpoint(self):
+        self.check(self.executor.checkpoint)
+
+    def test_compaction(self):
+        def compact():
+            self.executor.compactor.dead_fraction = 0.0
+            self.executor.schedule_compaction(['t'])
+            self.executor.compactor.wait()
+        self.check(compact)
+
+
+if __name__ == '__main__':
+    unittest.main()
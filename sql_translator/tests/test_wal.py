@@ -0,0 +1,194 @@
+"""预写日志：崩溃后恢复，以及残缺记录的处理"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from sql_translator.core import SQLExecutor
+from sql_translator.core.wal import WAL_FILE
+
+
+class WalRecoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.path = os.path.join(self.root, 'db')
+        self.executors = []
+
+    def tearDown(self):
+        for executor in self.executors:
+            executor.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def open(self, path=None, **options):
+        executor = SQLExecutor(path=path or self.path, **options)
+        self.executors.append(executor)
+        return executor
+
+    def crash(self, executor):
+        """模拟进程崩溃：不关闭执行器，复制此刻磁盘上的数据目录，返回副本的路径
+
+        先等后台整理完成，整理的记录不会出现在预期的最后一条记录之后。
+        """
+        executor.compactor.wait()
+        if executor.database.wal.sync_mode != 'full':
+            executor.database.wal.sync()
+        copy = os.path.join(self.root, f'crash{len(os.listdir(self.root))}')
+        shutil.copytree(self.path, copy)
+        return copy
+
+    def wal_size(self, path):
+        return os.path.getsize(os.path.join(path, WAL_FILE))
+
+    def populate(self, executor):
+        executor.execute_sql("CREATE TABLE t (id INT, name VARCHAR(20), v DECIMAL(10,2))")
+        executor.execute_sql("CREATE INDEX iv ON t (id)")
+        executor.execute_sql("INSERT INTO t VALUES (1, 'a', 1.5), (2, 'b', 2.5), (3, 'c', 3.5)")
+        executor.execute_sql("UPDATE t SET name = 'bb' WHERE id = 2")
+        executor.execute_sql("DELETE FROM t WHERE id = 1")
+        executor.execute_sql("ALTER TABLE t ADD w INT")
+        executor.execute_sql("INSERT INTO t VALUES (4, 'd', 4.5, 40)")
+        # DELETE 之后后台整理会写一条记录，等它写完再记录日志的大小
+        executor.compactor.wait()
+
+    def test_recover_after_crash(self):
+        for sync_mode in ('full', 'interval', 'off'):
+            with self.subTest(sync_mode=sync_mode):
+                shutil.rmtree(self.path, ignore_errors=True)
+                executor = self.open(sync_mode=sync_mode)
+                self.populate(executor)
+                expected = executor.execute_sql("SELECT * FROM t")
+                recovered = self.open(self.crash(executor))
+                self.assertEqual(recovered.execute_sql("SELECT * FROM t"), expected)
+                self.assertEqual(recovered.execute_sql("SELECT name FROM t WHERE id = 2"), [['bb']])
+                executor.close()
+
+    def test_recover_after_checkpoint(self):
+        executor = self.open()
+        self.populate(executor)
+        executor.checkpoint()
+        self.assertEqual(self.wal_size(self.path), 0)
+        executor.execute_sql("UPDATE t SET w = 7 WHERE id = 3")
+        executor.execute_sql("DELETE FROM t WHERE id = 4")
+        expected = executor.execute_sql("SELECT * FROM t")
+        recovered = self.open(self.crash(executor))
+        self.assertEqual(recovered.execute_sql("SELECT * FROM t"), expected)
+        self.assertEqual(recovered.execute_sql("SELECT id FROM t WHERE id = 3"), [[3]])
+
+    def check_torn_tail(self, damage):
+        """最后一条记录损坏时，恢复到它之前的状态；之后的写入在再次恢复后仍然存在"""
+        executor = self.open()
+        self.populate(executor)
+        expected = executor.execute_sql("SELECT * FROM t")
+        size = self.wal_size(self.path)
+        executor.execute_sql("INSERT INTO t VALUES (5, 'e', 5.5, 50)")
+        copy = self.crash(executor)
+        with open(os.path.join(copy, WAL_FILE), 'r+b') as f:
+            damage(f, size, self.wal_size(copy))
+
+        recovered = self.open(copy)
+        self.assertEqual(recovered.execute_sql("SELECT * FROM t"), expected)
+        self.assertEqual(self.wal_size(copy), size)
+        recovered.execute_sql("INSERT INTO t VALUES (6, 'f', 6.5, 60)")
+        expected = recovered.execute_sql("SELECT * FROM t")
+        reopened = self.open(self.crash_copy(copy))
+        self.assertEqual(reopened.execute_sql("SELECT * FROM t"), expected)
+        self.assertEqual(reopened.execute_sql("SELECT id FROM t WHERE id = 6"), [[6]])
+
+    def crash_copy(self, path):
+        copy = path + '-again'
+        shutil.copytree(path, copy)
+        return copy
+
+    def test_truncated_record(self):
+        def truncate(f, start, end):
+            f.truncate(end - 3)
+        self.check_torn_tail(truncate)
+
+    def test_truncated_frame_header(self):
+        def truncate(f, start, end):
+            f.truncate(start + 5)
+        self.check_torn_tail(truncate)
+
+    def test_corrupted_record(self):
+        def corrupt(f, start, end):
+            f.seek(end - 2)
+            byte = f.read(1)
+            f.seek(end - 2)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        self.check_torn_tail(corrupt)
+
+    def test_garbage_after_last_record(self):
+        executor = self.open()
+        self.populate(executor)
+        expected = executor.execute_sql("SELECT * FROM t")
+        copy = self.crash(executor)
+        with open(os.path.join(copy, WAL_FILE), 'ab') as f:
+            f.write(b'\x50\x00\x00\x00garbage')
+        self.assertEqual(self.open(copy).execute_sql("SELECT * FROM t"), expected)
+
+    def test_transaction_is_one_record(self):
+        """事务的全部修改是一条记录：这条记录残缺时整个事务都不生效"""
+        # 提交之后不整理，事务的记录是日志中的最后一条
+        executor = self.open(compact_threshold=1.0)
+        self.populate(executor)
+        expected = executor.execute_sql("SELECT * FROM t")
+        size = self.wal_size(self.path)
+        executor.execute_sql("BEGIN")
+        executor.execute_sql("INSERT INTO t VALUES (7, 'g', 7.5, 70)")
+        executor.execute_sql("DELETE FROM t WHERE id = 2")
+        self.assertEqual(self.wal_size(self.path), size)
+        self.assertEqual(executor.execute_sql("COMMIT"), "提交事务成功")
+        committed = executor.execute_sql("SELECT * FROM t")
+
+        copy = self.crash(executor)
+        torn = self.crash_copy(copy)
+        with open(os.path.join(torn, WAL_FILE), 'r+b') as f:
+            f.truncate(self.wal_size(torn) - 1)
+        self.assertEqual(self.open(copy).execute_sql("SELECT * FROM t"), committed)
+        self.assertEqual(self.open(torn).execute_sql("SELECT * FROM t"), expected)
+
+
+class GroupCommitTest(unittest.TestCase):
+    """full 模式下并发提交合并 fsync：写互斥锁在 fsync 之前释放"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.executor = SQLExecutor(path=os.path.join(self.root, 'db'))
+
+    def tearDown(self):
+        self.executor.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_concurrent_commits_share_fsync(self):
+        executor = self.executor
+        executor.execute_sql("CREATE TABLE t (k INT, i INT)")
+        executor.database.wal.reset_stats()
+        writers, inserts = 8, 30
+        start = threading.Barrier(writers)
+        results = []
+
+        def writer(k):
+            start.wait()
+            for i in range(inserts):
+                results.append(executor.execute_sql(f"INSERT INTO t VALUES ({k}, {i})"))
+
+        threads = [threading.Thread(target=writer, args=(k,)) for k in range(writers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), writers * inserts)
+        self.assertTrue(all(isinstance(result, str) and '错误' not in result for result in results))
+        stats = executor.get_wal_stats()
+        self.assertEqual(stats['commits'], writers * inserts)
+        self.assertLess(stats['syncs'], stats['commits'])
+        self.assertEqual(stats['synced_lsn'], stats['lsn'])
+        self.assertEqual(executor.execute_sql("SELECT COUNT(*) FROM t"), [[writers * inserts]])
+
+
+if __name__ == '__main__':
+    unittest.main()